@@ -0,0 +1,751 @@
+#!/usr/bin/env python3
+"""
+Benchmarks für den Smart Meter Scripts Crawler
+
+Misst einzelne Verarbeitungsschritte auf dem Script-Korpus des Repos (scripts/)
+und auf synthetisch vergrößerten Varianten davon.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import html
+import io
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from difflib import SequenceMatcher
+
+from bs4 import BeautifulSoup
+
+import descriptor_parser
+import obis_index
+import search_index
+import snapshots
+import smart_meter_scripts_crawler as crawler
+import sources
+from catalog import guess_display_name
+from device_names import DeviceNameNormalizer, extract_meter_name, normalize_device_name
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+# Pipeline-Stufen in Ausführungsreihenfolge
+PIPELINE_STAGES = ('fetch', 'parse', 'names', 'dedup', 'merge', 'save', 'save_unchanged')
+
+# Überschriften und summary-Elemente der Tasmota Seite (Namenserkennung im Pipeline-Benchmark)
+HEADING_RE = re.compile(r'<(?:h[1-6]|summary)\b[^>]*>(.*?)</(?:h[1-6]|summary)>', re.S)
+
+# Kleinere Abweichungen (in Sekunden) sind Messrauschen und gelten nicht als Regression
+REGRESSION_MIN_DELTA = 0.005
+
+def load_corpus(scripts_dir=SCRIPTS_DIR):
+    """Lädt alle Scripts aus scripts/ als Liste von (Name, Script)"""
+    corpus = []
+    for filename in sorted(os.listdir(scripts_dir)):
+        if filename.endswith('.txt'):
+            with open(os.path.join(scripts_dir, filename), 'r', encoding='utf-8') as f:
+                corpus.append((filename[:-4], f.read()))
+    return corpus
+
+def mutate_script(script, variant, rng):
+    """Erzeugt eine leicht veränderte Script-Variante (Zählername + einzelne Zahlenwerte)"""
+    lines = script.split('\n')
+    for i, line in enumerate(lines):
+        if re.match(r'\+\d+,', line):
+            fields = line.split(',')
+            if len(fields) > 5:
+                fields[5] = f"{fields[5]}{variant}"
+            lines[i] = ','.join(fields)
+
+    numeric = [i for i, line in enumerate(lines) if re.search(r'@\d+', line)]
+    for i in rng.sample(numeric, min(2, len(numeric))):
+        lines[i] = re.sub(r'@(\d+)', lambda m: f"@{int(m.group(1)) * 10}", lines[i], count=1)
+    return '\n'.join(lines)
+
+def enlarge_corpus(corpus, factor, seed=0):
+    """Vergrößert den Korpus um den Faktor durch Varianten der vorhandenen Scripts"""
+    rng = random.Random(seed)
+    enlarged = list(corpus)
+    for variant in range(1, factor):
+        for name, script in corpus:
+            enlarged.append((f"{name}_{variant}", mutate_script(script, variant, rng)))
+    return enlarged
+
+def synthetic_tasmota_page(corpus):
+    """Baut eine Seite im Aufbau des Tasmota Wiki (Überschriften, details, verschachtelte Code-Blöcke)"""
+    # Wie bei MkDocs steht vor dem Artikel ein Inhaltsverzeichnis mit einem Eintrag je Überschrift
+    toc = ''.join(f'<li><a href="#{i}">{html.escape(guess_display_name(name))}</a></li>' for i, (name, _) in enumerate(corpus))
+    parts = [
+        f'<html><body><nav class="md-nav"><ul>{toc}</ul></nav><article class="md-content__inner">',
+        '<h1>Smart Meter Interface</h1>',
+        '<p>Einleitung zum Smart Meter Interface mit Beispielen und Erklärungen.</p>\n' * 50,
+        '<h2 id="smart-meter-descriptors">Smart Meter Descriptors</h2>\n',
+    ]
+    for i, (name, script) in enumerate(corpus):
+        title = html.escape(guess_display_name(name))
+        body = html.escape(script)
+        if i % 3 == 0:
+            parts.append(f'<h3>{title}</h3>\n<p>Beschreibung</p>\n'
+                         f'<div class="highlight"><pre><code>{body}</code></pre></div>\n')
+        elif i % 3 == 1:
+            parts.append(f'<div class="admonition"><details class="summary"><summary>{title}</summary>'
+                         f'<p>Beschreibung</p><div class="highlight"><pre><code>{body}</code></pre></div>'
+                         f'</details></div>\n')
+        else:
+            parts.append(f'<h4>{title}</h4>\n<div><details><summary>{title} alternative</summary>'
+                         f'<pre><code>{body}</code></pre></details></div>\n')
+    parts.append('<h2>Weitere Themen</h2><p>Ende</p></article></body></html>')
+    return ''.join(parts)
+
+def synthetic_bitshake_page(corpus):
+    """Baut eine Seite im Aufbau der Bitshake Documentation (Name, Script, Trennlinie)"""
+    parts = ['<html><head><style>body { margin: 0; }</style></head><body><h1>Bitshake Scripts</h1>\n']
+    for name, script in corpus:
+        parts.append(f'<p>{html.escape(guess_display_name(name))}</p>\n'
+                     f'<pre><code>{html.escape(script)}\n</code></pre>\n<p>----------</p>\n')
+    parts.append('<p>Impressum</p></body></html>')
+    return ''.join(parts)
+
+def load_bitshake_page(args):
+    """Gespeicherte Bitshake Seite (--bitshake-page) oder synthetische Seite aus dem Korpus"""
+    if args.bitshake_page:
+        with open(args.bitshake_page, 'r', encoding='utf-8') as f:
+            return f.read()
+    return synthetic_bitshake_page(enlarge_corpus(load_corpus(), args.page_factor))
+
+def load_tasmota_page(args):
+    """Gespeicherte Tasmota Wiki Seite (--tasmota-page) oder synthetische Seite aus dem Korpus"""
+    if args.tasmota_page:
+        with open(args.tasmota_page, 'r', encoding='utf-8') as f:
+            return f.read()
+    return synthetic_tasmota_page(enlarge_corpus(load_corpus(), args.page_factor))
+
+def best_of(func, *args, repeat=3):
+    """Kürzeste Laufzeit aus mehreren Wiederholungen in Sekunden"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def peak_memory(func, *args):
+    """Spitzen-Speicherverbrauch eines Aufrufs in Bytes (tracemalloc)"""
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def find_descriptors_section(soup):
+    """Sucht die Überschrift der "Smart Meter Descriptors" Sektion"""
+    for heading in soup.find_all(['h1', 'h2', 'h3', 'h4']):
+        if 'smart meter descriptors' in heading.get_text().lower():
+            return heading
+    return None
+
+def element_scripts(element):
+    """Alle Tasmota Scripts aus den code-Elementen eines Elements"""
+    scripts = (crawler.extract_script(code.get_text()) for code in element.find_all('code'))
+    return [script for script in scripts if script]
+
+def legacy_section_scan(descriptors_section):
+    """Frühere Traversierung: Sektionsliste, find_all('details') je Element, next_sibling-Scan je Überschrift"""
+    found = []
+    section_elements = []
+    current = descriptors_section.next_sibling
+    while current:
+        if hasattr(current, 'name') and current.name:
+            if current.name in ['h1', 'h2']:
+                break
+            section_elements.append(current)
+        current = current.next_sibling
+
+    for element in section_elements:
+        if hasattr(element, 'name') and hasattr(element, 'find_all'):
+            for details in element.find_all('details'):
+                summary = details.find('summary')
+                if summary and extract_meter_name(summary.get_text()):
+                    found.extend(element_scripts(details))
+
+    for element in section_elements:
+        if hasattr(element, 'name') and element.name in ['h3', 'h4', 'h5', 'h6']:
+            if extract_meter_name(element.get_text()):
+                current = element.next_sibling
+                while current:
+                    if hasattr(current, 'name') and current.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
+                        break
+                    if hasattr(current, 'find_all'):
+                        found.extend(element_scripts(current))
+                    current = current.next_sibling
+    return found
+
+def page_chunks(page, size=crawler.CHUNK_SIZE):
+    """Teilt eine Seite in Textblöcke, wie sie der Crawler aus der Antwort liest"""
+    return [page[i:i + size] for i in range(0, len(page), size)]
+
+def single_pass_scan(page, parser=None):
+    """Aktuelle Traversierung: ein Durchlauf des Sektions-Walkers über die Seite (inkl. Tokenizer)"""
+    found = []
+    walker = crawler.DescriptorSectionWalker()
+    tokenizer = crawler.make_tokenizer(walker, parser)
+
+    def handle(events):
+        for event in events:
+            if event[0] == 'heading':
+                extract_meter_name(event[1])
+            elif event[0] == 'summary':
+                extract_meter_name(event[2])
+            elif event[0] == 'code':
+                script = crawler.extract_script(event[1])
+                if script:
+                    found.append(script)
+
+    for chunk in page_chunks(page):
+        tokenizer.feed(chunk)
+        handle(walker.take_events())
+        if walker.done:
+            break
+    else:
+        tokenizer.close()
+        handle(walker.take_events())
+    return found
+
+def section_texts(page, parser=None):
+    """Text-Tokenizer des Bitshake-Parsers: Sektionen der Seite ohne Auswertung"""
+    return list(crawler.iter_text_sections(page_chunks(page), parser))
+
+def quiet(func, *args):
+    """Ruft eine Funktion ohne Konsolenausgabe auf"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args)
+
+def bench_parsers(args):
+    """HTML-Backends: Dokumentbaum mit BeautifulSoup gegenüber den Streaming-Tokenizern des Crawlers"""
+    tasmota_page = load_tasmota_page(args)
+    bitshake_page = load_bitshake_page(args)
+    section = crawler.extract_section_html(tasmota_page) or tasmota_page
+
+    print(f"Tasmota: {len(tasmota_page) / 1024:.0f} KiB (Sektion {len(section) / 1024:.0f} KiB), "
+          f"Bitshake: {len(bitshake_page) / 1024:.0f} KiB")
+    print(f"{'Variante':<42} {'Zeit':>10} {'Peak-Speicher':>14}")
+
+    # Alle Varianten ohne Script-Extraktion - gemessen wird nur das Parsen der Seite
+    cases = []
+    for parser in crawler.available_parsers():
+        cases.append((f"Tasmota Dokumentbaum ({parser})", lambda p=parser: BeautifulSoup(tasmota_page, p)))
+        cases.append((f"Tasmota Baum nur Sektion ({parser})", lambda p=parser: BeautifulSoup(section, p)))
+        cases.append((f"Tasmota Sektions-Walker ({parser})", lambda p=parser: single_pass_scan(tasmota_page, p)))
+    for parser in crawler.available_parsers():
+        cases.append((f"Bitshake get_text ({parser})", lambda p=parser: BeautifulSoup(bitshake_page, p).get_text()))
+        cases.append((f"Bitshake Text-Tokenizer ({parser})", lambda p=parser: section_texts(bitshake_page, p)))
+
+    for label, func in cases:
+        elapsed = best_of(func, repeat=args.repeat)
+        peak = peak_memory(func)
+        print(f"{label:<42} {elapsed * 1000:>8.1f}ms {peak / 1024 / 1024:>11.1f} MiB")
+
+def bench_walker(args):
+    """Single-Pass Sektions-Walker gegenüber der früheren Mehrfach-Traversierung eines Dokumentbaums"""
+    page = load_tasmota_page(args)
+    soup = BeautifulSoup(page, crawler.HTML_PARSER)
+    section = find_descriptors_section(soup)
+    if section is None:
+        print("Smart Meter Descriptors Sektion nicht gefunden!")
+        return
+
+    legacy = best_of(legacy_section_scan, section, repeat=args.repeat)
+    tree = best_of(BeautifulSoup, page, crawler.HTML_PARSER, repeat=args.repeat)
+    legacy_blocks = len(legacy_section_scan(section))
+
+    print(f"Seite: {len(page) / 1024:.0f} KiB")
+    print(f"{'Mehrfach-Traversierung:':<44} {legacy * 1000:8.1f} ms  ({legacy_blocks} Scripts extrahiert, "
+          f"+ {tree * 1000:.1f} ms Baum mit {crawler.HTML_PARSER})")
+    for parser in crawler.available_parsers():
+        single = best_of(single_pass_scan, page, parser, repeat=args.repeat)
+        single_blocks = len(single_pass_scan(page, parser))
+        label = f"Single-Pass inkl. Tokenizer ({parser}):"
+        print(f"{label:<44} {single * 1000:8.1f} ms  "
+              f"({single_blocks} Scripts extrahiert, {(legacy + tree) / single:.1f}x)")
+    total = best_of(quiet, crawler.parse_tasmota_wiki, page, repeat=1)
+    print(f"{'parse_tasmota_wiki:':<44} {total * 1000:8.1f} ms  (inkl. Extraktion und Deduplizierung)")
+
+def bench_names(args):
+    """Gerätenamen-Normalisierung in Namen pro Sekunde (ohne und mit Cache)"""
+    headings = [guess_display_name(name) for name, _ in load_corpus()]
+    headings += [heading.replace('Landis Gyr', 'Landis+Gyr') for heading in headings]
+
+    normalizer = DeviceNameNormalizer()
+    rounds = max(1, args.repeat)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for heading in headings:
+            normalizer._normalize(heading)
+    uncached = len(headings) * rounds / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(rounds * 10):
+        for heading in headings:
+            normalizer.normalize(heading)
+    cached = len(headings) * rounds * 10 / (time.perf_counter() - start)
+
+    print(f"{len(headings)} Überschriften")
+    print(f"Ohne Cache: {uncached:>12,.0f} Namen/s")
+    print(f"Mit Cache:  {cached:>12,.0f} Namen/s")
+
+def bench_dedup(args):
+    """Near-Duplicate-Index gegenüber paarweisem SequenceMatcher"""
+    corpus = load_corpus()
+
+    print(f"{'Scripts':>8} {'Index':>10} {'Vergleiche':>11} {'Cluster':>8} {'Paarweise (geschätzt)':>22}")
+    for factor in args.factors:
+        scripts = enlarge_corpus(corpus, factor)
+
+        start = time.perf_counter()
+        index = crawler.NearDuplicateIndex(args.threshold)
+        for name, script in scripts:
+            index.add(name, script)
+        clusters = index.clusters()
+        elapsed = time.perf_counter() - start
+
+        # Paarweiser Vergleich wird an einer Stichprobe gemessen und hochgerechnet
+        rng = random.Random(factor)
+        sample = [rng.sample(scripts, 2) for _ in range(args.sample)]
+        start = time.perf_counter()
+        for (_, a), (_, b) in sample:
+            SequenceMatcher(None, a, b).ratio()
+        per_pair = (time.perf_counter() - start) / len(sample)
+        pairwise = per_pair * len(scripts) * (len(scripts) - 1) / 2
+
+        print(f"{len(scripts):>8} {elapsed * 1000:>8.1f}ms {index.comparisons:>11} {len(clusters):>8} {pairwise:>21.1f}s")
+
+def bench_descriptors(args):
+    """Descriptor-Parser: seriell gegenüber Prozess-Pool, Klassifikation gegenüber Stichwortsuche"""
+    corpus = load_corpus()
+    pool_workers = max(2, os.cpu_count() or 1)
+
+    print(f"CPU-Kerne: {os.cpu_count()}, Prozess-Pool mit {pool_workers} Prozessen")
+    print(f"{'Scripts':>8} {'KiB':>6} {'Seriell':>10} {'Prozess-Pool':>13} {'Scripts/s':>10} "
+          f"{'Klassifikation':>15} {'Stichwortsuche':>15}")
+    for factor in args.factors:
+        scripts = enlarge_corpus(corpus, factor)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = []
+            for name, script in scripts:
+                path = os.path.join(tmp_dir, f"{name}.txt")
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(script)
+                paths.append(path)
+
+            serial = best_of(lambda: [descriptor_parser.parse_file(path) for path in paths], repeat=args.repeat)
+            pooled = best_of(descriptor_parser.parse_corpus, paths, pool_workers, repeat=args.repeat)
+            results = descriptor_parser.parse_corpus(paths)
+
+        size = sum(len(script.encode('utf-8')) for _, script in scripts)
+        classify = best_of(lambda: [descriptor.protocol for _, descriptor, _ in results], repeat=args.repeat)
+        keywords = best_of(lambda: [crawler.guess_protocol_info(script) for _, script in scripts], repeat=args.repeat)
+        print(f"{len(scripts):>8} {size / 1024:>6.0f} {serial * 1000:>8.1f}ms {pooled * 1000:>11.1f}ms "
+              f"{len(scripts) / min(serial, pooled):>10,.0f} {classify * 1000:>13.2f}ms {keywords * 1000:>13.2f}ms")
+
+def bench_obis(args):
+    """OBIS-Index: Neuaufbau gegenüber inkrementeller Aktualisierung, Abfrage gegenüber Durchsuchen aller Scripts"""
+    corpus = load_corpus()
+    codes = ['1.8.0', '2.8.0', '16.7.0', '1-0:32.7.0*255', '77070100240700ff']
+
+    print(f"{'Scripts':>8} {'Neuaufbau':>10} {'Inkrementell':>13} {'Abfrage':>10} {'Durchsuchen':>12}")
+    for factor in args.factors:
+        scripts = enlarge_corpus(corpus, factor)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            entries = []
+            for name, script in scripts:
+                with open(os.path.join(tmp_dir, f"{name}.txt"), 'w', encoding='utf-8') as f:
+                    f.write(script)
+                entries.append({'filename': f"{name}.txt", 'sha256': crawler.content_hash(script)})
+
+            full = best_of(obis_index.build_obis_data, entries, tmp_dir, repeat=args.repeat)
+            data, _ = obis_index.build_obis_data(entries, tmp_dir)
+            # Ein geändertes Script: nur dieses wird neu geparst
+            entries[0] = dict(entries[0], sha256='geaendert')
+            incremental = best_of(obis_index.build_obis_data, entries, tmp_dir, data, repeat=args.repeat)
+
+        index = obis_index.ObisIndex(data)
+        lookup = best_of(lambda: [index.lookup(code) for code in codes], repeat=args.repeat) / len(codes)
+        scan = best_of(lambda: [[descriptor_parser.parse_descriptor(script).obis_codes for _, script in scripts]],
+                       repeat=1)
+        print(f"{len(scripts):>8} {full * 1000:>8.1f}ms {incremental * 1000:>11.1f}ms "
+              f"{lookup * 1e6:>8.1f}µs {scan * 1000:>10.1f}ms")
+
+def bench_search(args):
+    """Typeahead-Suche: Suchindex gegenüber linearem Durchsuchen der Namensliste"""
+    corpus = load_corpus()
+    queries = ['landis e220', 'L+G E220', 'ehz', '7410', 'e']
+
+    print(f"{'Scripts':>8} {'Index-Aufbau':>13} " + " ".join(f"{query!r:>14}" for query in queries) + f" {'Linear':>10}")
+    for factor in args.factors:
+        entries = [{'display_name': guess_display_name(name), 'filename': f"{name}.txt"}
+                   for name, _ in enlarge_corpus(corpus, factor)]
+        build = best_of(search_index.build_search_data, entries, repeat=args.repeat)
+        index = search_index.SearchIndex(search_index.build_search_data(entries))
+        keys = [normalize_device_name(entry['display_name']) for entry in entries]
+
+        timings = []
+        for query in queries:
+            rounds = 200
+            elapsed = best_of(lambda: [index.search(query) for _ in range(rounds)], repeat=args.repeat)
+            timings.append(elapsed / rounds)
+        # Bisheriger Weg auf dem Gerät: jede Anfrage gegen alle normalisierten Namen vergleichen
+        linear = best_of(lambda: [key for key in keys if normalize_device_name(queries[0]) in key], repeat=args.repeat)
+
+        print(f"{len(entries):>8} {build * 1000:>11.1f}ms " + " ".join(f"{t * 1e6:>12.1f}µs" for t in timings)
+              + f" {linear * 1e6:>8.1f}µs")
+
+def pipeline_fixtures(args):
+    """Snapshot-Verzeichnisse für den Pipeline-Benchmark als (Name, Verzeichnis) - aufgezeichnet oder synthetisch"""
+    if args.snapshots:
+        yield 'snapshots', args.snapshots
+        return
+
+    corpus = load_corpus()
+    for factor in args.factors:
+        with tempfile.TemporaryDirectory() as directory:
+            scripts = enlarge_corpus(corpus, factor)
+            snapshots.write_snapshot(directory, crawler.TASMOTA_URL, synthetic_tasmota_page(scripts))
+            snapshots.write_snapshot(directory, crawler.BITSHAKE_URL, synthetic_bitshake_page(scripts))
+            yield f"x{factor}", directory
+
+def time_pipeline(directory, repeat):
+    """Misst jede Stufe der Crawler-Pipeline auf einem Snapshot-Verzeichnis (ohne Netzwerk)"""
+    session = snapshots.ReplaySession(directory)
+    timings = {}
+
+    def fetch():
+        return [session.get(url).text for url in (crawler.TASMOTA_URL, crawler.BITSHAKE_URL)]
+    timings['fetch'] = best_of(fetch, repeat=repeat)
+    tasmota_page, bitshake_page = fetch()
+
+    def parse():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return crawler.parse_tasmota_wiki(tasmota_page), crawler.parse_bitshake(bitshake_page)
+    timings['parse'] = best_of(parse, repeat=repeat)
+    tasmota_scripts, bitshake_scripts = parse()
+
+    # Namenserkennung ohne Cache über alle Überschriften bzw. Namenszeilen beider Seiten
+    headings = [html.unescape(re.sub(r'<[^>]+>', '', match.group(1)))
+                for match in HEADING_RE.finditer(tasmota_page)]
+    headings += [script['device_name'] for scripts in bitshake_scripts.values() for script in scripts]
+    timings['names'] = best_of(lambda: [DeviceNameNormalizer()._normalize(heading) for heading in headings],
+                               repeat=repeat)
+
+    all_scripts = [script for source in (tasmota_scripts, bitshake_scripts)
+                   for scripts in source.values() for script in scripts]
+
+    def dedup():
+        index = crawler.NearDuplicateIndex()
+        for i, script in enumerate(all_scripts):
+            index.add(i, script['script'])
+        return index.clusters()
+    timings['dedup'] = best_of(dedup, repeat=repeat)
+
+    def merge():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return crawler.merge_scripts(tasmota_scripts, bitshake_scripts)
+    timings['merge'] = best_of(merge, repeat=repeat)
+    merged = merge()
+
+    def save():
+        with tempfile.TemporaryDirectory() as output_dir:
+            crawler.save_scripts(merged, output_dir)
+
+    with tempfile.TemporaryDirectory() as output_dir, contextlib.redirect_stdout(io.StringIO()):
+        timings['save'] = best_of(save, repeat=repeat)
+        crawler.save_scripts(merged, output_dir)
+        timings['save_unchanged'] = best_of(crawler.save_scripts, merged, output_dir, repeat=repeat)
+
+    counts = {'tasmota': len(all_scripts) - sum(len(v) for v in bitshake_scripts.values()),
+              'bitshake': sum(len(v) for v in bitshake_scripts.values()),
+              'merged': sum(len(v) for v in merged.values())}
+    return timings, counts
+
+def baseline_command(args):
+    """Befehl, der die Baseline für dieselben Seiten auf dieser Maschine speichert"""
+    fixtures = f"--snapshots {args.snapshots}" if args.snapshots else f"--factors {' '.join(map(str, args.factors))}"
+    target = '' if args.baseline == BASELINE_FILE else f" --baseline {args.baseline}"
+    return f"python benchmark.py pipeline {fixtures}{target} --save-baseline"
+
+def bench_pipeline(args):
+    """Crawler-Pipeline Stufe für Stufe auf Snapshots, Vergleich mit gespeicherter Baseline"""
+    # Die Baseline sind Zeiten einer Maschine - sie wird nicht eingecheckt, sondern lokal gespeichert.
+    # Ohne Baseline gäbe es keinen Vergleich, der Lauf würde aber trotzdem "bestehen": daher ein Fehler.
+    try:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+    except (OSError, ValueError) as e:
+        print(f"FEHLER: Baseline {args.baseline} nicht lesbar ({e}). Neu speichern mit:\n  {baseline_command(args)}")
+        return True
+    if not baseline and not args.save_baseline:
+        print(f"FEHLER: keine Baseline {args.baseline} - ohne sie wird nichts verglichen. "
+              f"Zuerst auf dieser Maschine speichern:\n  {baseline_command(args)}")
+        return True
+
+    results = {}
+    regressions = []
+    missing = []
+    for name, directory in pipeline_fixtures(args):
+        timings, counts = time_pipeline(directory, args.repeat)
+        results[name] = timings
+        if name not in baseline:
+            missing.append(name)
+        print(f"{name}: {counts['tasmota']} Tasmota + {counts['bitshake']} Bitshake Scripts -> {counts['merged']} gespeichert")
+        for stage in PIPELINE_STAGES:
+            line = f"  {stage:<15} {timings[stage] * 1000:>9.1f} ms"
+            reference = baseline.get(name, {}).get(stage)
+            if reference:
+                ratio = timings[stage] / reference
+                line += f"  (Baseline {reference * 1000:.1f} ms, {ratio:.2f}x)"
+                if ratio > 1 + args.tolerance and timings[stage] - reference > REGRESSION_MIN_DELTA:
+                    line += "  REGRESSION"
+                    regressions.append(f"{name}/{stage}")
+            print(line)
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baseline gespeichert: {args.baseline}")
+    elif missing:
+        print(f"FEHLER: keine Baseline für {', '.join(missing)} in {args.baseline}. Ergänzen mit:\n  {baseline_command(args)}")
+    if regressions:
+        print(f"{len(regressions)} Stufen langsamer als Baseline + {args.tolerance:.0%}: {', '.join(regressions)}")
+    return bool(regressions) or (bool(missing) and not args.save_baseline)
+
+class DelayedSession:
+    """Wiedergabe mit fester Antwortzeit je Anfrage - simuliert die Netzwerk-Latenz einer Quelle"""
+
+    def __init__(self, directory, latency):
+        self.session = snapshots.ReplaySession(directory)
+        self.latency = latency
+
+    def get(self, url, headers=None, timeout=None, stream=False):
+        time.sleep(self.latency)
+        return self.session.get(url, headers, timeout, stream)
+
+def bench_sources(args):
+    """Crawl-Zeit bei wachsender Zahl von Quellen: nacheinander gegenüber parallelem Adapter-Pool"""
+    corpus = load_corpus()
+    pages = [synthetic_tasmota_page(corpus), synthetic_bitshake_page(corpus)]
+    parsers = [crawler.iter_tasmota_wiki, crawler.iter_bitshake]
+
+    print(f"Latenz je Quelle: {args.latency * 1000:.0f} ms, {crawler.POOL_SIZE} Worker")
+    print(f"{'Quellen':>8} {'Nacheinander':>13} {'Parallel':>10} {'Faktor':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        adapters = []
+        for n in (1, 2, 4, 8):
+            while len(adapters) < n:
+                i = len(adapters)
+                url = f"https://example.org/source{i}/"
+                snapshots.write_snapshot(directory, url, pages[i % 2])
+                adapters.append(sources.PageSource(f"source{i}", url, parsers[i % 2]))
+            session = DelayedSession(directory, args.latency)
+
+            def crawl(workers):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    return sources.collect_sources(adapters, crawler.CrawlContext(session), workers)
+            serial = best_of(crawl, 1, repeat=args.repeat)
+            parallel = best_of(crawl, crawler.POOL_SIZE, repeat=args.repeat)
+            print(f"{n:>8} {serial * 1000:>11.1f}ms {parallel * 1000:>8.1f}ms {serial / parallel:>6.1f}x")
+
+def materialized_pipeline(directory, output_dir):
+    """Früherer Ablauf: ganze Seiten laden, vollständig parsen, mergen, dann speichern - gibt Zeit bis zur ersten Datei zurück"""
+    session = snapshots.ReplaySession(directory)
+    start = time.perf_counter()
+    tasmota_page, bitshake_page = [session.get(url).text for url in (crawler.TASMOTA_URL, crawler.BITSHAKE_URL)]
+    merged = crawler.merge_scripts(crawler.parse_tasmota_wiki(tasmota_page), crawler.parse_bitshake(bitshake_page))
+    before_save = time.perf_counter() - start
+    return before_save + crawler.save_scripts(merged, output_dir)['first_write']
+
+def streaming_pipeline(directory, output_dir):
+    """Datenstrom wie im Crawler: Antwort blockweise parsen, Datensätze mergen und sofort speichern"""
+    adapters = [sources.PageSource('bitshake', crawler.BITSHAKE_URL, crawler.iter_bitshake, 20),
+                sources.PageSource('tasmota', crawler.TASMOTA_URL, crawler.iter_tasmota_wiki, 10)]
+    context = crawler.CrawlContext(snapshots.ReplaySession(directory))
+    stream = sources.stream_records(adapters, context, 1, finished=True)
+    tagged = ((adapter.name, record) for adapter, record in stream)
+    # save_records beginnt vor dem ersten Datensatz - seine Zeit bis zur ersten Datei gilt für die ganze Pipeline
+    return crawler.save_records(crawler.stream_merge(tagged, [adapter.name for adapter in adapters]), output_dir)['first_write']
+
+def measure_pipeline(pipeline, directory, repeat):
+    """Laufzeit, Zeit bis zur ersten Datei und Spitzen-Speicher einer Pipeline (je Lauf leerer Ausgabeordner)"""
+    def run():
+        with tempfile.TemporaryDirectory() as output_dir:
+            return quiet(pipeline, directory, output_dir)
+
+    elapsed = best_of(run, repeat=repeat)
+    first_write = min(run() for _ in range(repeat))
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return elapsed, first_write, peak
+
+def bench_streaming(args):
+    """Speicher und Zeit bis zur ersten Datei: vollständig im Speicher gegenüber Datenstrom"""
+    corpus = load_corpus()
+
+    print(f"{'Scripts':>8} {'Seiten':>9} {'Variante':<12} {'Zeit':>10} {'Erste Datei':>12} {'Peak-Speicher':>14}")
+    for factor in args.factors:
+        scripts = enlarge_corpus(corpus, factor)
+        with tempfile.TemporaryDirectory() as directory:
+            pages = (synthetic_tasmota_page(scripts), synthetic_bitshake_page(scripts))
+            snapshots.write_snapshot(directory, crawler.TASMOTA_URL, pages[0])
+            snapshots.write_snapshot(directory, crawler.BITSHAKE_URL, pages[1])
+            size = sum(len(page.encode('utf-8')) for page in pages)
+            del pages
+
+            for label, pipeline in (("Im Speicher", materialized_pipeline), ("Datenstrom", streaming_pipeline)):
+                elapsed, first_write, peak = measure_pipeline(pipeline, directory, args.repeat)
+                print(f"{len(scripts):>8} {size / 1024 / 1024:>6.1f}MiB {label:<12} {elapsed * 1000:>8.1f}ms "
+                      f"{first_write * 1000:>10.1f}ms {peak / 1024 / 1024:>11.1f} MiB")
+
+def start_server(*options):
+    """Startet server.py als eigenen Prozess auf einem freien Port - gibt (Prozess, Port) zurück"""
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py'), '--port', '0', *options]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    match = re.search(r':(\d+)/', process.stdout.readline())
+    if not match:
+        process.kill()
+        raise RuntimeError("server.py ist nicht gestartet")
+    return process, int(match.group(1))
+
+async def http_get(reader, writer, path, headers):
+    """Eine GET-Anfrage auf einer offenen Verbindung - gibt (Status, Header, Body) zurück"""
+    lines = [f"GET {path} HTTP/1.1", "Host: localhost"] + [f"{name}: {value}" for name, value in headers.items()]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+    status = int((await reader.readline()).split()[1])
+    response_headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        response_headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(response_headers.get('content-length', 0)))
+    return status, response_headers, body
+
+async def simulate_device(port, script_paths, requests, rng, latencies, statuses):
+    """Ein Gerät: prüft die Liste per If-None-Match und lädt Scripts, teils per Range (Fortsetzen eines Downloads)"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    etag = None
+    try:
+        for i in range(requests):
+            if i % 4 == 0:
+                path, headers = '/api/list.min.json', {'Accept-Encoding': 'gzip'}
+                if etag:
+                    headers['If-None-Match'] = etag
+            else:
+                path, headers = rng.choice(script_paths), {}
+                if i % 4 == 3:
+                    headers['Range'] = 'bytes=64-'
+            start = time.perf_counter()
+            status, response_headers, _ = await http_get(reader, writer, path, headers)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            if path == '/api/list.min.json':
+                etag = response_headers.get('etag', etag)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+async def load_test(port, script_paths, devices, requests, seed=0):
+    """Viele Geräte gleichzeitig - gibt (Laufzeit, Latenzen, Statuszähler) zurück"""
+    rng = random.Random(seed)
+    latencies, statuses = [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*(simulate_device(port, script_paths, requests, random.Random(rng.random()), latencies, statuses)
+                           for _ in range(devices)))
+    return time.perf_counter() - start, latencies, statuses
+
+def percentile(values, p):
+    """p-Quantil (0..100) einer Liste von Messwerten"""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+def bench_server(args):
+    """Lasttest des lokalen Katalog-Servers: Anfragen pro Sekunde und p99-Latenz bei vielen Geräten, mit und ohne LRU-Cache"""
+    script_paths = [f"/scripts/{filename}" for filename in sorted(os.listdir(SCRIPTS_DIR)) if filename.endswith('.txt')]
+
+    print(f"{len(script_paths)} Scripts, {args.device_requests} Anfragen je Gerät "
+          f"(je 4: Liste mit If-None-Match, 2 Scripts, 1 Script mit Range)")
+    print(f"{'Geräte':>7} {'Variante':<10} {'Anfragen':>9} {'Anfr./s':>9} {'p50':>8} {'p99':>8} {'Status':<24}")
+    for label, options in (("LRU-Cache", []), ("ohne Cache", ['--cache-size', '0'])):
+        process, port = start_server(*options)
+        try:
+            for devices in args.devices:
+                elapsed, latencies, statuses = asyncio.run(load_test(port, script_paths, devices, args.device_requests))
+                counts = ' '.join(f"{status}:{count}" for status, count in sorted(statuses.items()))
+                print(f"{devices:>7} {label:<10} {len(latencies):>9} {len(latencies) / elapsed:>9.0f} "
+                      f"{percentile(latencies, 50) * 1000:>6.2f}ms {percentile(latencies, 99) * 1000:>6.2f}ms {counts:<24}")
+        finally:
+            process.terminate()
+            process.wait()
+
+BENCHMARKS = {
+    'descriptors': bench_descriptors,
+    'dedup': bench_dedup,
+    'names': bench_names,
+    'obis': bench_obis,
+    'parsers': bench_parsers,
+    'pipeline': bench_pipeline,
+    'search': bench_search,
+    'server': bench_server,
+    'sources': bench_sources,
+    'streaming': bench_streaming,
+    'walker': bench_walker,
+}
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description="Benchmarks für den Smart Meter Scripts Crawler")
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS) + ['all'], nargs='?', default='all')
+    parser.add_argument('--factors', type=int, nargs='+', default=[1, 2, 5, 10],
+                        help="Vergrößerungsfaktoren für den Script-Korpus")
+    parser.add_argument('--threshold', type=float, default=crawler.CANDIDATE_THRESHOLD)
+    parser.add_argument('--sample', type=int, default=200, help="Stichprobengröße für paarweise Vergleiche")
+    parser.add_argument('--tasmota-page', help="Gespeicherte Kopie der Tasmota Wiki Seite (Standard: synthetisch)")
+    parser.add_argument('--bitshake-page', help="Gespeicherte Kopie der Bitshake Seite (Standard: synthetisch)")
+    parser.add_argument('--page-factor', type=int, default=1, help="Vergrößerungsfaktor der synthetischen Seiten")
+    parser.add_argument('--repeat', type=int, default=3, help="Wiederholungen je Messung")
+    parser.add_argument('--latency', type=float, default=0.2, help="Simulierte Antwortzeit je Quelle in Sekunden")
+    parser.add_argument('--snapshots', help="Aufgezeichnete Seiten (crawler --record DIR) statt synthetischer Seiten")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="Baseline-Datei für den Pipeline-Benchmark")
+    parser.add_argument('--save-baseline', action='store_true', help="Ergebnisse als neue Baseline speichern")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Erlaubte Verlangsamung gegenüber der Baseline")
+    parser.add_argument('--devices', type=int, nargs='+', default=[10, 100, 500],
+                        help="Anzahl gleichzeitiger Geräte im Lasttest (server)")
+    parser.add_argument('--device-requests', type=int, default=20, help="Anfragen je Gerät im Lasttest (server)")
+    args = parser.parse_args()
+
+    failed = False
+    names = sorted(BENCHMARKS) if args.benchmark == 'all' else [args.benchmark]
+    for name in names:
+        print(f"=== {name}: {BENCHMARKS[name].__doc__} ===")
+        failed = BENCHMARKS[name](args) or failed
+        print()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Inhaltsadressierte Ablage der Scripts (api/blobs/)
+
+Viele Scripts sind byte-identisch oder unterscheiden sich nur im Zählernamen der
+"+1,..."-Zeile (z.B. EasyMeter M24/M60/M100, DZG DWSB12/DWSB20). Scripts mit gleichem
+normalisierten Inhalt (Zählernamen ausgeblendet) teilen sich einen Blob:
+
+- blobs/<hash>.txt   Inhalt des ersten Scripts der Gruppe (Basis), <hash> = erste 16 Zeichen des SHA-256
+- blobs.json         {Blob: {size, aliases}} - welche Scripts den Blob verwenden
+
+In scripts.json verweist jeder Eintrag mit "blob" auf seine Basis; Varianten tragen
+zusätzlich "substitutions" [[Zeilennummer, Zeile], ...], die auf die Basis angewendet werden.
+Identische Scripts sind reine Aliase ohne Ersetzungen. Ein Client lädt jeden Blob nur einmal.
+"""
+
+import argparse
+import json
+import os
+import re
+
+from storage import content_hash
+
+BLOBS_DIR = "blobs"
+BLOB_INDEX_FILE = "blobs.json"
+BLOB_INDEX_VERSION = 1
+
+# Länge der Blob-IDs (16 Hex-Zeichen = 64 Bit, wie der gekürzte Hash in list.json)
+BLOB_ID_LENGTH = 16
+
+METER_LINE_RE = re.compile(r'^\+\d+,')
+
+# Feld der Zählerdefinition "+1,3,s,0,9600,Name,..." mit dem Zählernamen
+METER_NAME_FIELD = 5
+
+def blob_id(content):
+    """Blob-ID eines Inhalts"""
+    return content_hash(content)[:BLOB_ID_LENGTH]
+
+def normalized_body(script):
+    """Script ohne Zählernamen in den Zählerdefinitionen - gleich für alle Varianten einer Vorlage"""
+    lines = script.split('\n')
+    for i, line in enumerate(lines):
+        if METER_LINE_RE.match(line):
+            fields = line.split(',')
+            if len(fields) > METER_NAME_FIELD:
+                fields[METER_NAME_FIELD] = ''
+                lines[i] = ','.join(fields)
+    return '\n'.join(lines)
+
+def substitutions(base, script):
+    """Zeilen, in denen sich ein Script von seiner Basis unterscheidet [[Zeilennummer, Zeile], ...]"""
+    return [[i, line] for i, (base_line, line) in enumerate(zip(base.split('\n'), script.split('\n')))
+            if line != base_line]
+
+def apply_substitutions(base, replacements):
+    """Setzt ein Script aus Basis und Ersetzungen wieder zusammen"""
+    lines = base.split('\n')
+    for i, line in replacements:
+        lines[i] = line
+    return '\n'.join(lines)
+
+def build_blob_store(entries, scripts_dir):
+    """Gruppiert die Scripts der Katalog-Einträge nach normalisiertem Inhalt
+
+    Gibt (Blobs {Pfad: Bytes}, Verweise {ID: {'blob', 'substitutions'}}, Index) zurück.
+    """
+    groups = {}
+    for entry in sorted(entries, key=lambda entry: entry['id']):
+        with open(os.path.join(scripts_dir, entry['filename']), 'rb') as f:
+            content = f.read()
+        script = content.decode('utf-8', errors='replace')
+        groups.setdefault(content_hash(normalized_body(script)), []).append((entry['id'], content, script))
+
+    files = {}
+    refs = {}
+    index = {}
+    for members in groups.values():
+        _, base_content, base = members[0]
+        key = blob_id(base_content)
+        files[f"{BLOBS_DIR}/{key}.txt"] = base_content
+        index[key] = {'size': len(base_content), 'aliases': [script_id for script_id, _, _ in members]}
+        for script_id, _, script in members:
+            refs[script_id] = {'blob': key}
+            replacements = substitutions(base, script)
+            if replacements:
+                refs[script_id]['substitutions'] = replacements
+
+    data = {'version': BLOB_INDEX_VERSION, 'blobs': dict(sorted(index.items()))}
+    return files, refs, data
+
+def store_stats(data, entries):
+    """Kennzahlen der Ablage: Anzahl Blobs und Bytes gegenüber einzelnen Dateien"""
+    return {
+        'scripts': len(entries),
+        'blobs': len(data['blobs']),
+        'shared': sum(1 for blob in data['blobs'].values() if len(blob['aliases']) > 1),
+        'script_bytes': sum(entry['size'] for entry in entries),
+        'blob_bytes': sum(blob['size'] for blob in data['blobs'].values()),
+    }
+
+def main():
+    """Zeigt die gemeinsam genutzten Blobs und prüft, ob sich alle Scripts wieder zusammensetzen lassen"""
+    tools_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Inhaltsadressierte Ablage der Smart Meter Scripts")
+    parser.add_argument('--api-dir', default=os.path.join(tools_dir, '..', 'api'))
+    args = parser.parse_args()
+
+    with open(os.path.join(args.api_dir, 'scripts.json'), 'r', encoding='utf-8') as f:
+        entries = json.load(f)['scripts']
+    with open(os.path.join(args.api_dir, BLOB_INDEX_FILE), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    stats = store_stats(data, entries)
+    print(f"{stats['scripts']} Scripts in {stats['blobs']} Blobs ({stats['shared']} gemeinsam genutzt), "
+          f"{stats['blob_bytes']:,} statt {stats['script_bytes']:,} B")
+    for key, blob in data['blobs'].items():
+        if len(blob['aliases']) > 1:
+            print(f"- {key}: {', '.join(blob['aliases'])}")
+
+    failed = 0
+    for entry in entries:
+        with open(os.path.join(args.api_dir, BLOBS_DIR, f"{entry['blob']}.txt"), 'rb') as f:
+            base = f.read().decode('utf-8', errors='replace')
+        script = apply_substitutions(base, entry.get('substitutions', []))
+        if content_hash(script) != entry['sha256']:
+            print(f"Fehler: {entry['id']} lässt sich nicht aus {entry['blob']} zusammensetzen")
+            failed += 1
+    print(f"{len(entries) - failed} von {len(entries)} Scripts aus Blobs zusammengesetzt")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+API-Generator für die Smart Meter Scripts
+
+Erzeugt aus einem Script-Verzeichnis (scripts/) die Dateien unter api/:
+
+- scripts.json / list.json            lesbar formatiert (wie bisher)
+- scripts.min.json / list.min.json    minifiziert, zusätzlich als .gz und .br (falls brotli installiert)
+- index.json                          Übersicht der Shards mit Anzahl Scripts
+- manufacturers/<Hersteller>.json     Liste nur der Scripts eines Herstellers
+- protocols/<Protokoll>.json          Liste nur der Scripts eines Protokolls
+- obis_index.json                     OBIS-Kennzahl -> Scripts (siehe obis_index.py), zusätzlich als .gz/.br
+- search_index.json                   Typeahead-Suchindex (siehe search_index.py), zusätzlich als .gz/.br
+- changes.json, changes/<Revision>.json  Änderungs-Feed: Index und ein Änderungssatz je Revision (siehe changes.py), zusätzlich als .gz/.br
+- blobs/<hash>.txt, blobs.json        inhaltsadressierte Ablage, gemeinsam genutzt von gleichen Scripts (siehe blobs.py)
+- minified/<Dateiname>                minifizierte Variante jedes Scripts für knappe Script-Puffer (siehe minifier.py)
+
+Jeder Eintrag enthält Größe und Inhalts-Hash des Scripts, damit Geräte nur die wenigen
+Bytes laden, die sie brauchen, und unveränderte Scripts überspringen können.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+from datetime import datetime
+
+# Optional: Brotli-Kompression, ohne das Modul werden nur .gz Dateien erzeugt
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from blobs import BLOB_INDEX_FILE, BLOBS_DIR, build_blob_store
+from changes import CHANGES_DIR, CHANGES_FILE, build_changes_data, changes_files, load_changes_data
+from descriptor_parser import parse_descriptor
+from minifier import MINIFIED_DIR, PLATFORM_BUDGETS, build_minified
+from obis_index import OBIS_INDEX_FILE, build_obis_data, load_obis_data
+from search_index import SEARCH_INDEX_FILE, build_search_data
+from storage import content_hash, write_if_changed
+
+API_VERSION = "1.1"
+RAW_BASE_URL = "https://raw.githubusercontent.com/iot-maker/tasmota-smart-meter-scripts/main"
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(TOOLS_DIR, '..', 'scripts')
+API_DIR = os.path.join(TOOLS_DIR, '..', 'api')
+
+# Manifest des Crawlers im Script-Verzeichnis (Gerätename + Protokoll je Datei)
+MANIFEST_FILE = ".manifest.json"
+
+# Länge des gekürzten Hashes in list.json und den Shards (16 Hex-Zeichen = 64 Bit)
+SHORT_HASH_LENGTH = 16
+
+# Herstellernamen aus mehreren Wörtern (sonst ist das erste Wort der Hersteller)
+MULTI_WORD_MANUFACTURERS = ('Landis + Gyr', 'Carlo Gavazzi')
+
+# Protokolle, die als Suffix in Anzeige- und Dateinamen vorkommen
+PROTOCOLS = ('SML', 'OBIS', 'MODBus', 'M-Bus', 'VBus', 'EBus', 'Kamstrup', 'Counter', 'Raw', 'PZEM', 'CANBus')
+
+PROTOCOL_SUFFIX_RE = re.compile(r'^(.*?)(?:_(%s))?$' % '|'.join(PROTOCOLS))
+DISPLAY_PROTOCOL_RE = re.compile(r'^(.*?)\s*\(([^()]+)\)$')
+
+def script_id(display_name):
+    """Datei-ID im Repo-Layout (z.B. "Landis + Gyr E220 (SML)" -> "Landis_Gyr_E220_SML")"""
+    return re.sub(r'[^A-Za-z0-9\-]+', '_', display_name).strip('_')
+
+def display_name_for(device_name, protocol):
+    """Anzeigename aus Gerätename und Protokoll (z.B. "EMH eHZ (SML)")"""
+    if protocol and protocol != 'Unknown':
+        return f"{device_name} ({protocol})"
+    return device_name
+
+def repo_filename(device_name, protocol):
+    """Dateiname im Repo-Layout (z.B. "EMH_eHZ_SML.txt")"""
+    return script_id(display_name_for(device_name, protocol)) + ".txt"
+
+def device_name_of(display_name):
+    """Gerätename ohne Protokoll-Suffix (z.B. "EMH eHZ (SML)" -> "EMH eHZ")"""
+    match = DISPLAY_PROTOCOL_RE.match(display_name)
+    if match and match.group(2) in PROTOCOLS:
+        return match.group(1)
+    return display_name
+
+def split_display_name(display_name):
+    """Zerlegt einen Anzeigenamen in (Hersteller, Modell)"""
+    match = DISPLAY_PROTOCOL_RE.match(display_name)
+    name = match.group(1) if match else display_name
+    for manufacturer in MULTI_WORD_MANUFACTURERS:
+        if name.startswith(manufacturer + ' '):
+            return manufacturer, name[len(manufacturer):].strip()
+    manufacturer, _, model = name.partition(' ')
+    return manufacturer, model
+
+def guess_display_name(filename):
+    """Anzeigename aus einem Dateinamen, wenn keine Metadaten vorliegen (z.B. "EMH_eHZ_SML.txt")"""
+    match = PROTOCOL_SUFFIX_RE.match(filename[:-4] if filename.endswith('.txt') else filename)
+    return display_name_for(match.group(1).replace('_', ' '), match.group(2))
+
+def load_display_names(scripts_dir, api_dir):
+    """Bekannte Anzeigenamen je Dateiname - aus dem Crawler-Manifest oder der bisherigen scripts.json
+    
+    Verwendet wird nur der Gerätename, das Protokoll-Suffix bestimmt build_entries() aus dem Script.
+    """
+    names = {}
+    try:
+        with open(os.path.join(api_dir, 'scripts.json'), 'r', encoding='utf-8') as f:
+            for entry in json.load(f).get('scripts', []):
+                names[entry['filename']] = entry['display_name']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    try:
+        with open(os.path.join(scripts_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            for filename, entry in json.load(f).get('files', {}).items():
+                names[filename] = display_name_for(entry['device_name'], entry['protocol'])
+    except (OSError, ValueError, KeyError):
+        pass
+    return names
+
+def build_entries(scripts_dir=SCRIPTS_DIR, api_dir=API_DIR, base_url=RAW_BASE_URL):
+    """Erstellt die Metadaten aller Scripts im Verzeichnis (sortiert nach Anzeigename)"""
+    names = load_display_names(scripts_dir, api_dir)
+    entries = []
+    for filename in os.listdir(scripts_dir):
+        if not filename.endswith('.txt'):
+            continue
+        with open(os.path.join(scripts_dir, filename), 'rb') as f:
+            content = f.read()
+
+        protocol = parse_descriptor(content.decode('utf-8', errors='replace')).protocol
+        # Das Protokoll im Namen folgt dem Script - ältere Namen in scripts.json tragen teils ein falsches
+        display_name = display_name_for(device_name_of(names.get(filename) or guess_display_name(filename)), protocol)
+        # ID und Dateiname folgen demselben Anzeigenamen wie im Crawler (repo_filename) - sonst umbenennen
+        if script_id(display_name) + '.txt' != filename:
+            print(f"Warnung: {filename} passt nicht zu \"{display_name}\", erwartet {script_id(display_name)}.txt")
+        manufacturer, model = split_display_name(display_name)
+        entries.append({
+            'id': filename[:-4],
+            'display_name': display_name,
+            'filename': filename,
+            'manufacturer': manufacturer,
+            'model': model,
+            'protocol': protocol,
+            'size': len(content),
+            'sha256': content_hash(content),
+            'url': f"{base_url}/scripts/{filename}",
+        })
+
+    entries.sort(key=lambda entry: (entry['display_name'].lower(), entry['filename']))
+    return entries
+
+def list_entry(entry):
+    """Kompakter Listeneintrag für Dropdown-Menüs auf dem Gerät"""
+    return {
+        'name': entry['display_name'],
+        'filename': entry['filename'],
+        'size': entry['size'],
+        'hash': entry['sha256'][:SHORT_HASH_LENGTH],
+    }
+
+def dump_json(data, minified=False):
+    """JSON als Bytes - lesbar formatiert oder ohne Leerzeichen"""
+    if minified:
+        text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    else:
+        text = json.dumps(data, ensure_ascii=False, indent=2) + '\n'
+    return text.encode('utf-8')
+
+def compressed_variants(content):
+    """Vorkomprimierte Varianten {Endung: Bytes} - deterministisch, damit unveränderte Daten nicht neu geschrieben werden"""
+    variants = {'.gz': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content, quality=11)
+    return variants
+
+def build_shards(entries, key):
+    """Gruppiert Listeneinträge nach Hersteller oder Protokoll {Shard-ID: (Name, Einträge)}
+
+    Shard-IDs sind kleingeschrieben, damit "Huawei" und "HUAWEI" auch auf Dateisystemen ohne
+    Groß-/Kleinschreibung nicht kollidieren.
+    """
+    shards = {}
+    for entry in entries:
+        name = entry[key]
+        shards.setdefault(script_id(name).lower(), (name, []))[1].append(list_entry(entry))
+    return shards
+
+def load_previous_scripts(api_dir):
+    """Lädt die bisherige scripts.json (Revision, Zeitstempel, Einträge) - None, wenn es keine gibt"""
+    try:
+        with open(os.path.join(api_dir, 'scripts.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def build_api(entries, api_dir=API_DIR, scripts_dir=SCRIPTS_DIR):
+    """Erstellt alle API-Dateien als {relativer Pfad: Bytes} - gibt (Dateien, neu geparste Scripts für den OBIS-Index, Revision) zurück"""
+    # Jeder Eintrag verweist auf seinen Blob (plus Ersetzungen, falls er eine Variante ist)
+    blob_files, blob_refs, blob_data = build_blob_store(entries, scripts_dir)
+    # Minifizierte Variante mit Größe und passender Variante je Plattform (ESP8266, ESP32)
+    minified_files, minified_refs = build_minified(entries, scripts_dir)
+    entries = [dict(entry, **blob_refs[entry['id']], **minified_refs[entry['id']]) for entry in entries]
+
+    # Revision und Zeitstempel ändern sich nur, wenn sich ein Eintrag geändert hat
+    previous = load_previous_scripts(api_dir)
+    now = datetime.now().isoformat()
+    changes_data, changed = build_changes_data(previous, entries, load_changes_data(api_dir), now)
+    revision = changes_data['revision']
+    generated = now if changed or previous.get('version') != API_VERSION else previous.get('generated', now)
+
+    full = {'version': API_VERSION, 'revision': revision, 'generated': generated,
+            'total_scripts': len(entries), 'scripts': entries}
+    simple = {'version': API_VERSION, 'scripts': [list_entry(entry) for entry in entries]}
+
+    files = {
+        'scripts.json': dump_json(full),
+        'list.json': dump_json(simple),
+    }
+    for name, data in (('scripts', full), ('list', simple)):
+        minified = dump_json(data, minified=True)
+        files[f"{name}.min.json"] = minified
+        for extension, content in compressed_variants(minified).items():
+            files[f"{name}.min.json{extension}"] = content
+
+    index = {'version': API_VERSION, 'revision': revision, 'total_scripts': len(entries)}
+    for directory, key in (('manufacturers', 'manufacturer'), ('protocols', 'protocol')):
+        index[directory] = []
+        for shard_id, (name, shard_entries) in sorted(build_shards(entries, key).items()):
+            path = f"{directory}/{shard_id}.json"
+            files[path] = dump_json({'version': API_VERSION, key: name, 'scripts': shard_entries}, minified=True)
+            index[directory].append({'name': name, 'file': path, 'count': len(shard_entries)})
+    files['index.json'] = dump_json(index, minified=True)
+
+    obis_data, parsed = build_obis_data(entries, scripts_dir, load_obis_data(api_dir))
+    files[OBIS_INDEX_FILE] = dump_json(obis_data, minified=True)
+    files[SEARCH_INDEX_FILE] = dump_json(build_search_data(entries), minified=True)
+    feed = {path: dump_json(data, minified=True) for path, data in changes_files(changes_data).items()}
+    files.update(feed)
+    files[BLOB_INDEX_FILE] = dump_json(blob_data, minified=True)
+    files.update(blob_files)
+    files.update(minified_files)
+    for path in (OBIS_INDEX_FILE, SEARCH_INDEX_FILE, *feed):
+        for extension, content in compressed_variants(files[path]).items():
+            files[path + extension] = content
+    return files, parsed, revision
+
+def write_api(files, api_dir=API_DIR):
+    """Schreibt die API-Dateien inkrementell und entfernt veraltete Shards bzw. .br Dateien"""
+    written = []
+    for path, content in sorted(files.items()):
+        filepath = os.path.join(api_dir, path)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        if write_if_changed(filepath, content):
+            written.append(path)
+
+    # Generierte Dateien, die es nicht mehr gibt (Shards verschwundener Hersteller, alte Änderungssätze, .br ohne brotli)
+    removed = []
+    for directory in ('', 'manufacturers', 'protocols', CHANGES_DIR, BLOBS_DIR, MINIFIED_DIR):
+        full_dir = os.path.join(api_dir, directory)
+        if not os.path.isdir(full_dir):
+            continue
+        for name in os.listdir(full_dir):
+            path = f"{directory}/{name}" if directory else name
+            generated = directory or name.endswith(('.min.json', '.gz', '.br'))
+            if generated and path not in files and os.path.isfile(os.path.join(full_dir, name)):
+                os.remove(os.path.join(full_dir, name))
+                removed.append(path)
+    return written, removed
+
+def generate_api(scripts_dir=SCRIPTS_DIR, api_dir=API_DIR, base_url=RAW_BASE_URL):
+    """Generiert alle API-Dateien aus dem Script-Verzeichnis - gibt Statistiken zurück"""
+    entries = build_entries(scripts_dir, api_dir, base_url)
+    files, obis_parsed, revision = build_api(entries, api_dir, scripts_dir)
+    written, removed = write_api(files, api_dir)
+    return {
+        'scripts': len(entries),
+        'script_bytes': sum(entry['size'] for entry in entries),
+        'revision': revision,
+        'obis_parsed': obis_parsed,
+        'files': len(files),
+        'written': written,
+        'removed': removed,
+        'sizes': {path: len(content) for path, content in files.items()},
+    }
+
+def main():
+    """Generiert api/ aus scripts/ und berichtet die Dateigrößen"""
+    parser = argparse.ArgumentParser(description="Generiert die API-Dateien aus den Smart Meter Scripts")
+    parser.add_argument('--scripts-dir', default=SCRIPTS_DIR)
+    parser.add_argument('--api-dir', default=API_DIR)
+    parser.add_argument('--base-url', default=RAW_BASE_URL, help="Basis-URL für die Script-Downloads")
+    args = parser.parse_args()
+
+    result = generate_api(args.scripts_dir, args.api_dir, args.base_url)
+    sizes = result['sizes']
+
+    print(f"{result['scripts']} Scripts, {result['files']} API-Dateien "
+          f"({len(result['written'])} geschrieben, {len(result['removed'])} entfernt)")
+    if brotli is None:
+        print("Hinweis: brotli nicht installiert - es werden nur .gz Dateien erzeugt")
+    for name in ('scripts', 'list'):
+        variants = [f"{name}.json", f"{name}.min.json", f"{name}.min.json.gz", f"{name}.min.json.br"]
+        print("  " + ", ".join(f"{path}: {sizes[path]:,} B" for path in variants if path in sizes))
+
+    print(f"  {OBIS_INDEX_FILE}: {sizes[OBIS_INDEX_FILE]:,} B ({result['obis_parsed']} Scripts neu geparst)")
+    print(f"  {SEARCH_INDEX_FILE}: {sizes[SEARCH_INDEX_FILE]:,} B, .gz: {sizes[SEARCH_INDEX_FILE + '.gz']:,} B")
+    changesets = [size for path, size in sizes.items() if path.startswith(CHANGES_DIR + '/') and path.endswith('.json')]
+    print(f"  {CHANGES_FILE}: Revision {result['revision']}, {sizes[CHANGES_FILE]:,} B, .gz: {sizes[CHANGES_FILE + '.gz']:,} B, "
+          f"{len(changesets)} Änderungssätze in {CHANGES_DIR}/ ({sum(changesets):,} B)")
+    blob_sizes = [size for path, size in sizes.items() if path.startswith(BLOBS_DIR + '/')]
+    print(f"  {BLOBS_DIR}/: {len(blob_sizes)} Blobs für {result['scripts']} Scripts, {sum(blob_sizes):,} B")
+    minified_sizes = [size for path, size in sizes.items() if path.startswith(MINIFIED_DIR + '/')]
+    too_large = sum(1 for size in minified_sizes if size > PLATFORM_BUDGETS['esp8266'])
+    print(f"  {MINIFIED_DIR}/: {sum(minified_sizes):,} statt {result['script_bytes']:,} B, "
+          f"{too_large} Scripts auch minifiziert zu groß für ESP8266 ({PLATFORM_BUDGETS['esp8266']:,} B)")
+    shards = [size for path, size in sizes.items() if path.startswith(('manufacturers/', 'protocols/'))]
+    if shards:
+        print(f"  {len(shards)} Shards, {min(shards):,} - {max(shards):,} B (Median {sorted(shards)[len(shards) // 2]:,} B)")
+
+if __name__ == "__main__":
+    main()
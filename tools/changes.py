@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Änderungs-Feed: welche Scripts haben sich seit Revision N geändert?
+
+Jede Generierung, die am Katalog etwas ändert, erhöht die Revision (scripts.json, index.json)
+um eins und legt den Änderungssatz als eigene Datei api/changes/<Revision>.json ab:
+
+    {"revision": 8, "generated": "...",
+     "added":    [{"id": "EMH_eHZ_SML", "sha256": "...", "size": 247}],
+     "modified": [...],
+     "removed":  [{"id": "...", "sha256": "<letzter Hash>", "size": ...}]}
+
+api/changes.json ist nur der Index: aktuelle Revision, "since" und je Revision die Anzahl
+der Änderungen und die Datei. Ein Client mit Revision N lädt den Index, dann nur die
+Änderungssätze nach N und danach die Scripts aus added/modified (Dateiname: <id>.txt) bzw.
+nur die Blobs, die er noch nicht hat (siehe blobs.py). Ist N älter als "since", reicht der
+Feed nicht zurück und der Client lädt scripts.json vollständig.
+"""
+
+import argparse
+import json
+import os
+
+CHANGES_FILE = "changes.json"
+CHANGES_DIR = "changes"
+CHANGES_VERSION = 2
+
+# Anzahl aufbewahrter Änderungssätze - ältere Clients synchronisieren vollständig
+MAX_REVISIONS = 100
+
+def changeset_path(revision):
+    """Pfad eines Änderungssatzes relativ zu api/ (z.B. "changes/8.json")"""
+    return f"{CHANGES_DIR}/{revision}.json"
+
+def changes_files(data):
+    """Index und Änderungssätze des Feeds als {relativer Pfad: Daten}"""
+    index = {'version': data['version'], 'revision': data['revision'], 'since': data['since'], 'revisions': []}
+    files = {CHANGES_FILE: index}
+    for changeset in data['revisions']:
+        path = changeset_path(changeset['revision'])
+        files[path] = changeset
+        index['revisions'].append({'revision': changeset['revision'], 'generated': changeset['generated'],
+                                   'added': len(changeset['added']), 'modified': len(changeset['modified']),
+                                   'removed': len(changeset['removed']), 'file': path})
+    return files
+
+def load_changes_data(api_dir):
+    """Lädt den bisherigen Feed (Index und alle Änderungssätze) aus api/ - bei fehlender Datei oder anderer Version None"""
+    try:
+        with open(os.path.join(api_dir, CHANGES_FILE), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') != CHANGES_VERSION:
+            return None
+        revisions = []
+        for summary in index['revisions']:
+            with open(os.path.join(api_dir, summary['file']), 'r', encoding='utf-8') as f:
+                revisions.append(json.load(f))
+    except (OSError, ValueError, KeyError):
+        # Ohne lückenlose Änderungssätze beginnt der Feed bei der aktuellen Revision neu
+        return None
+    return dict(index, revisions=revisions)
+
+def change_entry(entry):
+    """Eintrag eines Scripts im Feed: ID, Inhalts-Hash, Größe, Blob (siehe blobs.py) und minifizierte Variante"""
+    change = {'id': entry['id'], 'sha256': entry['sha256'], 'size': entry['size']}
+    for key in ('blob', 'substitutions', 'minified_sha256', 'minified_size'):
+        if key in entry:
+            change[key] = entry[key]
+    return change
+
+def diff_entries(old_entries, new_entries):
+    """Vergleicht zwei Katalogstände - gibt (hinzugefügt, geändert, entfernt) sortiert nach ID zurück
+
+    Als geändert zählt jeder Eintrag mit anderen Metadaten, auch wenn der Hash gleich bleibt
+    (z.B. korrigierter Anzeigename).
+    """
+    old = {entry['id']: entry for entry in old_entries}
+    new = {entry['id']: entry for entry in new_entries}
+    added = [change_entry(new[script_id]) for script_id in sorted(new) if script_id not in old]
+    modified = [change_entry(new[script_id]) for script_id in sorted(new)
+                if script_id in old and old[script_id] != new[script_id]]
+    removed = [change_entry(old[script_id]) for script_id in sorted(old) if script_id not in new]
+    return added, modified, removed
+
+def build_changes_data(previous_scripts, entries, previous, generated):
+    """Erstellt den Feed für den aktuellen Katalog - gibt (Feed, geändert) zurück
+
+    previous_scripts ist die bisherige scripts.json (oder None). Ihre Revision ist maßgeblich:
+    Änderungssätze im alten Feed, die darüber hinausgehen (abgebrochener Lauf), werden verworfen.
+    """
+    if previous_scripts is None or 'revision' not in previous_scripts:
+        # Erster Lauf (oder scripts.json ohne Revision): Startpunkt ohne Änderungssätze
+        return {'version': CHANGES_VERSION, 'revision': 1, 'since': 1, 'revisions': []}, True
+
+    revision = previous_scripts['revision']
+    if previous is None:
+        since, history = revision, []
+    else:
+        since = min(previous['since'], revision)
+        history = [changeset for changeset in previous['revisions'] if changeset['revision'] <= revision]
+
+    added, modified, removed = diff_entries(previous_scripts.get('scripts', []), entries)
+    changed = bool(added or modified or removed)
+    if changed:
+        revision += 1
+        history.append({'revision': revision, 'generated': generated,
+                        'added': added, 'modified': modified, 'removed': removed})
+        if len(history) > MAX_REVISIONS:
+            history = history[-MAX_REVISIONS:]
+            since = history[0]['revision'] - 1
+
+    return {'version': CHANGES_VERSION, 'revision': revision, 'since': since, 'revisions': history}, changed
+
+def changes_since(data, revision):
+    """Zusammengefasste Änderungen seit einer Revision {'added', 'modified', 'removed'}
+
+    Gibt None zurück, wenn der Feed nicht so weit zurückreicht (vollständig synchronisieren).
+    """
+    if revision < data['since'] or revision > data['revision']:
+        return None
+
+    # Je Script die bisherige Art der Änderung und der letzte Stand
+    state = {}
+    for changeset in data['revisions']:
+        if changeset['revision'] <= revision:
+            continue
+        for kind in ('added', 'modified', 'removed'):
+            for entry in changeset[kind]:
+                net = state[entry['id']][0] if entry['id'] in state else kind
+                if net == 'added' and kind == 'removed':
+                    # Nach der Revision des Clients hinzugefügt und wieder entfernt: nichts zu tun
+                    del state[entry['id']]
+                elif kind == 'removed':
+                    state[entry['id']] = ('removed', entry)
+                elif net == 'removed':
+                    # Entfernt und wieder hinzugefügt: für den Client eine Änderung
+                    state[entry['id']] = ('modified', entry)
+                else:
+                    state[entry['id']] = (net, entry)
+
+    result = {'added': [], 'modified': [], 'removed': []}
+    for script_id in sorted(state):
+        kind, entry = state[script_id]
+        result[kind].append(entry)
+    return result
+
+def main():
+    """Zeigt die Änderungen seit einer Revision an"""
+    default_api_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api')
+    parser = argparse.ArgumentParser(description="Welche Scripts haben sich seit einer Revision geändert?")
+    parser.add_argument('revision', type=int, help="Revision des Clients")
+    parser.add_argument('--api-dir', default=default_api_dir)
+    args = parser.parse_args()
+
+    data = load_changes_data(args.api_dir)
+    if data is None:
+        parser.error(f"Kein {CHANGES_FILE} in {args.api_dir}")
+    changes = changes_since(data, args.revision)
+    if changes is None:
+        print(f"Revision {args.revision} ist nicht im Feed (ab {data['since']} bis {data['revision']}) - vollständig synchronisieren")
+        return
+
+    print(f"Revision {args.revision} -> {data['revision']}: "
+          + ", ".join(f"{len(changes[kind])} {kind}" for kind in ('added', 'modified', 'removed')))
+    for kind, sign in (('added', '+'), ('modified', '~'), ('removed', '-')):
+        for entry in changes[kind]:
+            print(f"{sign} {entry['id']}.txt  {entry['sha256'][:16]}  {entry['size']:,} B")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Parser für Tasmota Smart Meter Descriptors
+
+Zerlegt ein Script in Sektionen (>D, >B, >M, ...), Zählerdefinitionen
+(+<n>,<rx>,<typ>,<flag>,<baud>,<name>,...) und Wertzeilen
+(<n>,<code>@<skalierung>,<label>,<einheit>,<variable>,<nachkommastellen>).
+Das Ergebnis ist ein kompakter, typisierter AST aus __slots__-Objekten.
+"""
+
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Zählertyp (erstes Zeichen des Typ-Felds) -> Protokoll
+METER_TYPES = {
+    's': 'SML',
+    'o': 'OBIS',
+    'm': 'MODBus',
+    'M': 'MODBus',
+    'k': 'Kamstrup',
+    'v': 'VBus',
+    'e': 'EBus',
+    'c': 'Counter',
+    'C': 'Counter',
+    'p': 'PZEM',
+    'r': 'Raw',
+    'R': 'Raw',
+}
+
+METER_RE = re.compile(r'\+(\d+),')
+VALUE_RE = re.compile(r'(\d+),(.*)|%(\w+)%(.*)')
+SECTION_RE = re.compile(r'>([A-Za-z]+)\s*(.*)')
+SERIAL_MODE_RE = re.compile(r'([A-Za-z])([NEO][12])?$')
+COMMENT_RE = re.compile(r'\s;\s?')
+SML_OBIS_RE = re.compile(r'7707([0-9a-fA-F]{12})')
+ASCII_OBIS_RE = re.compile(r'(?:(\d+)-(\d+):)?([0-9A-Za-z]+)\.(\d+)\.(\d+)(?:\*(\d+))?(?:\(|$)')
+TEXT_OBIS_RE = re.compile(r'(?:(\d+)-(\d+):)?(\d+|[A-Z])\.(\d+)\.(\d+)(?:\*(\d+))?$')
+
+class Section:
+    """Script-Sektion wie >D, >B oder >M mit Argumenten und Zeilen"""
+    __slots__ = ('name', 'args', 'lines')
+
+    def __init__(self, name, args=''):
+        self.name = name
+        self.args = args
+        self.lines = []
+
+    def __repr__(self):
+        return f"Section({self.name!r}, {len(self.lines)} Zeilen)"
+
+class Meter:
+    """Zählerdefinition +<n>,<rx>,<typ>,<flag>,<baud>,<name>{,<tx>,<intervall>,<telegramme>}"""
+    __slots__ = ('index', 'rx_pin', 'type', 'serial_mode', 'flag', 'baud', 'name',
+                 'tx_pin', 'tx_period', 'commands', 'protocol')
+
+    def __init__(self, index, rx_pin, type, serial_mode, flag, baud, name,
+                 tx_pin=None, tx_period=None, commands=()):
+        self.index = index
+        self.rx_pin = rx_pin
+        self.type = type
+        self.serial_mode = serial_mode
+        self.flag = flag
+        self.baud = baud
+        self.name = name
+        self.tx_pin = tx_pin
+        self.tx_period = tx_period
+        self.commands = tuple(commands)
+        self.protocol = classify_meter(type, name, self.commands, serial_mode, baud)
+
+    def __repr__(self):
+        return f"Meter({self.index}, {self.protocol}, rx={self.rx_pin}, baud={self.baud}, {self.name!r})"
+
+class Value:
+    """Wertzeile <n>,<code>@<skalierung>,<label>,<einheit>,<variable>,<nachkommastellen>"""
+    __slots__ = ('meter', 'code', 'scale', 'label', 'unit', 'var', 'precision', 'obis', 'comment')
+
+    def __init__(self, meter, code, scale, label, unit, var, precision, obis=None, comment=None):
+        self.meter = meter
+        self.code = code
+        self.scale = scale
+        self.label = label
+        self.unit = unit
+        self.var = var
+        self.precision = precision
+        self.obis = obis
+        self.comment = comment
+
+    def __repr__(self):
+        return f"Value({self.meter}, {self.obis or self.code!r}, {self.label!r}, {self.unit!r})"
+
+class Directive:
+    """Sonderzeile <n>,=<art>... (z.B. =h Text, =so Optionen, =m Berechnung)"""
+    __slots__ = ('meter', 'kind', 'text')
+
+    def __init__(self, meter, kind, text):
+        self.meter = meter
+        self.kind = kind
+        self.text = text
+
+    def __repr__(self):
+        return f"Directive({self.meter}, {self.kind!r})"
+
+class Descriptor:
+    """Geparstes Script: Sektionen, Zähler, Wertzeilen und nicht erkannte Zeilen"""
+    __slots__ = ('sections', 'meter_count', 'meters', 'values', 'directives', 'errors')
+
+    def __init__(self):
+        self.sections = []
+        self.meter_count = None
+        self.meters = []
+        self.values = []
+        self.directives = []
+        self.errors = []
+
+    @property
+    def protocol(self):
+        """Protokoll des Scripts oder 'Unknown'
+
+        Maßgeblich ist der erste Zähler, der kein einfacher Impulszähler ist (z.B. COMBO: 2x Counter + SML).
+        """
+        for meter in self.meters:
+            if meter.protocol != 'Counter':
+                return meter.protocol
+        return self.meters[0].protocol if self.meters else 'Unknown'
+
+    @property
+    def obis_codes(self):
+        """Alle normalisierten OBIS-Codes der Wertzeilen"""
+        return [value.obis for value in self.values if value.obis]
+
+    def section(self, name):
+        """Erste Sektion mit dem Namen (z.B. 'M') oder None"""
+        for section in self.sections:
+            if section.name == name:
+                return section
+        return None
+
+    def __repr__(self):
+        return f"Descriptor({self.protocol}, {len(self.meters)} Zähler, {len(self.values)} Werte)"
+
+def classify_meter(meter_type, name='', commands=(), serial_mode=None, baud=None):
+    """Ordnet einem Zählertyp ein Protokoll zu"""
+    protocol = METER_TYPES.get(meter_type[:1], 'Unknown')
+    if protocol == 'Raw':
+        # Rohdaten mit M-Bus Kurztelegrammen (10 ... 16) oder 2400 Baud 8E1 sind M-Bus Zähler
+        if ('mbus' in name.lower() or (serial_mode == 'E1' and baud == 2400)
+                or any(cmd.startswith('10') and cmd.endswith('16') for cmd in commands)):
+            return 'M-Bus'
+    return protocol
+
+def to_int(value):
+    """Wandelt Ganzzahlen um, alles andere wird None"""
+    value = value.strip()
+    return int(value) if value.isdigit() else None
+
+def normalize_obis(code):
+    """Normalisiert OBIS-Kennzahlen auf 'C.D.E' (z.B. 77070100010800ff, 1-0:1.8.0*255( -> 1.8.0)
+
+    Gibt (kurz, voll) zurück; voll ist 'A-B:C.D.E*F' soweit bekannt. Unbekannte Codes liefern (None, None).
+    """
+    match = SML_OBIS_RE.match(code)
+    if match:
+        a, b, c, d, e, f = (int(match.group(1)[i:i + 2], 16) for i in range(0, 12, 2))
+        return f"{c}.{d}.{e}", f"{a}-{b}:{c}.{d}.{e}*{f}"
+
+    match = ASCII_OBIS_RE.match(code)
+    if match:
+        a, b, c, d, e, f = match.groups()
+        if c.isdigit():
+            c = str(int(c))
+        short = f"{c}.{int(d)}.{int(e)}"
+        full = short
+        if a is not None:
+            full = f"{int(a)}-{int(b)}:{short}"
+        if f is not None:
+            full += f"*{int(f)}"
+        return short, full
+    return None, None
+
+def parse_meter(line):
+    """Parst eine Zählerdefinition +<n>,... oder gibt None zurück"""
+    fields = line[1:].split(',')
+    if len(fields) < 6:
+        return None
+
+    meter_type = fields[2].strip()
+    mode = SERIAL_MODE_RE.match(meter_type)
+    serial_mode = mode.group(2) if mode else None
+
+    commands = [field.strip() for field in fields[8:] if field.strip()]
+    return Meter(
+        index=to_int(fields[0]),
+        rx_pin=to_int(fields[1]),
+        type=meter_type[:1],
+        serial_mode=serial_mode,
+        flag=to_int(fields[3]),
+        baud=to_int(fields[4]),
+        name=fields[5].strip(),
+        tx_pin=to_int(fields[6]) if len(fields) > 6 else None,
+        tx_period=to_int(fields[7]) if len(fields) > 7 else None,
+        commands=commands,
+    )
+
+def parse_value(meter, rest):
+    """Parst den Teil einer Wertzeile nach dem Zählerindex"""
+    if rest.startswith('='):
+        kind = re.match(r'=([A-Za-z]*)', rest).group(1)[:1]
+        return Directive(meter, kind, rest)
+
+    comment = None
+    parts = COMMENT_RE.split(rest, 1)
+    if len(parts) == 2:
+        rest, comment = parts[0], parts[1].strip()
+
+    if '@' in rest:
+        code, tail = rest.split('@', 1)
+        fields = tail.split(',')
+        scale = fields[0]
+    else:
+        fields = rest.split(',')
+        code, scale = fields[0], None
+
+    fields += [''] * (5 - len(fields))
+    obis, _ = normalize_obis(code)
+    return Value(
+        meter=meter,
+        code=code,
+        scale=scale,
+        label=fields[1].strip(),
+        unit=fields[2].strip(),
+        var=fields[3].strip(),
+        precision=to_int(fields[4]),
+        obis=obis,
+        comment=comment,
+    )
+
+def parse_descriptor(script):
+    """Parst ein Tasmota Script in einen Descriptor-AST"""
+    descriptor = Descriptor()
+    section = None
+    in_meter_block = False
+    last_value = None
+
+    for number, line in enumerate(script.split('\n'), 1):
+        line = line.strip()
+        # Leerzeilen und Kommentare (// und ;) gehören nicht zum Descriptor
+        if not line or line.startswith('//') or line.startswith(';'):
+            continue
+
+        match = SECTION_RE.match(line)
+        if match and not line.startswith('>='):
+            section = Section(match.group(1), match.group(2).strip())
+            descriptor.sections.append(section)
+            in_meter_block = section.name == 'M'
+            # Ein Label kann nicht über eine Sektionsgrenze umbrechen
+            last_value = None
+            if in_meter_block:
+                descriptor.meter_count = to_int(section.args.split(' ')[0]) if section.args else None
+            continue
+
+        if section is not None:
+            section.lines.append(line)
+
+        if not in_meter_block:
+            continue
+
+        if line == '#':
+            in_meter_block = False
+            continue
+
+        if METER_RE.match(line):
+            meter = parse_meter(line)
+            if meter:
+                descriptor.meters.append(meter)
+            else:
+                descriptor.errors.append((number, line))
+            last_value = None
+            continue
+
+        match = VALUE_RE.match(line)
+        if match:
+            if match.group(1) is not None:
+                meter, rest = int(match.group(1)), match.group(2)
+            else:
+                # Zählerindex aus einer Script-Variable, z.B. %r%x24UUuu@1,...
+                meter, rest = f"%{match.group(3)}%", match.group(4)
+            node = parse_value(meter, rest)
+            if isinstance(node, Directive):
+                descriptor.directives.append(node)
+                last_value = None
+            else:
+                descriptor.values.append(node)
+                last_value = (meter, rest)
+            continue
+
+        if last_value and len(section.lines) >= 2:
+            # Umgebrochenes Label ("...@1,Phaseangle" / "I-L1/U-L1,deg,...") mit der Vorzeile zusammenführen
+            meter, rest = last_value
+            rest = f"{rest} {line}"
+            section.lines.pop()
+            section.lines[-1] = f"{section.lines[-1]} {line}"
+            descriptor.values[-1] = parse_value(meter, rest)
+            last_value = (meter, rest)
+            continue
+
+        descriptor.errors.append((number, line))
+
+    return descriptor
+
+def parse_file(path):
+    """Liest und parst eine Script-Datei - gibt (Dateiname, Descriptor, Bytes) zurück"""
+    with open(path, 'r', encoding='utf-8') as f:
+        script = f.read()
+    return os.path.basename(path), parse_descriptor(script), len(script.encode('utf-8'))
+
+def parse_corpus(paths, workers=None, chunksize=None):
+    """Parst viele Script-Dateien parallel in einem Prozess-Pool (seriell bei nur einem Prozess)"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < 2:
+        return [parse_file(path) for path in paths]
+    # Wenige große Blöcke je Prozess halten den Pickle-Overhead klein
+    chunksize = chunksize or max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(parse_file, paths, chunksize=chunksize))
+
+def main():
+    """Parst alle Scripts in scripts/ und berichtet Durchsatz und Protokoll-Klassifikation"""
+    default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
+    parser = argparse.ArgumentParser(description="Parst alle Tasmota Smart Meter Scripts")
+    parser.add_argument('scripts_dir', nargs='?', default=default_dir)
+    parser.add_argument('--workers', type=int, default=None, help="Anzahl Prozesse (Standard: CPU-Kerne)")
+    args = parser.parse_args()
+
+    paths = sorted(os.path.join(args.scripts_dir, name)
+                   for name in os.listdir(args.scripts_dir) if name.endswith('.txt'))
+
+    start = time.perf_counter()
+    results = parse_corpus(paths, args.workers)
+    parse_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    protocols = {}
+    for _, descriptor, _ in results:
+        protocols[descriptor.protocol] = protocols.get(descriptor.protocol, 0) + 1
+    classify_time = time.perf_counter() - start
+
+    total_bytes = sum(size for _, _, size in results)
+    total_values = sum(len(descriptor.values) for _, descriptor, _ in results)
+    total_errors = sum(len(descriptor.errors) for _, descriptor, _ in results)
+
+    print(f"{len(results)} Scripts, {total_bytes / 1024:.0f} KiB, {total_values} Wertzeilen, {total_errors} unbekannte Zeilen")
+    print(f"Parsen:         {parse_time * 1000:8.1f} ms ({len(results) / parse_time:,.0f} Scripts/s, "
+          f"{total_bytes / 1024 / 1024 / parse_time:.1f} MiB/s)")
+    print(f"Klassifikation: {classify_time * 1000:8.3f} ms ({len(results) / max(classify_time, 1e-9):,.0f} Scripts/s)")
+    print("\nProtokolle:")
+    for protocol, count in sorted(protocols.items(), key=lambda item: -item[1]):
+        print(f"- {protocol}: {count} Scripts")
+
+if __name__ == "__main__":
+    main()
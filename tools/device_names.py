@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Gerätenamen-Normalisierung für Smart Meter Scripts
+
+Erkennt Hersteller und Modell in Überschriften ("Landis+Gyr E220 (SML)" -> "Landis + Gyr E220").
+Die Regeln werden einmal kompiliert, Ergebnisse per LRU-Cache wiederverwendet.
+"""
+
+import re
+from functools import lru_cache
+
+# Alle Landis+Gyr Varianten ("Landis+Gyr", "Landis Gyr", "Gyr" allein) -> "Landis + Gyr"
+LANDIS_GYR_PATTERN = r'\bLandis(?:\+|\s+)Gyr\b|(?<!\+\s)\bGyr\b'
+
+# Verbesserte Regex Patterns für Geräte-Erkennung
+NAME_PATTERNS = [
+    # Pattern 1: Vollständiger Herstellername + vollständiger Modellname (z.B. "Engelmann SensoStar E", "Carlo Gavazzi EM340", "Landis + Gyr E220", "EMH eHZ")
+    r'([A-Za-z][a-zA-Z]*(?:\s*[\+\-\&]\s*[A-Za-z][a-zA-Z]*|\s+[A-Za-z][a-zA-Z]*)*)\s+([A-Za-z][a-zA-Z0-9]*(?:[A-Z0-9\-\.\/\+]*[A-Z0-9])?)',
+    # Pattern 2: Abkürzung + Vollständiger Modellname (z.B. "eBZ DD3", "EFR SGM-C2")
+    r'([a-zA-Z]{2,})\s+([A-Za-z0-9][A-Z0-9\-\.\s/]*[A-Z0-9])',
+    # Pattern 3: Hersteller + Modell mit Zahlen (z.B. "Iskra MT681", "DZG DWS7410")
+    r'([A-Za-z][a-zA-Z]*)\s+([A-Za-z]*[A-Z]*\d+[A-Z0-9\-\.\s/]*)',
+    # Pattern 4: Fallback für kürzere Namen (mindestens 3 Zeichen Modell)
+    r'([A-Za-z][a-zA-Z]+)\s+([A-Za-z0-9]{3,}[A-Z0-9\-\.\s/]*)',
+    # Pattern 5: Spezialfall für abgekürzte Herstellernamen (z.B. "Engelmann Se", "Resol De")
+    r'([A-Za-z][a-zA-Z]+)\s+([A-Za-z][a-z])\b',
+]
+
+# Spezialbehandlung für abgekürzte Herstellernamen
+ABBREVIATION_MAPPING = {
+    'Se': 'SensoStar',
+    'De': 'DeltaSol',
+    'Po': 'Pollucom F'
+}
+
+# Überschriften mit diesen Wörtern sind Beschreibungen, keine Gerätenamen
+EXCLUDED_WORDS = ('script', 'view', 'example', 'alternative')
+
+# Platzhalter statt echter Modellnamen
+PLACEHOLDER_MODELS = {'xxx', 'tbd', 'etc', 'und'}
+
+# Reduzierte Spezialbehandlung nur für echte Edge Cases
+SPECIAL_CASES = {
+    # Komplexe Überschriften mit Zusatzinformationen
+    'sensus pollucom': 'Sensus Pollucom F',
+    # Vollständige Produktnamen, die nicht aus dem Text extrahiert werden können
+    'huawei r4850': 'HUAWEI R4850G2',
+    # Einzelwort-Geräte ohne expliziten Hersteller
+    'ehzb': 'EMH eHZB',  # Elektronischer Haushaltszähler Version B
+}
+
+# Kurzschreibweisen in Suchanfragen ("L+G E220")
+SEARCH_ALIASES = {
+    r'\bl\s*[\+&]\s*g\b': 'Landis + Gyr',
+}
+
+NAME_CACHE_SIZE = 4096
+
+class DeviceNameNormalizer:
+    """Extrahiert normalisierte Gerätenamen aus Überschriften - Regeln einmal kompiliert, Ergebnisse gecacht"""
+
+    def __init__(self, cache_size=NAME_CACHE_SIZE):
+        self.landis_gyr = re.compile(LANDIS_GYR_PATTERN, re.IGNORECASE)
+        self.patterns = [re.compile(pattern) for pattern in NAME_PATTERNS]
+        self.separators = re.compile(r'[\s\-\.]')
+        self.extra_detail = re.compile(r'([a-z0-9\-\.]+)')
+        self.search_aliases = [(re.compile(alias, re.IGNORECASE), name) for alias, name in SEARCH_ALIASES.items()]
+        self.token = re.compile(r'[a-z0-9]+')
+        self.normalize = lru_cache(maxsize=cache_size)(self._normalize)
+        self.tokens = lru_cache(maxsize=cache_size)(self._tokens)
+
+    def _tokens(self, text):
+        """Zerlegt Namen bzw. Suchanfragen in kleingeschriebene Wörter (ohne Cache)
+
+        Landis+Gyr Varianten und Kurzschreibweisen werden wie bei der Namenserkennung vereinheitlicht,
+        damit Index und Anfrage dieselben Wörter sehen ("L+G E220", "Landis Gyr E220" -> landis, gyr, e220).
+        """
+        for alias, name in self.search_aliases:
+            text = alias.sub(name, text)
+        if 'gyr' in text.lower():
+            text = self.landis_gyr.sub('Landis + Gyr', text)
+        return tuple(self.token.findall(text.lower()))
+
+    def _normalize(self, text):
+        """Extrahiert Smart Meter Namen aus einem Überschriftentext (ohne Cache)"""
+        text = text.strip()
+
+        # Normalisiere alle Landis+Gyr Varianten BEVOR die Regex läuft
+        if 'gyr' in text.lower():
+            text = self.landis_gyr.sub('Landis + Gyr', text)
+
+        text_lower = text.lower()
+        first_match = None
+
+        if not any(word in text_lower for word in EXCLUDED_WORDS):
+            for pattern in self.patterns:
+                match = pattern.search(text)
+                if not match:
+                    continue
+                first_match = first_match or match
+
+                manufacturer = match.group(1).strip()
+                model = match.group(2).strip()
+
+                # Prüfe ob das "Modell" eine Abkürzung ist
+                model = ABBREVIATION_MAPPING.get(model, model)
+
+                # Validierung: Modell muss mindestens 2 sinnvolle Zeichen haben
+                model_clean = self.separators.sub('', model)
+                if (len(manufacturer) >= 2 and len(model_clean) >= 2
+                        and model_clean.lower() not in PLACEHOLDER_MODELS):
+                    return f"{manufacturer} {model}"
+
+        # Spezielle Behandlung für Sensus Pollucom um technische Suffixe zu entfernen
+        if 'sensus pollucom' in text_lower:
+            return 'Sensus Pollucom F'
+
+        # Ohne Validierung: erster Treffer der Regex-Erkennung
+        if first_match is None:
+            first_match = next(filter(None, (pattern.search(text) for pattern in self.patterns)), None)
+        if first_match:
+            manufacturer = first_match.group(1).strip()
+            model = first_match.group(2).strip()
+            if model in ABBREVIATION_MAPPING:
+                return ABBREVIATION_MAPPING[model]
+            return f"{manufacturer} {model}"
+
+        # Fallback auf special_cases für Edge Cases
+        for key, value in SPECIAL_CASES.items():
+            if key in text_lower:
+                # Für Sensus: keine zusätzlichen Details extrahieren
+                if 'sensus' in key:
+                    return value
+                # Erweitere um weitere Details falls vorhanden (für andere Hersteller)
+                remaining = text_lower.replace(key, '').strip()
+                if remaining:
+                    extra_match = self.extra_detail.search(remaining)
+                    if extra_match:
+                        return f"{value} {extra_match.group(1).upper()}"
+                return value
+
+        return None
+
+NAME_NORMALIZER = DeviceNameNormalizer()
+
+def extract_meter_name(text):
+    """Extrahiert Smart Meter Namen aus einem Text (gecacht)"""
+    if not text:
+        return None
+    return NAME_NORMALIZER.normalize(text)
+
+def normalize_device_name(name):
+    """Normalisiert Gerätenamen für Vergleich"""
+    return re.sub(r'[\s\-\.\+]', '', name.lower())
+
+def search_tokens(text):
+    """Wörter eines Namens bzw. einer Suchanfrage für die Suche (gecacht)"""
+    return NAME_NORMALIZER.tokens(text or '')
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Messungen je Pipeline-Stufe für den Crawler
+
+PipelineReport sammelt je Stufe (crawl, fetch, parse, names, merge, save, api) Laufzeit,
+Spitzen-Speicher, Bytes und Zähler wie Elemente, Scripts oder Dedup-Vergleiche und schreibt
+sie als JSON-Bericht. profiled() führt einen Aufruf unter cProfile aus.
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+REPORT_VERSION = 1
+
+# Reihenfolge der Stufen in der Konsolenausgabe; fetch/parse laufen je Quelle parallel innerhalb von crawl,
+# merge, patches und save verarbeiten den Datenstrom ebenfalls innerhalb von crawl (ohne eigene Laufzeit)
+STAGE_ORDER = ('crawl', 'fetch', 'parse', 'names', 'merge', 'patches', 'save', 'api')
+
+# Funktionen, die im Profil-Auszug immer gezeigt werden (Hot Paths des Crawlers)
+HOT_FUNCTIONS = ('iter_tasmota_wiki', 'iter_bitshake', 'extract_meter_name', '_normalize', 'parse_descriptor',
+                 'signature', 'query', 'stream_merge', 'save_records', 'generate_api')
+
+class PipelineReport:
+    """Messwerte je Stufe {Stufe: {seconds, peak_memory, bytes, ...}} - thread-sicher"""
+
+    def __init__(self, trace_memory=False):
+        self.stages = {}
+        self.started = datetime.now().isoformat()
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def add(self, stage, **counters):
+        """Addiert Zähler zu einer Stufe (auch aus parallelen Threads)"""
+        with self.lock:
+            stats = self.stages.setdefault(stage, {})
+            for name, value in counters.items():
+                stats[name] = stats.get(name, 0) + value
+
+    @contextmanager
+    def stage(self, name):
+        """Misst Laufzeit und Spitzen-Speicher einer Stufe; das gelieferte Dict nimmt weitere Zähler auf"""
+        counters = {}
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield counters
+        finally:
+            counters['seconds'] = time.perf_counter() - start
+            if self.trace_memory:
+                counters['peak_memory'] = tracemalloc.get_traced_memory()[1] - baseline
+            self.add(name, **counters)
+
+    def to_dict(self):
+        """Bericht als JSON-fähiges Dict"""
+        return {
+            'version': REPORT_VERSION,
+            'started': self.started,
+            'total_seconds': time.perf_counter() - self.start,
+            'memory_traced': self.trace_memory,
+            'stages': self.stages,
+        }
+
+    def save(self, path):
+        """Schreibt den Bericht als JSON-Datei"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write('\n')
+
+    def summary(self):
+        """Kurze Tabelle der Stufen für die Konsolenausgabe"""
+        lines = []
+        order = {stage: i for i, stage in enumerate(STAGE_ORDER)}
+        for stage in sorted(self.stages, key=lambda stage: order.get(stage, len(order))):
+            stats = self.stages[stage]
+            details = ', '.join(f"{name}={value:,}" for name, value in sorted(stats.items())
+                                if name not in ('seconds', 'peak_memory') and isinstance(value, int))
+            seconds = f"{stats['seconds'] * 1000:>9.1f} ms" if 'seconds' in stats else f"{'':>12}"
+            line = f"- {stage:<7} {seconds}"
+            if 'peak_memory' in stats:
+                line += f" {stats['peak_memory'] / 1024 / 1024:>7.1f} MiB"
+            lines.append(f"{line}  {details}".rstrip())
+        return '\n'.join(lines)
+
+def profiled(func, path=None, limit=25):
+    """Führt func unter cProfile aus - gibt (Ergebnis, Auszug der teuersten Funktionen) zurück
+
+    Optional wird das vollständige Profil für snakeviz/pstats in path gespeichert.
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func)
+    if path:
+        profiler.dump_stats(path)
+
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output).sort_stats('cumulative')
+    stats.print_stats(limit)
+    stats.print_stats(r'\((?:%s)\)' % '|'.join(HOT_FUNCTIONS))
+    return result, output.getvalue()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Minifizierer für Tasmota Smart Meter Scripts mit Größenbudget je Plattform
+
+Tasmota hält das Script in einem festen Puffer (ESP8266: 1535 Bytes in der Standard-Firmware).
+Lange Descriptors passen nicht hinein oder lassen kaum Platz für eigenen Code. minify()
+schreibt ein Script aus dem geparsten Descriptor (descriptor_parser) neu:
+
+- immer:  Kommentare, Leerzeilen, Einrückung und Leerzeichen um die Felder der Zähler- und
+          Wertzeilen entfernen, umgebrochene Labels zusammenführen
+- immer:  reine Trennlinien (=h--, =h<hr/>, ...) und leere Sektionen (außer >D) weglassen
+- auf Wunsch (shorten_labels): Labels abkürzen ("Verbrauch" -> "Verbr.") - nur die Anzeige ändert sich
+- auf Wunsch (rename_vars):    Script-Variablen aus >D kürzer benennen; Scripts mit >W bleiben unverändert
+
+Die JSON-Namen der Wertzeilen (MQTT, Home Assistant) bleiben immer erhalten.
+"""
+
+import argparse
+import os
+import re
+import sys
+
+from descriptor_parser import COMMENT_RE, METER_RE, VALUE_RE, Directive, parse_descriptor, parse_value
+from storage import content_hash
+
+MINIFIED_DIR = "minified"
+
+# Script-Puffer der Standard-Firmware in Bytes; weitere Plattformen mit --budget NAME=BYTES
+PLATFORM_BUDGETS = {
+    'esp8266': 1535,
+    'esp32': 8191,
+}
+
+# Unter dieser Reserve bleibt kaum Platz für eigenen Code (Warnung "knapp")
+USER_CODE_RESERVE = 256
+
+# Sektionen, die auch leer erhalten bleiben
+REQUIRED_SECTIONS = ('D',)
+
+# =h-Zeilen, die nur eine Trennlinie zeichnen
+DECORATION_RE = re.compile(r'^=h\s*(?:[-=_~*]+|<hr\s*/?>|&#\d+;)?\s*$', re.IGNORECASE)
+
+# Häufige Wörter in Labels und ihre Abkürzungen
+LABEL_ABBREVIATIONS = {
+    'Verbrauch': 'Verbr.',
+    'Gesamtverbrauch': 'Verbr.',
+    'Einspeisung': 'Einsp.',
+    'Leistung': 'Lstg.',
+    'Wirkleistung': 'P',
+    'Blindleistung': 'Q',
+    'Wirkenergie': 'E',
+    'Spannung': 'U',
+    'Zählernummer': 'Nr.',
+    'Zählerstand': 'Stand',
+    'Frequenz': 'f',
+    'Voltage': 'U',
+    'Current': 'I',
+    'Amperage': 'I',
+    'Frequency': 'f',
+    'Power': 'P',
+    'power': 'P',
+    'Energy': 'E',
+    'energy': 'E',
+    'Reactive': 'Q',
+    'Consumption': 'Cons.',
+    'Phaseangle': 'Phi',
+    'Temperature': 'Temp',
+}
+LABEL_WORD_RE = re.compile(r'\b(%s)\b' % '|'.join(sorted(LABEL_ABBREVIATIONS, key=len, reverse=True)))
+
+# Variablen-Deklaration in >D, z.B. "count=0", "p:total=0", "m:werte=0"
+DECLARATION_RE = re.compile(r'^(?:[A-Za-z]:)?([A-Za-z_]\w*)\s*=')
+IDENTIFIER_RE = re.compile(r'"[^"]*"|(?<![\w.])[A-Za-z_]\w*')
+VARIABLE_REF_RE = re.compile(r'%(\d*)([A-Za-z_]\w*)%')
+
+# Zeilen mit freiem Text, in denen nur %variable% ersetzt wird (Befehle, Ausgaben)
+TEXT_LINE_RE = re.compile(r'^(?:=>|=#|wcs\b|print\b)')
+
+def shorten_label(label):
+    """Kürzt bekannte Wörter eines Labels ab"""
+    return LABEL_WORD_RE.sub(lambda match: LABEL_ABBREVIATIONS[match.group(1)], label)
+
+def minify_meter_block_line(line, shorten_labels=False):
+    """Minifiziert eine Zeile des Zählerblocks (>M) - gibt None zurück, wenn sie entfallen kann"""
+    if METER_RE.match(line):
+        return ','.join(field.strip() for field in line.split(','))
+
+    match = VALUE_RE.match(line)
+    if not match:
+        return line
+
+    # Zählerindex ("1,") oder Script-Variable ("%r%") bleibt unverändert
+    start = match.start(2) if match.group(1) is not None else match.start(4)
+    head, rest = line[:start], line[start:]
+    if isinstance(parse_value(head, rest), Directive):
+        return None if DECORATION_RE.match(rest) else line
+
+    # Der Code (OBIS, Telegramm-Muster) bleibt wie er ist, nur die Felder danach werden gekürzt
+    rest = COMMENT_RE.split(rest, 1)[0]
+    if '@' in rest:
+        code, tail = rest.split('@', 1)
+        code += '@'
+        fields = [field.strip() for field in tail.split(',')]
+        label = 1
+    else:
+        code, _, tail = rest.partition(',')
+        code += ','
+        fields = [field.strip() for field in tail.split(',')]
+        label = 0
+    if shorten_labels and len(fields) > label:
+        fields[label] = shorten_label(fields[label])
+    return f"{head}{code}{','.join(fields)}"
+
+def minify_meter_block(lines, shorten_labels=False):
+    """Minifiziert die Zeilen der >M-Sektion bis zum abschließenden "#" """
+    output = []
+    in_meter_block = True
+    for line in lines:
+        if in_meter_block:
+            if line == '#':
+                in_meter_block = False
+            else:
+                line = minify_meter_block_line(line, shorten_labels)
+        if line is not None:
+            output.append(line)
+    return output
+
+def short_names(taken):
+    """Kurze, im Script noch nicht verwendete Variablennamen (a, b, ..., a0, a1, ...)
+
+    Zweistellige Namen enden auf eine Ziffer, damit sie nicht mit Tasmota-Funktionen wie pi oder sb kollidieren.
+    """
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    for name in list(letters) + [letter + digit for letter in letters for digit in '0123456789']:
+        if name not in taken:
+            yield name
+
+def rename_variables(sections):
+    """Benennt die in >D deklarierten Variablen kürzer - gibt {alt: neu} zurück (Sektionen werden geändert)"""
+    if any(name == 'W' for name, _, _ in sections):
+        return {}
+
+    declared = []
+    for name, _, lines in sections:
+        if name == 'D':
+            for line in lines:
+                match = DECLARATION_RE.match(line)
+                if match and match.group(1) not in declared:
+                    declared.append(match.group(1))
+
+    taken = {token.lower() for _, _, lines in sections for line in lines
+             for token in IDENTIFIER_RE.findall(line) if not token.startswith('"')}
+    names = short_names(taken)
+    mapping = {}
+    for variable in declared:
+        if len(variable) > 2:
+            mapping[variable] = next(names)
+    if not mapping:
+        return mapping
+
+    def code(match):
+        token = match.group(0)
+        return mapping.get(token, token)
+
+    def reference(match):
+        return f"%{match.group(1)}{mapping.get(match.group(2), match.group(2))}%"
+
+    for name, _, lines in sections:
+        for i, line in enumerate(lines):
+            if name == 'M' or TEXT_LINE_RE.match(line):
+                lines[i] = VARIABLE_REF_RE.sub(reference, line)
+            else:
+                lines[i] = IDENTIFIER_RE.sub(code, line)
+    return mapping
+
+def minify(script, shorten_labels=False, rename_vars=False):
+    """Minifiziert ein Script auf Basis seines Descriptors"""
+    descriptor = parse_descriptor(script)
+    sections = []
+    for section in descriptor.sections:
+        lines = section.lines
+        if section.name == 'M':
+            lines = minify_meter_block(lines, shorten_labels)
+        if lines or section.name in REQUIRED_SECTIONS:
+            sections.append((section.name, section.args, list(lines)))
+
+    if rename_vars:
+        rename_variables(sections)
+
+    output = []
+    for name, args, lines in sections:
+        # Einbuchstabige Sektionen mit Leerzeichen (">D 250"), Event-Sektionen ohne (">on1")
+        output.append(f">{name}{' ' if len(name) == 1 else ''}{args}" if args else f">{name}")
+        output.extend(lines)
+    return '\n'.join(output)
+
+def check_budgets(size, budgets=PLATFORM_BUDGETS):
+    """Freier Platz je Plattform {Plattform: Bytes} - negativ, wenn das Script nicht in den Puffer passt"""
+    return {platform: budget - size for platform, budget in budgets.items()}
+
+def fitting_variants(full_size, minified_size, budgets=PLATFORM_BUDGETS):
+    """Kleinste nötige Variante je Plattform {Plattform: 'full' | 'minified'} - fehlt, wenn keine passt"""
+    fits = {}
+    for platform, budget in budgets.items():
+        if full_size <= budget:
+            fits[platform] = 'full'
+        elif minified_size <= budget:
+            fits[platform] = 'minified'
+    return fits
+
+def build_minified(entries, scripts_dir):
+    """Minifiziert die Scripts der Katalog-Einträge
+
+    Gibt (Dateien {minified/<Dateiname>: Bytes}, Metadaten {ID: {'minified_size', 'minified_sha256', 'fits'}}) zurück.
+    """
+    files = {}
+    refs = {}
+    for entry in entries:
+        with open(os.path.join(scripts_dir, entry['filename']), 'rb') as f:
+            content = f.read()
+        minified = minify(content.decode('utf-8', errors='replace')).encode('utf-8')
+        files[f"{MINIFIED_DIR}/{entry['filename']}"] = minified
+        refs[entry['id']] = {
+            'minified_size': len(minified),
+            'minified_sha256': content_hash(minified),
+            'fits': fitting_variants(len(content), len(minified)),
+        }
+    return files, refs
+
+def same_readings(script, minified):
+    """Prüft, ob ein minifiziertes Script dieselben Zähler und Werte liefert wie das Original"""
+    def readings(descriptor):
+        return ([(m.index, m.protocol, m.rx_pin, m.baud, m.tx_pin, m.commands) for m in descriptor.meters],
+                [(v.meter, v.code, v.obis, v.scale, v.label.strip(), v.unit, v.var, v.precision)
+                 for v in descriptor.values])
+    return readings(parse_descriptor(script)) == readings(parse_descriptor(minified))
+
+def parse_budget(text):
+    """Wandelt "esp8266=1535" in (Plattform, Bytes) um"""
+    name, _, size = text.partition('=')
+    if not name or not size.isdigit():
+        raise argparse.ArgumentTypeError(f"Ungültiges Budget: {text} (z.B. esp8266=1535)")
+    return name, int(size)
+
+def main():
+    """Minifiziert Scripts und prüft sie gegen die Größenbudgets"""
+    scripts_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
+    parser = argparse.ArgumentParser(description="Minifiziert Smart Meter Scripts und prüft die Größenbudgets")
+    parser.add_argument('files', nargs='*', help="Script-Dateien (Standard: alle in scripts/)")
+    parser.add_argument('--shorten-labels', action='store_true', help="Labels abkürzen")
+    parser.add_argument('--rename-vars', action='store_true', help="Script-Variablen kürzer benennen")
+    parser.add_argument('--budget', type=parse_budget, action='append', default=[],
+                        help="Budget einer Plattform in Bytes, z.B. esp8266=1535 (mehrfach möglich)")
+    parser.add_argument('--output', metavar='DIR', help="Minifizierte Scripts in DIR schreiben")
+    parser.add_argument('--over', action='store_true', help="Nur Scripts anzeigen, die ein Budget überschreiten")
+    args = parser.parse_args()
+
+    budgets = dict(PLATFORM_BUDGETS, **dict(args.budget))
+    files = args.files or sorted(os.path.join(scripts_dir, name) for name in os.listdir(scripts_dir)
+                                 if name.endswith('.txt'))
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+
+    print(f"{'Script':<45} {'Voll':>6} {'Minif.':>6} " + ' '.join(f"{platform:>14}" for platform in budgets))
+    over = 0
+    changed_readings = []
+    for path in files:
+        with open(path, 'r', encoding='utf-8') as f:
+            script = f.read()
+        minified = minify(script, args.shorten_labels, args.rename_vars)
+        full_size = len(script.encode('utf-8'))
+        minified_size = len(minified.encode('utf-8'))
+        headroom = check_budgets(minified_size, budgets)
+        if any(free < 0 for free in headroom.values()):
+            over += 1
+        elif args.over:
+            continue
+        if not args.shorten_labels and not args.rename_vars and not same_readings(script, minified):
+            changed_readings.append(os.path.basename(path))
+
+        status = []
+        for platform, free in headroom.items():
+            if free < 0:
+                status.append(f"{free:>6} zu groß".rjust(14))
+            elif free < USER_CODE_RESERVE:
+                status.append(f"{free:>6} knapp".rjust(14))
+            else:
+                status.append(f"{free:>6} frei".rjust(14))
+        print(f"{os.path.basename(path)[:45]:<45} {full_size:>6} {minified_size:>6} " + ' '.join(status))
+
+        if args.output:
+            with open(os.path.join(args.output, os.path.basename(path)), 'w', encoding='utf-8') as f:
+                f.write(minified)
+
+    print(f"\n{len(files)} Scripts, {over} überschreiten mindestens ein Budget auch minifiziert")
+    if changed_readings:
+        print(f"Achtung: abweichende Wertzeilen nach dem Minifizieren: {', '.join(changed_readings)}")
+    return 1 if over or changed_readings else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
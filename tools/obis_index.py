@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+OBIS-Index: welche Zähler liefern welche OBIS-Kennzahlen?
+
+Ordnet normalisierte OBIS-Kennzahlen (z.B. "1.8.0") den Scripts zu, die sie auslesen,
+jeweils mit Label, Einheit und Skalierung der Wertzeile. Der Index wird als
+api/obis_index.json ausgeliefert und inkrementell aktualisiert: nur Scripts, deren
+SHA-256 sich geändert hat, werden neu geparst.
+"""
+
+import argparse
+import json
+import os
+import re
+
+from descriptor_parser import normalize_obis, parse_descriptor
+
+OBIS_INDEX_FILE = "obis_index.json"
+
+# Bei Änderungen am Format oder an der Wertzeilen-Erkennung erhöhen, damit der Index neu aufgebaut wird
+OBIS_INDEX_VERSION = 1
+
+HEX_OBIS_RE = re.compile(r'^[0-9a-fA-F]{12}$')
+
+def obis_sort_key(code):
+    """Sortiert Kennzahlen numerisch (1.8.0 < 1.8.1 < 2.8.0 < 16.7.0), Buchstaben (C.1.0) zuletzt"""
+    return [(0, int(part), '') if part.isdigit() else (1, 0, part) for part in code.split('.')]
+
+def normalize_query(code):
+    """Normalisiert eine Suchanfrage ("1.8.0", "1-0:1.8.0*255", "77070100010800ff", "0100010800ff") auf 'C.D.E'"""
+    code = code.strip()
+    if HEX_OBIS_RE.match(code):
+        code = '7707' + code
+    short, _ = normalize_obis(code)
+    return short
+
+def script_rows(script):
+    """OBIS-Zeilen eines Scripts als Liste [Kennzahl, Label, Einheit, Skalierung]"""
+    rows = []
+    for value in parse_descriptor(script).values:
+        if value.obis:
+            rows.append([value.obis, value.label, value.unit, value.scale])
+    return rows
+
+def load_obis_data(api_dir):
+    """Lädt den bisherigen Index aus api/ - bei fehlender Datei oder anderer Version leer"""
+    try:
+        with open(os.path.join(api_dir, OBIS_INDEX_FILE), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('version') != OBIS_INDEX_VERSION:
+        return None
+    return data
+
+def previous_rows(data):
+    """Zerlegt einen gespeicherten Index wieder in Zeilen je Script {Dateiname: [Zeilen]}"""
+    rows = {filename: [] for filename in data.get('files', {})}
+    for code, matches in data.get('codes', {}).items():
+        for filename, label, unit, scale in matches:
+            if filename in rows:
+                rows[filename].append([code, label, unit, scale])
+    return rows
+
+def build_obis_data(entries, scripts_dir, previous=None):
+    """Erstellt den Index aus den Katalog-Einträgen (mit sha256) - gibt (Index, Anzahl neu geparster Scripts) zurück
+
+    Unveränderte Scripts übernehmen ihre Zeilen aus dem bisherigen Index, ohne die Datei zu lesen.
+    """
+    old_hashes = previous.get('files', {}) if previous else {}
+    old_rows = previous_rows(previous) if previous else {}
+
+    files = {}
+    rows = {}
+    parsed = 0
+    for entry in entries:
+        filename = entry['filename']
+        files[filename] = entry['sha256']
+        if old_hashes.get(filename) == entry['sha256']:
+            rows[filename] = old_rows[filename]
+            continue
+        with open(os.path.join(scripts_dir, filename), 'r', encoding='utf-8', errors='replace') as f:
+            rows[filename] = script_rows(f.read())
+        parsed += 1
+
+    codes = {}
+    for filename in sorted(rows):
+        for code, label, unit, scale in rows[filename]:
+            codes.setdefault(code, []).append([filename, label, unit, scale])
+
+    data = {
+        'version': OBIS_INDEX_VERSION,
+        'files': dict(sorted(files.items())),
+        'codes': {code: codes[code] for code in sorted(codes, key=obis_sort_key)},
+    }
+    return data, parsed
+
+class ObisIndex:
+    """Abfragen auf dem OBIS-Index in konstanter Zeit (ein Dictionary-Zugriff je Kennzahl)"""
+
+    def __init__(self, data):
+        self.codes = {code: [tuple(match) for match in matches] for code, matches in data.get('codes', {}).items()}
+
+    def lookup(self, code):
+        """Alle (Script, Label, Einheit, Skalierung) zu einer OBIS-Kennzahl"""
+        short = normalize_query(code)
+        return self.codes.get(short, []) if short else []
+
+    def scripts(self, code):
+        """Dateinamen aller Scripts, die die Kennzahl auslesen"""
+        return sorted({match[0] for match in self.lookup(code)})
+
+    def scripts_with_all(self, codes):
+        """Dateinamen aller Scripts, die alle Kennzahlen auslesen (z.B. 1.8.0 und 2.8.0)"""
+        result = None
+        for code in codes:
+            found = set(self.scripts(code))
+            result = found if result is None else result & found
+        return sorted(result or ())
+
+def load_obis_index(api_dir):
+    """Lädt api/obis_index.json als ObisIndex"""
+    with open(os.path.join(api_dir, OBIS_INDEX_FILE), 'r', encoding='utf-8') as f:
+        return ObisIndex(json.load(f))
+
+def main():
+    """Zeigt die Scripts zu OBIS-Kennzahlen an"""
+    default_api_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api')
+    parser = argparse.ArgumentParser(description="Welche Zähler liefern welche OBIS-Kennzahlen?")
+    parser.add_argument('codes', nargs='+', help="OBIS-Kennzahlen, z.B. 1.8.0 2.8.0 16.7.0")
+    parser.add_argument('--api-dir', default=default_api_dir)
+    parser.add_argument('--all', action='store_true', help="Nur Scripts, die alle Kennzahlen liefern")
+    args = parser.parse_args()
+
+    index = load_obis_index(args.api_dir)
+    if args.all:
+        scripts = index.scripts_with_all(args.codes)
+        print(f"{len(scripts)} Scripts liefern {', '.join(args.codes)}:")
+        for filename in scripts:
+            print(f"- {filename}")
+        return
+
+    for code in args.codes:
+        matches = index.lookup(code)
+        print(f"{normalize_query(code) or code}: {len(matches)} Wertzeilen in {len(index.scripts(code))} Scripts")
+        for filename, label, unit, scale in matches:
+            print(f"- {filename}: {label} [{unit}] @{scale}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Patch-Overlay für manuell korrigierte Scripts (patches/)
+
+Korrigiert man ein Script von Hand, überschreibt der nächste Crawl die Korrektur, sobald sich
+das Script upstream ändert. Korrekturen liegen daher als Patch im Repo, je Script eine Datei
+patches/<ID>.json (ID wie in scripts.json, z.B. Landis_Gyr_E220_SML):
+
+    {"version": 1, "id": "...", "note": "Warum korrigiert",
+     "upstream_sha256": "<Hash des Upstream-Scripts>", "result_sha256": "<Hash nach dem Patch>",
+     "hunks": [{"line": 4, "old": [Zeilen upstream], "new": [Zeilen korrigiert]}]}
+
+Der Crawler wendet das Overlay nach dem Merge und vor dem Speichern an:
+
+- applied   Upstream unverändert (Hash wie im Patch), Patch angewendet
+- cached    wie applied, Ergebnis aus dem Patch-Cache des letzten Laufs (.patch_cache.json)
+- rebased   Upstream geändert, die Hunks passen aber noch (über ihre Kontextzeilen) - bitte prüfen
+- obsolete  Upstream enthält die Korrektur inzwischen selbst - Patch kann entfernt werden
+- conflict  Upstream geändert und die Hunks passen nicht mehr - Upstream wird unverändert gespeichert
+"""
+
+import argparse
+import json
+import os
+from difflib import SequenceMatcher
+
+from catalog import display_name_for, script_id
+from storage import content_hash, write_if_changed
+
+PATCHES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'patches')
+PATCH_VERSION = 1
+
+PATCH_CACHE_FILE = ".patch_cache.json"
+PATCH_CACHE_VERSION = 1
+
+# Unveränderte Zeilen vor und nach jeder Änderung - damit findet ein Hunk seine Stelle auch in geänderten Scripts
+PATCH_CONTEXT = 2
+
+PATCH_STATES = ('applied', 'cached', 'rebased', 'obsolete', 'conflict')
+
+# Felder, ohne die ein Patch nicht angewendet werden kann
+PATCH_KEYS = ('id', 'upstream_sha256', 'result_sha256', 'hunks')
+
+def record_script_id(script_data):
+    """ID eines Datensatzes im Repo-Layout (Dateiname ohne .txt)"""
+    return script_id(display_name_for(script_data['device_name'], script_data['protocol']))
+
+def make_patch(patch_id, upstream, fixed, note='', context=PATCH_CONTEXT):
+    """Erstellt einen Patch aus Upstream-Script und korrigiertem Script"""
+    old_lines = upstream.split('\n')
+    new_lines = fixed.split('\n')
+    hunks = []
+    for group in SequenceMatcher(None, old_lines, new_lines, autojunk=False).get_grouped_opcodes(context):
+        i1, i2, j1, j2 = group[0][1], group[-1][2], group[0][3], group[-1][4]
+        hunks.append({'line': i1, 'old': old_lines[i1:i2], 'new': new_lines[j1:j2]})
+    return {
+        'version': PATCH_VERSION,
+        'id': patch_id,
+        'note': note,
+        'upstream_sha256': content_hash(upstream),
+        'result_sha256': content_hash(fixed),
+        'hunks': hunks,
+    }
+
+def patch_fingerprint(patch):
+    """Hash eines Patches - ändert sich der Patch, gilt sein Cache-Eintrag nicht mehr"""
+    return content_hash(json.dumps(patch, ensure_ascii=False, sort_keys=True))
+
+def overlay_fingerprint(overlay):
+    """Hash aller Patches - zeigt an, ob sich das Overlay geändert hat"""
+    return content_hash(json.dumps(overlay, ensure_ascii=False, sort_keys=True))
+
+def find_block(lines, block, expected, start):
+    """Position ab start, an der die Zeilen block stehen - bei mehreren Treffern die nächste zu expected"""
+    if not block:
+        return min(max(expected, start), len(lines))
+    positions = [i for i in range(start, len(lines) - len(block) + 1) if lines[i:i + len(block)] == block]
+    if not positions:
+        return None
+    return min(positions, key=lambda i: abs(i - expected))
+
+def apply_hunks(script, hunks):
+    """Wendet die Hunks eines Patches an - gibt (Script, verschoben) oder (None, False) zurück, wenn ein Hunk nicht passt"""
+    lines = script.split('\n')
+    result = []
+    position = 0
+    offset = 0
+    moved = False
+    for hunk in hunks:
+        at = find_block(lines, hunk['old'], hunk['line'] + offset, position)
+        if at is None:
+            return None, False
+        moved = moved or at != hunk['line']
+        result.extend(lines[position:at])
+        result.extend(hunk['new'])
+        position = at + len(hunk['old'])
+        offset = at - hunk['line']
+    result.extend(lines[position:])
+    return '\n'.join(result), moved
+
+def patch_script(patch, upstream):
+    """Wendet einen Patch auf ein Upstream-Script an - gibt (Status, Script) zurück (siehe PATCH_STATES)"""
+    upstream_hash = content_hash(upstream)
+    if upstream_hash == patch['result_sha256']:
+        return 'obsolete', upstream
+
+    script, moved = apply_hunks(upstream, patch['hunks'])
+    if script is None:
+        return 'conflict', upstream
+    if upstream_hash == patch['upstream_sha256']:
+        # Unverändertes Upstream muss genau das gespeicherte Ergebnis liefern, sonst ist der Patch beschädigt
+        if content_hash(script) != patch['result_sha256'] or moved:
+            return 'conflict', upstream
+        return 'applied', script
+    return 'rebased', script
+
+def load_overlay(directory=PATCHES_DIR):
+    """Lädt alle Patches aus patches/ {ID: Patch} - ohne Verzeichnis ein leeres Overlay
+
+    Ist ein Patch nicht lesbar oder unvollständig, wird ValueError ausgelöst und kein Patch geladen.
+    """
+    overlay = {}
+    if not directory or not os.path.isdir(directory):
+        return overlay
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+                patch = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"{filename}: {e}") from e
+        version = patch.get('version') if isinstance(patch, dict) else None
+        if version != PATCH_VERSION:
+            raise ValueError(f"{filename}: unbekannte Patch-Version {version}")
+        missing = [key for key in PATCH_KEYS if key not in patch]
+        if missing:
+            raise ValueError(f"{filename}: unvollständiger Patch, es fehlt {', '.join(missing)}")
+        overlay[patch['id']] = patch
+    return overlay
+
+def save_patch(patch, directory=PATCHES_DIR):
+    """Speichert einen Patch als patches/<ID>.json - gibt den Pfad zurück"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{patch['id']}.json")
+    write_if_changed(path, json.dumps(patch, ensure_ascii=False, indent=2) + '\n')
+    return path
+
+def load_patch_cache(path):
+    """Lädt die Ergebnisse des letzten Laufs {ID: {upstream_sha256, patch, status, script}}"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get('version') != PATCH_CACHE_VERSION:
+        return {}
+    return data.get('patches', {})
+
+def save_patch_cache(cache, path):
+    """Speichert den Patch-Cache - nur wenn er sich geändert hat"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    content = json.dumps({'version': PATCH_CACHE_VERSION, 'patches': cache}, ensure_ascii=False, indent=2, sort_keys=True)
+    return write_if_changed(path, content + '\n')
+
+def apply_overlay(records, overlay, cache=None, stats=None):
+    """Wendet das Overlay auf einen Datenstrom von Datensätzen an und liefert sie weiter
+
+    Ist das Upstream-Script seit dem letzten Lauf unverändert, kommt das Ergebnis aus dem Cache.
+    cache wird dabei auf die Patches dieses Laufs aktualisiert. stats zählt je Status sowie
+    Patches ohne passendes Script (missing).
+    """
+    counts = {state: 0 for state in PATCH_STATES}
+    seen = set()
+    fresh = {}
+    for script_data in records:
+        patch_id = record_script_id(script_data)
+        patch = overlay.get(patch_id)
+        if patch is None:
+            yield script_data
+            continue
+
+        seen.add(patch_id)
+        upstream = script_data['script']
+        upstream_hash = content_hash(upstream)
+        fingerprint = patch_fingerprint(patch)
+        entry = cache.get(patch_id) if cache is not None else None
+        if entry and entry['upstream_sha256'] == upstream_hash and entry['patch'] == fingerprint:
+            state = entry['status']
+            script = upstream if entry['script'] is None else entry['script']
+            if state == 'applied':
+                state = 'cached'
+        else:
+            state, script = patch_script(patch, upstream)
+        # Script nur speichern, wenn der Patch etwas ändert (nicht bei obsolete/conflict)
+        fresh[patch_id] = {'upstream_sha256': upstream_hash, 'patch': fingerprint,
+                           'status': 'applied' if state == 'cached' else state,
+                           'script': script if script != upstream else None}
+        counts[state] += 1
+
+        if state == 'rebased':
+            print(f"Patch {patch_id}: Upstream geändert, Patch neu angewendet - bitte prüfen und neu aufzeichnen")
+        elif state == 'obsolete':
+            print(f"Patch {patch_id}: Korrektur ist upstream enthalten - Patch kann entfernt werden")
+        elif state == 'conflict':
+            print(f"Patch {patch_id}: KONFLIKT - Upstream geändert, Patch passt nicht mehr; Upstream unverändert gespeichert")
+
+        if script != upstream:
+            script_data = dict(script_data, script=script, upstream_sha256=upstream_hash)
+        yield script_data
+
+    missing = sorted(set(overlay) - seen)
+    for patch_id in missing:
+        print(f"Patch {patch_id}: kein Script mit dieser ID gefunden")
+    if cache is not None:
+        cache.clear()
+        cache.update(fresh)
+    if stats is not None:
+        stats.update(counts, missing=len(missing))
+
+def main():
+    """Listet die Patches mit ihrem Status im letzten Lauf oder zeichnet einen neuen Patch auf"""
+    parser = argparse.ArgumentParser(description="Patch-Overlay für manuell korrigierte Smart Meter Scripts")
+    parser.add_argument('--patches-dir', default=PATCHES_DIR)
+    parser.add_argument('--output-dir', help="Ausgabeordner des Crawlers - zeigt den Status des letzten Laufs")
+    parser.add_argument('--record', metavar='ID', help="Patch für diese Script-ID aufzeichnen")
+    parser.add_argument('--upstream', metavar='FILE', help="Script wie upstream geliefert (z.B. Crawl mit --no-patches)")
+    parser.add_argument('--fixed', metavar='FILE', help="Korrigiertes Script (Standard: scripts/<ID>.txt)")
+    parser.add_argument('--note', default='', help="Warum das Script korrigiert wurde")
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.upstream:
+            parser.error("--record braucht --upstream")
+        fixed_file = args.fixed or os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts',
+                                                f"{args.record}.txt")
+        with open(args.upstream, 'r', encoding='utf-8') as f:
+            upstream = f.read()
+        with open(fixed_file, 'r', encoding='utf-8') as f:
+            fixed = f.read()
+        patch = make_patch(args.record, upstream, fixed, args.note)
+        if not patch['hunks']:
+            parser.error(f"{fixed_file} ist identisch mit dem Upstream-Script - nichts aufzuzeichnen")
+        path = save_patch(patch, args.patches_dir)
+        changed = sum(len(hunk['new']) for hunk in patch['hunks'])
+        print(f"Patch gespeichert: {path} ({len(patch['hunks'])} Hunks, {changed} Zeilen)")
+        return
+
+    overlay = load_overlay(args.patches_dir)
+    cache = load_patch_cache(os.path.join(args.output_dir, PATCH_CACHE_FILE)) if args.output_dir else {}
+    print(f"{len(overlay)} Patches in {args.patches_dir}")
+    for patch_id, patch in overlay.items():
+        status = cache.get(patch_id, {}).get('status', '-')
+        print(f"- {patch_id}  {len(patch['hunks'])} Hunks  upstream {patch['upstream_sha256'][:16]}  {status:<9} {patch['note']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Suchindex für die Zählerauswahl (Typeahead)
+
+Vorberechneter Index über die Anzeigenamen aller Scripts:
+
+- tokens:   sortierte Wörter mit den Scripts, in denen sie vorkommen - Präfixsuche per Binärsuche
+- trigrams: Trigramme der kompakten Namen (normalize_device_name) - Teilwortsuche ("7410", "landisgyr")
+
+Index und Anfragen verwenden dieselbe Normalisierung wie der Crawler (device_names),
+daher finden "landis e220", "L+G E220" und "Landis+Gyr E220" dasselbe Script.
+"""
+
+import argparse
+import json
+import os
+from bisect import bisect_left
+
+from device_names import normalize_device_name, search_tokens
+
+SEARCH_INDEX_FILE = "search_index.json"
+SEARCH_INDEX_VERSION = 1
+
+# Punkte je Suchwort: ganzes Wort > Wortanfang > Teilwort
+EXACT_SCORE = 3
+PREFIX_SCORE = 2
+SUBSTRING_SCORE = 1
+
+def trigrams(text):
+    """Alle Trigramme eines Textes"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def build_search_data(entries):
+    """Erstellt den Suchindex aus den Katalog-Einträgen"""
+    names = []
+    files = []
+    keys = []
+    tokens = {}
+    grams = {}
+    for doc, entry in enumerate(entries):
+        names.append(entry['display_name'])
+        files.append(entry['filename'])
+        key = normalize_device_name(entry['display_name'])
+        keys.append(key)
+        for token in set(search_tokens(entry['display_name'])):
+            tokens.setdefault(token, []).append(doc)
+        for gram in trigrams(key):
+            grams.setdefault(gram, []).append(doc)
+
+    return {
+        'version': SEARCH_INDEX_VERSION,
+        'names': names,
+        'files': files,
+        'keys': keys,
+        'tokens': [[token, tokens[token]] for token in sorted(tokens)],
+        'trigrams': {gram: grams[gram] for gram in sorted(grams)},
+    }
+
+class SearchIndex:
+    """Typeahead-Suche auf dem vorberechneten Index"""
+
+    def __init__(self, data):
+        self.names = data['names']
+        self.files = data['files']
+        self.keys = data['keys']
+        self.words = [token for token, _ in data['tokens']]
+        self.postings = [set(docs) for _, docs in data['tokens']]
+        self.trigrams = {gram: set(docs) for gram, docs in data['trigrams'].items()}
+
+    def match_token(self, token):
+        """Punkte je Script für ein Suchwort {Script-Nr: Punkte}"""
+        scores = {}
+        # Präfixsuche: alle Wörter ab der Einfügeposition, die mit dem Suchwort beginnen
+        position = bisect_left(self.words, token)
+        while position < len(self.words) and self.words[position].startswith(token):
+            score = EXACT_SCORE if self.words[position] == token else PREFIX_SCORE
+            for doc in self.postings[position]:
+                if scores.get(doc, 0) < score:
+                    scores[doc] = score
+            position += 1
+
+        # Teilwortsuche über Trigramme, Kandidaten werden gegen den kompakten Namen geprüft
+        if len(token) >= 3:
+            candidates = None
+            for gram in trigrams(token):
+                docs = self.trigrams.get(gram, set())
+                candidates = docs if candidates is None else candidates & docs
+                if not candidates:
+                    break
+            for doc in candidates or ():
+                if doc not in scores and token in self.keys[doc]:
+                    scores[doc] = SUBSTRING_SCORE
+        return scores
+
+    def search(self, query, limit=10):
+        """Sortierte Treffer [(Anzeigename, Dateiname)] - alle Suchwörter müssen vorkommen"""
+        tokens = search_tokens(query)
+        if not tokens:
+            return []
+
+        totals = None
+        for token in tokens:
+            scores = self.match_token(token)
+            if totals is None:
+                totals = scores
+            else:
+                totals = {doc: total + scores[doc] for doc, total in totals.items() if doc in scores}
+            if not totals:
+                return []
+
+        ranked = sorted(totals, key=lambda doc: (-totals[doc], len(self.names[doc]), self.names[doc]))
+        return [(self.names[doc], self.files[doc]) for doc in ranked[:limit]]
+
+def load_search_index(api_dir):
+    """Lädt api/search_index.json als SearchIndex"""
+    with open(os.path.join(api_dir, SEARCH_INDEX_FILE), 'r', encoding='utf-8') as f:
+        return SearchIndex(json.load(f))
+
+def main():
+    """Sucht Scripts über den Suchindex"""
+    default_api_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api')
+    parser = argparse.ArgumentParser(description="Sucht Smart Meter Scripts nach Namen")
+    parser.add_argument('query', nargs='+', help="Suchanfrage, z.B. landis e220")
+    parser.add_argument('--api-dir', default=default_api_dir)
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    index = load_search_index(args.api_dir)
+    for name, filename in index.search(' '.join(args.query), args.limit):
+        print(f"{name:<50} {filename}")
+
+if __name__ == "__main__":
+    main()
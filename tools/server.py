@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Lokaler HTTP-Server für den Katalog (api/) und die Scripts (scripts/)
+
+Geräte und Testaufbauten laden api/list.json und scripts/*.txt sonst von raw.githubusercontent.com.
+Der Server liefert dieselben Pfade direkt aus dem Repo-Layout, ohne Netzwerk und lasttestbar:
+
+- /api/<Datei>, /scripts/<Datei>  (auch mit dem Pfad der Raw-URL davor, z.B. /iot-maker/.../main/api/list.json)
+- starke ETags je Repräsentation, If-None-Match -> 304
+- gzip/Brotli aus den vorkomprimierten Dateien (.gz/.br), die catalog.py erzeugt - nie on the fly
+- Range-Anfragen (ein Bereich je Anfrage) -> 206 bzw. 416
+- LRU-Cache der häufig geladenen Dateien im Speicher; ändert die Pipeline eine Datei
+  (atomares Ersetzen, siehe storage.py), wird sie beim nächsten Zugriff neu geladen
+
+Nur asyncio aus der Standardbibliothek, HTTP/1.1 mit Keep-Alive, GET und HEAD.
+"""
+
+import argparse
+import asyncio
+import os
+import posixpath
+import time
+from collections import OrderedDict
+from email.utils import formatdate
+from urllib.parse import unquote, urlsplit
+
+from catalog import API_DIR, RAW_BASE_URL, SCRIPTS_DIR
+from storage import content_hash
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+# Speicher für den LRU-Cache in MiB (0 = jede Anfrage liest die Datei)
+DEFAULT_CACHE_SIZE = 64
+
+SERVER_NAME = "tasmota-smart-meter-scripts"
+
+# Keep-Alive-Verbindungen ohne neue Anfrage werden nach dieser Zeit geschlossen
+IDLE_TIMEOUT = 15
+MAX_HEADER_LINES = 100
+MAX_LINE_LENGTH = 8192
+
+# Vorkomprimierte Varianten in Reihenfolge der Bevorzugung
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+CONTENT_TYPES = {
+    '.json': 'application/json; charset=utf-8',
+    '.txt': 'text/plain; charset=utf-8',
+    '.gz': 'application/gzip',
+    '.br': 'application/octet-stream',
+}
+
+REASONS = {
+    200: 'OK', 206: 'Partial Content', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+    405: 'Method Not Allowed', 416: 'Range Not Satisfiable',
+}
+
+# Geräte prüfen mit If-None-Match, ob sich eine Datei geändert hat
+CACHE_CONTROL = "no-cache"
+
+class CachedFile:
+    """Inhalt einer Datei mit ETag und dem Dateistand, aus dem er gelesen wurde"""
+
+    def __init__(self, content, stamp):
+        self.content = content
+        self.stamp = stamp
+        self.etag = f'"{content_hash(content)[:32]}"'
+        self.last_modified = formatdate(stamp[0] / 1e9, usegmt=True)
+
+class FileCache:
+    """LRU-Cache {Pfad: CachedFile} mit Obergrenze in Bytes
+
+    Jeder Zugriff prüft per stat() Änderungszeit, Größe und Inode - eine atomar ersetzte Datei
+    hat einen neuen Inode und wird neu gelesen. Dateien größer als der Cache werden nicht gehalten.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_SIZE * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.files = OrderedDict()
+        self.size = 0
+        self.stats = {'hits': 0, 'misses': 0, 'reloads': 0, 'evictions': 0}
+
+    def get(self, path):
+        """Liefert die Datei (CachedFile) oder None, wenn sie nicht existiert"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.discard(path)
+            return None
+        stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+
+        cached = self.files.get(path)
+        if cached is not None:
+            if cached.stamp == stamp:
+                self.files.move_to_end(path)
+                self.stats['hits'] += 1
+                return cached
+            self.stats['reloads'] += 1
+            self.discard(path)
+        else:
+            self.stats['misses'] += 1
+
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+        except OSError:
+            return None
+        cached = CachedFile(content, stamp)
+        if len(content) <= self.max_bytes:
+            self.files[path] = cached
+            self.size += len(content)
+            while self.size > self.max_bytes:
+                _, evicted = self.files.popitem(last=False)
+                self.size -= len(evicted.content)
+                self.stats['evictions'] += 1
+        return cached
+
+    def discard(self, path):
+        cached = self.files.pop(path, None)
+        if cached is not None:
+            self.size -= len(cached.content)
+
+def accepted_encodings(header):
+    """Kodierungen aus Accept-Encoding mit q > 0 (z.B. "gzip, br;q=0.5" -> {'gzip', 'br'})"""
+    encodings = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name and q > 0:
+            encodings.add(name.strip().lower())
+    return encodings
+
+def etag_matches(header, etag):
+    """If-None-Match: passt einer der ETags (schwacher Vergleich, "*" passt immer)?"""
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+    return False
+
+def parse_range(header, size):
+    """Wertet einen Range-Header aus: (start, end) inklusive, None (ignorieren, ganze Datei) oder 'unsatisfiable'
+
+    Unterstützt wird ein Bereich je Anfrage ("bytes=0-499", "bytes=500-", "bytes=-500");
+    mehrere Bereiche werden ignoriert und die ganze Datei geliefert.
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, dash, last = spec.strip().partition('-')
+    if not dash:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        elif last:
+            start, end = max(0, size - int(last)), size - 1
+        else:
+            return None
+    except ValueError:
+        return None
+    if start > end and last and first:
+        return None
+    if start >= size or (not first and int(last) == 0):
+        return 'unsatisfiable'
+    return start, min(end, size - 1)
+
+class CatalogServer:
+    """Beantwortet GET/HEAD für /api/ und /scripts/ aus dem LRU-Cache"""
+
+    def __init__(self, api_dir=API_DIR, scripts_dir=SCRIPTS_DIR, cache=None, prefix=None, log=False):
+        self.roots = {'api': os.path.abspath(api_dir), 'scripts': os.path.abspath(scripts_dir)}
+        self.cache = cache if cache is not None else FileCache()
+        # Pfad der Raw-URL (z.B. /iot-maker/tasmota-smart-meter-scripts/main), damit Geräte nur den Host tauschen
+        self.prefix = (urlsplit(RAW_BASE_URL).path if prefix is None else prefix).rstrip('/')
+        self.log = log
+        self.requests = 0
+        self.status_counts = {}
+
+    def resolve(self, target):
+        """Dateipfad zu einem Anfragepfad oder None (unbekannt oder außerhalb von api/ und scripts/)"""
+        path = unquote(urlsplit(target).path)
+        if self.prefix and path.startswith(self.prefix + '/'):
+            path = path[len(self.prefix):]
+        path = posixpath.normpath(path)
+        top, _, rest = path.lstrip('/').partition('/')
+        root = self.roots.get(top)
+        if root is None or not rest or rest.startswith('.') or '/.' in rest:
+            return None
+        filepath = os.path.abspath(os.path.join(root, *rest.split('/')))
+        if not filepath.startswith(root + os.sep):
+            return None
+        return filepath
+
+    def select(self, filepath, headers):
+        """Wählt die Repräsentation: vorkomprimierte Variante, falls akzeptiert - gibt (Datei, Kodierung, Vary) zurück"""
+        accepted = accepted_encodings(headers.get('accept-encoding'))
+        vary = False
+        for encoding, suffix in ENCODINGS:
+            if not os.path.exists(filepath + suffix):
+                continue
+            vary = True
+            if encoding in accepted:
+                variant = self.cache.get(filepath + suffix)
+                if variant is not None:
+                    return variant, encoding, vary
+        return self.cache.get(filepath), None, vary
+
+    def respond(self, method, target, headers):
+        """Erstellt die Antwort - gibt (Status, Header, Body) zurück"""
+        if method not in ('GET', 'HEAD'):
+            return 405, [('Allow', 'GET, HEAD')], b''
+        filepath = self.resolve(target)
+        if filepath is None or not os.path.isfile(filepath):
+            return 404, [('Content-Type', 'text/plain; charset=utf-8')], b'Not Found\n'
+
+        cached, encoding, vary = self.select(filepath, headers)
+        if cached is None:
+            return 404, [('Content-Type', 'text/plain; charset=utf-8')], b'Not Found\n'
+
+        extension = os.path.splitext(filepath)[1]
+        response_headers = [('ETag', cached.etag), ('Last-Modified', cached.last_modified),
+                            ('Cache-Control', CACHE_CONTROL), ('Accept-Ranges', 'bytes')]
+        if vary:
+            response_headers.append(('Vary', 'Accept-Encoding'))
+        if 'if-none-match' in headers and etag_matches(headers['if-none-match'], cached.etag):
+            return 304, response_headers, b''
+
+        response_headers.append(('Content-Type', CONTENT_TYPES.get(extension, 'application/octet-stream')))
+        if encoding:
+            response_headers.append(('Content-Encoding', encoding))
+
+        content = cached.content
+        # If-Range: Bereich nur liefern, wenn der Client noch dieselbe Repräsentation hat
+        if 'range' in headers and headers.get('if-range', cached.etag) == cached.etag:
+            byte_range = parse_range(headers['range'], len(content))
+            if byte_range == 'unsatisfiable':
+                return 416, response_headers + [('Content-Range', f"bytes */{len(content)}")], b''
+            if byte_range is not None:
+                start, end = byte_range
+                response_headers.append(('Content-Range', f"bytes {start}-{end}/{len(content)}"))
+                return 206, response_headers, content[start:end + 1]
+        return 200, response_headers, content
+
+    async def read_request(self, reader):
+        """Liest Anfragezeile und Header - gibt (Methode, Ziel, Version, Header) oder None bei Verbindungsende zurück"""
+        line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+        if not line:
+            return None
+        if len(line) > MAX_LINE_LENGTH:
+            raise ValueError("Anfragezeile zu lang")
+        parts = line.decode('latin-1').split()
+        if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+            raise ValueError("ungültige Anfragezeile")
+
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, colon, value = line.decode('latin-1').partition(':')
+            if not colon:
+                raise ValueError("ungültiger Header")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise ValueError("zu viele Header")
+
+        # Body (bei GET/HEAD unüblich) überspringen, damit die nächste Anfrage lesbar bleibt
+        length = int(headers.get('content-length', 0) or 0)
+        if length:
+            await reader.readexactly(length)
+        return parts[0], parts[1], parts[2], headers
+
+    async def handle(self, reader, writer):
+        """Bedient eine Verbindung - mehrere Anfragen nacheinander (Keep-Alive)"""
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError):
+                    self.write_response(writer, 'GET', 400, [('Content-Type', 'text/plain; charset=utf-8')],
+                                        b'Bad Request\n', False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+
+                method, target, version, headers = request
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                start = time.perf_counter()
+                status, response_headers, body = self.respond(method, target, headers)
+                self.write_response(writer, method, status, response_headers, body, keep_alive)
+                await writer.drain()
+
+                self.requests += 1
+                self.status_counts[status] = self.status_counts.get(status, 0) + 1
+                if self.log:
+                    print(f"{method} {target} {status} {len(body)} B {(time.perf_counter() - start) * 1000:.2f} ms")
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def write_response(self, writer, method, status, headers, body, keep_alive):
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}",
+                 f"Date: {formatdate(usegmt=True)}",
+                 f"Server: {SERVER_NAME}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        # 304 hat keinen Body; eine Länge müsste die der vollständigen Repräsentation sein
+        if status != 304:
+            lines.append(f"Content-Length: {len(body)}")
+        lines += [f"{name}: {value}" for name, value in headers]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        if method != 'HEAD' and status != 304:
+            writer.write(body)
+
+async def serve(server, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+    """Startet den Server und läuft bis zum Abbruch; ready(port) wird nach dem Start aufgerufen"""
+    listener = await asyncio.start_server(server.handle, host, port, backlog=1024)
+    port = listener.sockets[0].getsockname()[1]
+    if ready is not None:
+        ready(port)
+    async with listener:
+        await listener.serve_forever()
+
+def main():
+    """Startet den lokalen Katalog-Server"""
+    parser = argparse.ArgumentParser(description="Lokaler HTTP-Server für api/ und scripts/ (ETag, gzip/br, Range)")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port (0 = beliebiger freier Port)")
+    parser.add_argument('--api-dir', default=API_DIR)
+    parser.add_argument('--scripts-dir', default=SCRIPTS_DIR)
+    parser.add_argument('--cache-size', type=float, default=DEFAULT_CACHE_SIZE, help="LRU-Cache in MiB (0 = aus)")
+    parser.add_argument('--log', action='store_true', help="Jede Anfrage ausgeben")
+    args = parser.parse_args()
+
+    server = CatalogServer(args.api_dir, args.scripts_dir, FileCache(int(args.cache_size * 1024 * 1024)), log=args.log)
+
+    def ready(port):
+        print(f"Katalog unter http://{args.host}:{port}/api/list.json und http://{args.host}:{port}/scripts/", flush=True)
+
+    try:
+        asyncio.run(serve(server, args.host, args.port, ready))
+    except KeyboardInterrupt:
+        stats = server.cache.stats
+        print(f"\nBeendet: {server.requests} Anfragen, Cache {stats['hits']} Treffer, {stats['misses']} Fehlzugriffe, "
+              f"{stats['reloads']} neu geladen")
+
+if __name__ == "__main__":
+    main()
@@ -6,126 +6,83 @@ Extrahiert Smart Meter Scripts von Tasmota Wiki und Bitshake Documentation
 Basiert auf dem funktionierenden ursprünglichen Skript, bereinigt von unnötigen Teilen.
 """
 
+import argparse
+import codecs
+import html as html_module
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from html.parser import HTMLParser
 import re
 import os
+import json
+import struct
+import time
+import zlib
 from difflib import SequenceMatcher
 
-def extract_meter_name_from_heading(heading_element):
-    """Extrahiert Smart Meter Namen aus Überschrift"""
-    if not heading_element:
-        return None
-    
-    text = heading_element.get_text().strip()
-    
-    # Normalisiere alle Landis+Gyr Varianten BEVOR die Regex läuft
-    text_lower = text.lower()
-    if 'gyr' in text_lower:
-        original_text = text
-        # Ersetze alle Varianten durch die korrekte Schreibweise
-        text = re.sub(r'\bLandis\+Gyr\b', 'Landis + Gyr', text, flags=re.IGNORECASE)
-        text = re.sub(r'\bLandis\s+Gyr\b', 'Landis + Gyr', text, flags=re.IGNORECASE)
-        # Gyr am Wortanfang (ohne Landis davor) wird zu Landis + Gyr
-        text = re.sub(r'(?<!\+\s)\bGyr\b', 'Landis + Gyr', text, flags=re.IGNORECASE)
-    
-    # Verbesserte Regex Patterns für Geräte-Erkennung
-    patterns = [
-        # Pattern 1: Vollständiger Herstellername + vollständiger Modellname (z.B. "Engelmann SensoStar E", "Carlo Gavazzi EM340", "Landis + Gyr E220", "EMH eHZ")
-        r'([A-Za-z][a-zA-Z]*(?:\s*[\+\-\&]\s*[A-Za-z][a-zA-Z]*|\s+[A-Za-z][a-zA-Z]*)*)\s+([A-Za-z][a-zA-Z0-9]*(?:[A-Z0-9\-\.\/\+]*[A-Z0-9])?)',
-        # Pattern 2: Abkürzung + Vollständiger Modellname (z.B. "eBZ DD3", "EFR SGM-C2")  
-        r'([a-zA-Z]{2,})\s+([A-Za-z0-9][A-Z0-9\-\.\s/]*[A-Z0-9])',
-        # Pattern 3: Hersteller + Modell mit Zahlen (z.B. "Iskra MT681", "DZG DWS7410")
-        r'([A-Za-z][a-zA-Z]*)\s+([A-Za-z]*[A-Z]*\d+[A-Z0-9\-\.\s/]*)',
-        # Pattern 4: Fallback für kürzere Namen (mindestens 3 Zeichen Modell)
-        r'([A-Za-z][a-zA-Z]+)\s+([A-Za-z0-9]{3,}[A-Z0-9\-\.\s/]*)',
-        # Pattern 5: Spezialfall für abgekürzte Herstellernamen (z.B. "Engelmann Se", "Resol De")
-        r'([A-Za-z][a-zA-Z]+)\s+([A-Za-z][a-z])\b',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text)
-        if match:
-            manufacturer = match.group(1).strip()
-            model = match.group(2).strip()
-            
-            # Spezialbehandlung für abgekürzte Herstellernamen
-            abbreviation_mapping = {
-                'Se': 'SensoStar',
-                'De': 'DeltaSol',
-                'Po': 'Pollucom F'
-            }
-            
-            # Prüfe ob das "Modell" eine Abkürzung ist
-            if model in abbreviation_mapping:
-                model = abbreviation_mapping[model]
-            
-            # Validierung: Modell muss mindestens 2 sinnvolle Zeichen haben (reduziert von 3)
-            model_clean = re.sub(r'[\s\-\.]', '', model)
-            
-            if (len(manufacturer) >= 2 and 
-                len(model_clean) >= 2 
-                and # Reduziert auf 2 für abgekürzte Namen
-                not any(word in text.lower() for word in ['script', 'view', 'example', 'alternative']) 
-                and not model_clean.lower() in ['xxx', 'tbd', 'etc', 'und']):  # Keine Platzhalter
-                
-                return f"{manufacturer} {model}"
-    
-    # Reduzierte Spezialbehandlung nur für echte Edge Cases
-    special_cases = {
-        # Komplexe Überschriften mit Zusatzinformationen
-        'sensus pollucom': 'Sensus Pollucom F',
-        # Vollständige Produktnamen, die nicht aus dem Text extrahiert werden können
-        'huawei r4850': 'HUAWEI R4850G2',
-        # Einzelwort-Geräte ohne expliziten Hersteller
-        'ehzb': 'EMH eHZB',  # Elektronischer Haushaltszähler Version B
-    }
-    
-    text_lower = text.lower()
-    
-    # Spezielle Behandlung für Sensus Pollucom um technische Suffixe zu entfernen
-    if 'sensus pollucom' in text_lower:
-        return 'Sensus Pollucom F'
-    
-    # Führe Regex-Erkennung auf normalisiertem Text aus
-    for pattern in patterns:
-        match = re.search(pattern, text)
-        if match:
-            manufacturer = match.group(1).strip()
-            model = match.group(2).strip()
-            
-            # Spezialbehandlung für abgekürzte Herstellernamen
-            abbreviation_mapping = {
-                'Se': 'SensoStar',
-                'De': 'DeltaSol',
-                'Po': 'Pollucom F'
-            }
-            
-            # Prüfe ob das "Modell" eine Abkürzung ist
-            if model in abbreviation_mapping:
-                return abbreviation_mapping[model]
-                
-            return f"{manufacturer} {model}"
-    
-    # Fallback auf special_cases für Edge Cases
-    for key, value in special_cases.items():
-        if key in text_lower:
-            # Für Sensus: keine zusätzlichen Details extrahieren
-            if 'sensus' in key:
-                return value
-            # Erweitere um weitere Details falls vorhanden (für andere Hersteller)
-            remaining = text_lower.replace(key, '').strip()
-            if remaining:
-                # Extrahiere zusätzliche Modelldetails
-                extra_match = re.search(r'([a-z0-9\-\.]+)', remaining)
-                if extra_match:
-                    return f"{value} {extra_match.group(1).upper()}"
-            return value
-    
-    return None
+from device_names import NAME_NORMALIZER, extract_meter_name, normalize_device_name
+from descriptor_parser import parse_descriptor
+from storage import content_hash, atomic_write, write_if_changed
+from catalog import generate_api, repo_filename
+from snapshots import RecordingSession, ReplaySession
+from instrumentation import PipelineReport, profiled
+from patches import PATCH_CACHE_FILE, PATCHES_DIR, apply_overlay, load_overlay, load_patch_cache, save_patch_cache
+from sources import LocalDirectorySource, PageSource, register_source, registered_sources, stream_records
+
+# lxml ist optional - sein Tokenizer ist deutlich schneller als der eingebaute html.parser
+try:
+    from lxml import etree
+    HTML_PARSER = 'lxml'
+except ImportError:
+    etree = None
+    HTML_PARSER = 'html.parser'
+
+TASMOTA_URL = "https://tasmota.github.io/docs/Smart-Meter-Interface/"
+BITSHAKE_URL = "https://docs.bitshake.de/script/"
+
+# HTTP-Einstellungen für den Abruf der Quellen
+REQUEST_TIMEOUT = 30
+POOL_SIZE = 4
+# Blockgröße beim Lesen der Antworten - der Parser verarbeitet die Seite, während sie ankommt
+CHUNK_SIZE = 64 * 1024
+USER_AGENT = "tasmota-smart-meter-scripts-crawler"
+
+OUTPUT_DIR = "smart_meter_scripts"
+API_OUTPUT_DIR = os.path.join(OUTPUT_DIR, "api")
+
+# Manifest mit Inhalts-Hashes aller geschriebenen Scripts (für inkrementelles Speichern)
+MANIFEST_FILE = ".manifest.json"
+MANIFEST_VERSION = 1
+
+# Cache für ETag/Last-Modified und die zuletzt extrahierten Scripts je Quelle.
+# Bei Änderungen an der Extraktion CACHE_VERSION erhöhen, damit alte Einträge verworfen werden.
+HTTP_CACHE_FILE = os.path.join(OUTPUT_DIR, ".http_cache.json")
+CACHE_VERSION = 1
+
+# Near-Duplicates: gleiches Protokoll und SequenceMatcher-Ratio über DUPLICATE_THRESHOLD.
+# Quellenübergreifend schlägt ein MinHash/LSH-Index (Jaccard über Zeichen-Shingles der normalisierten
+# Script-Zeilen) die Kandidaten vor. Die Schätzung folgt der Ratio nur grob (Ratio 0.89 bei Schätzung
+# 0.72, Ratio 0.63 bei Schätzung 0.61), daher ist CANDIDATE_THRESHOLD niedrig angesetzt und jeder
+# Kandidat wird exakt bestätigt.
+DUPLICATE_THRESHOLD = 0.8
+CANDIDATE_THRESHOLD = 0.5
+SHINGLE_SIZE = 5
+MINHASH_BINS = 128
+LSH_BANDS = 32
 
 def extract_protocol_info(script_content):
-    """Extrahiert Protokoll-Information aus Script"""
+    """Extrahiert Protokoll-Information aus Script
+
+    Maßgeblich ist der Zählertyp der Zählerdefinition im >M Block; nur Scripts ohne
+    erkennbare Zählerdefinition fallen auf die Stichwortsuche zurück.
+    """
+    protocol = parse_descriptor(script_content).protocol
+    if protocol != 'Unknown':
+        return protocol
+    return guess_protocol_info(script_content)
+
+def guess_protocol_info(script_content):
+    """Rät das Protokoll anhand von Stichwörtern im Script"""
     if '+1,' in script_content and 's,' in script_content:
         return 'SML'
     elif '+1,' in script_content and 'o,' in script_content:
@@ -168,354 +125,1141 @@ def extract_variant_info(script_content, heading_text):
     
     return ' '.join(variant_info) if variant_info else None
 
-def normalize_device_name(name):
-    """Normalisiert Gerätenamen für Vergleich"""
-    return re.sub(r'[\s\-\.\+]', '', name.lower())
+def make_record(device_name, script, source, url, variant_text=None):
+    """Script-Datensatz, wie ihn alle Quellen liefern (Protokoll und Variante aus dem Script)"""
+    return {
+        'device_name': device_name,
+        'script': script,
+        'protocol': extract_protocol_info(script),
+        'variant': extract_variant_info(script, device_name if variant_text is None else variant_text),
+        'source': source,
+        'url': url
+    }
 
-def sanitize_filename(filename):
-    """Bereinigt Dateinamen für Windows-Dateisystem"""
-    invalid_chars = '<>:"|?*'
-    for char in invalid_chars:
-        filename = filename.replace(char, '')
+def extract_script(code_text):
+    """Extrahiert ein Tasmota Script aus dem Text eines code-Elements (oder None)"""
+    tasmota_markers = ['>D', '>B', '>M', '+1,']
+    if not any(marker in code_text for marker in tasmota_markers):
+        return None
     
-    filename = filename.replace('\\', '-').replace('/', '-')
-    filename = re.sub(r'\s+', ' ', filename)
+    lines = code_text.strip().split('\n')
+    cleaned_lines = []
     
-    if len(filename) > 200:
-        filename = filename[:200]
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('//'):
+            cleaned_lines.append(line)
     
-    return filename.strip()
+    if len(cleaned_lines) >= 3:  # Mindestens 3 Zeilen für gültiges Script
+        return '\n'.join(cleaned_lines)
+    return None
+
+def available_parsers():
+    """Liefert die installierten HTML-Backends (schnellstes zuerst)"""
+    return ['lxml', 'html.parser'] if etree is not None else ['html.parser']
 
-def extract_scripts_from_element(element):
-    """Extrahiert alle Tasmota Scripts aus einem Element"""
-    scripts = []
+class ForwardingHTMLParser(HTMLParser):
+    """Backend html.parser: leitet die Tokens wie ein lxml-Parser-Target an target weiter"""
     
-    code_blocks = element.find_all('code')
+    def __init__(self, target):
+        super().__init__(convert_charrefs=True)
+        self.target = target
     
-    for code_block in code_blocks:
-        code_text = code_block.get_text()
-        
-        tasmota_markers = ['>D', '>B', '>M', '+1,']
-        if any(marker in code_text for marker in tasmota_markers):
-            
-            lines = code_text.strip().split('\n')
-            cleaned_lines = []
-            
-            for line in lines:
-                line = line.strip()
-                if line and not line.startswith('//'):
-                    cleaned_lines.append(line)
-            
-            if len(cleaned_lines) >= 3:  # Mindestens 3 Zeilen für gültiges Script
-                scripts.append('\n'.join(cleaned_lines))
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, dict(attrs))
     
-    return scripts
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+    
+    def handle_data(self, data):
+        self.target.data(data)
+    
+    def unknown_decl(self, data):
+        if data.startswith('CDATA['):
+            self.target.data(data[6:])
+    
+    def close(self):
+        super().close()
+        return self.target.close()
 
-def similarity(a, b):
-    """Berechnet Ähnlichkeit zwischen zwei Strings"""
-    return SequenceMatcher(None, a, b).ratio()
+def make_tokenizer(target, parser=None):
+    """Streaming-Tokenizer mit dem konfigurierten Backend (lxml falls installiert, sonst html.parser)
+    
+    feed() nimmt die Seite in beliebigen Textblöcken entgegen. Es wird kein Dokumentbaum aufgebaut,
+    die Tokens gehen direkt an target.start(tag, attrib), target.end(tag) und target.data(text);
+    close() ruft target.close() auf und gibt dessen Ergebnis zurück.
+    """
+    parser = parser or HTML_PARSER
+    if parser == 'lxml':
+        return etree.HTMLParser(target=target)
+    if parser == 'html.parser':
+        return ForwardingHTMLParser(target)
+    raise ValueError(f"Unbekanntes HTML-Backend: {parser}")
 
-def crawl_tasmota_wiki():
-    """Crawlt Tasmota Wiki nach Smart Meter Scripts"""
-    url = "https://tasmota.github.io/docs/Smart-Meter-Interface/"
-    scripts = {}
+SECTION_HEADING_RE = re.compile(r'<h([1-4])\b[^>]*>(.*?)</h\1\s*>', re.IGNORECASE | re.DOTALL)
+SECTION_END_RE = re.compile(r'<h[12]\b|</(?:article|main|body)\s*>', re.IGNORECASE)
+TAG_RE = re.compile(r'<[^>]+>')
+
+def extract_section_html(html, title='smart meter descriptors'):
+    """Schneidet die Sektion ab der Überschrift mit `title` bis zur nächsten h1/h2 aus dem HTML-Text
     
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+    So muss von einer vollständig geladenen Seite nur dieser Teil geparst werden. Gibt None zurück,
+    wenn die Überschrift fehlt.
+    """
+    for match in SECTION_HEADING_RE.finditer(html):
+        heading_text = html_module.unescape(TAG_RE.sub('', match.group(2)))
+        if title in heading_text.lower():
+            end = SECTION_END_RE.search(html, match.end())
+            return html[match.start():end.start() if end else len(html)]
+    return None
+
+# Elemente ohne End-Tag - sie öffnen keine Ebene
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr'}
+SECTION_END_TAGS = {'article', 'main', 'body'}
+
+class DescriptorSectionWalker:
+    """Läuft in einem Durchgang über die Sektion "Smart Meter Descriptors" - Parser-Target für make_tokenizer
+    
+    Der Tokenizer liefert die Seite in beliebigen Blöcken, take_events() gibt die seitdem
+    abgeschlossenen Events zurück:
+    
+    ('section', Text)          Überschrift der Sektion gefunden
+    ('heading', Text)          h3-h6 Überschrift auf oberster Ebene der Sektion
+    ('details', Nummer)        details-Element innerhalb eines Sektions-Elements geöffnet
+    ('summary', Nummern, Text) erste summary der offenen details-Elemente mit diesen Nummern
+    ('code', Text, Nummern)    code-Element mit den Nummern der umschließenden details-Elemente
+    ('details_end', Nummer, n) details-Element geschlossen, n = Anzahl noch offener details
+    
+    Die Sektion endet an der nächsten h1/h2 oder am Ende von article/main/body, danach ist done gesetzt.
+    End-Tags ohne offenes Element in der Sektion werden ignoriert.
+    """
+    
+    def __init__(self, title='smart meter descriptors'):
+        self.title = title
+        self.events = []
+        self.in_section = False
+        self.done = False
+        self.stack = []        # offene Elemente innerhalb der Sektion
+        self.heading = None    # (Tag, Textteile) der Überschrift, deren Text gerade gesammelt wird
+        self.details = []      # offene details-Elemente [(Nummer, Tiefe)]
+        self.named = set()     # details-Nummern, deren summary schon gefunden ist
+        self.summary = None    # (Tiefe, Nummern, Textteile)
+        self.code = None       # (Tiefe, Textteile)
+        self.count = 0
+    
+    def take_events(self):
+        events, self.events = self.events, []
+        return events
+    
+    def start(self, tag, attrib):
+        if self.done:
+            return
+        if not self.in_section:
+            if tag in ('h1', 'h2', 'h3', 'h4') and self.heading is None:
+                self.heading = (tag, [])
+            return
+        if tag in ('h1', 'h2'):
+            self.finish()
+            return
         
-        # Finde die "Smart Meter Descriptors" Sektion
-        descriptors_section = None
-        for heading in soup.find_all(['h1', 'h2', 'h3', 'h4']):
-            if 'smart meter descriptors' in heading.get_text().lower():
-                descriptors_section = heading
+        depth = len(self.stack)
+        if self.heading is None:
+            if depth == 0 and tag in ('h3', 'h4', 'h5', 'h6'):
+                self.heading = (tag, [])
+            elif depth > 0 and tag == 'details':
+                self.count += 1
+                self.details.append((self.count, depth))
+                self.events.append(('details', self.count))
+            elif tag == 'summary' and self.summary is None:
+                unnamed = tuple(number for number, _ in self.details if number not in self.named)
+                if unnamed:
+                    self.named.update(unnamed)
+                    self.summary = (depth, unnamed, [])
+            elif depth > 0 and tag == 'code' and self.code is None:
+                self.code = (depth, [])
+        if tag not in VOID_TAGS:
+            self.stack.append(tag)
+    
+    def end(self, tag):
+        if self.done:
+            return
+        if not self.in_section:
+            if self.heading is not None and tag == self.heading[0]:
+                text = ''.join(self.heading[1])
+                self.heading = None
+                if self.title in text.lower():
+                    self.in_section = True
+                    self.events.append(('section', text))
+            return
+        if tag in SECTION_END_TAGS:
+            self.finish()
+            return
+        if tag not in self.stack:
+            return
+        while self.stack:
+            if self.stack.pop() == tag:
+                self.close_element(len(self.stack))
                 break
+            self.close_element(len(self.stack))
+    
+    def data(self, data):
+        if self.done:
+            return
+        for collector in (self.heading, self.summary, self.code):
+            if collector is not None:
+                collector[-1].append(data)
+    
+    def close(self):
+        """Ende der Seite - schließt die Sektion, falls sie noch offen ist"""
+        if not self.done:
+            self.finish()
+    
+    def close_element(self, depth):
+        """Schließt das Element auf Tiefe depth und meldet fertige Überschriften, summary, code und details"""
+        if self.heading is not None and depth == 0:
+            self.events.append(('heading', ''.join(self.heading[1])))
+            self.heading = None
+        if self.summary is not None and depth == self.summary[0]:
+            self.events.append(('summary', self.summary[1], ''.join(self.summary[2])))
+            self.summary = None
+        if self.code is not None and depth == self.code[0]:
+            self.events.append(('code', ''.join(self.code[1]), tuple(number for number, _ in self.details)))
+            self.code = None
+        if self.details and depth == self.details[-1][1]:
+            number, _ = self.details.pop()
+            self.events.append(('details_end', number, len(self.details)))
+    
+    def finish(self):
+        """Beendet die Sektion und schließt alle noch offenen Elemente"""
+        while self.stack:
+            self.stack.pop()
+            self.close_element(len(self.stack))
+        self.done = True
+
+class TextExtractor:
+    """Parser-Target, das den Seitentext wie BeautifulSoup.get_text() sammelt - ohne Dokumentbaum"""
+    
+    SKIP_TAGS = {'script', 'style', 'template'}
+    
+    def __init__(self):
+        self.parts = []
+        self.skip_depth = 0
+    
+    def start(self, tag, attrib):
+        if tag in self.SKIP_TAGS:
+            self.skip_depth += 1
+    
+    def end(self, tag):
+        if tag in self.SKIP_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+    
+    def data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+    
+    def close(self):
+        return self.get_text()
+    
+    def get_text(self):
+        return ''.join(self.parts)
+    
+    def take_text(self):
+        """Text seit dem letzten Aufruf (für die Verarbeitung in Blöcken)"""
+        text = ''.join(self.parts)
+        self.parts = []
+        return text
+
+def scripts_match(script_a, protocol_a, script_b, protocol_b, threshold=DUPLICATE_THRESHOLD):
+    """Exakter Duplikat-Vergleich: gleiches Protokoll und SequenceMatcher-Ratio über threshold
+
+    Scripts verschiedener Protokolle (z.B. SML und OBIS desselben Zählers) sind nie Duplikate.
+    Die günstigen Obergrenzen real_quick_ratio() und quick_ratio() sortieren die meisten Paare aus,
+    bevor ratio() rechnet - das Ergebnis ist dasselbe wie mit ratio() allein.
+    """
+    if protocol_a != protocol_b:
+        return False
+    matcher = SequenceMatcher(None, script_a, script_b)
+    return (matcher.real_quick_ratio() > threshold and matcher.quick_ratio() > threshold
+            and matcher.ratio() > threshold)
+
+def normalize_script(script):
+    """Normalisiert Script-Zeilen (Kleinschreibung, Whitespace) für den Inhaltsvergleich"""
+    lines = (re.sub(r'\s+', ' ', line.strip().lower()) for line in script.split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+def script_shingles(script, size=SHINGLE_SIZE):
+    """Liefert die Hashes aller Zeichen-Shingles eines normalisierten Scripts"""
+    data = normalize_script(script).encode('utf-8')
+    if len(data) <= size:
+        return {zlib.crc32(data)}
+    return {zlib.crc32(data[i:i + size]) for i in range(len(data) - size + 1)}
+
+class NearDuplicateIndex:
+    """MinHash/LSH-Index für Near-Duplicates - Einfügen und Abfragen in annähernd konstanter Zeit"""
+    
+    def __init__(self, threshold=CANDIDATE_THRESHOLD, bins=MINHASH_BINS, bands=LSH_BANDS):
+        if bins % bands:
+            raise ValueError("bins muss ein Vielfaches von bands sein")
+        self.threshold = threshold
+        self.bins = bins
+        self.bands = bands
+        self.rows = bins // bands
+        # Unterstes Bit jedes 64-Bit-Bins (siehe estimate)
+        self.lane_mask = sum(1 << (64 * b) for b in range(bins))
+        self.signatures = {}
+        self.buckets = [{} for _ in range(bands)]
+        self.parents = {}
+        self.comparisons = 0
+    
+    def signature(self, script):
+        """One-Permutation-MinHash: ein Hash pro Shingle, Minimum je Bin, leere Bins per Rotation auffüllen"""
+        bins = self.bins
+        values = [None] * bins
+        for h in script_shingles(script):
+            b = h % bins
+            v = h // bins
+            if values[b] is None or v < values[b]:
+                values[b] = v
         
-        if not descriptors_section:
-            print("Smart Meter Descriptors Sektion nicht gefunden!")
-            return {}
+        # Densification: leere Bins übernehmen den Wert des nächsten belegten Bins (zyklisch)
+        for b in range(bins):
+            if values[b] is None:
+                for offset in range(1, bins):
+                    v = values[(b + offset) % bins]
+                    if v is not None:
+                        values[b] = v + offset * (1 << 32)
+                        break
+        # Eine Zahl mit 64 Bit je Bin: kompakt, der Index hält eine Signatur je Script über den ganzen Lauf
+        return int.from_bytes(struct.pack(f'<{bins}Q', *values), 'little')
+    
+    def estimate(self, sig_a, sig_b):
+        """Schätzt die Jaccard-Ähnlichkeit zweier Signaturen"""
+        # Abweichende Bits jedes Bins auf dessen unterstes Bit falten, dann die abweichenden Bins zählen
+        diff = sig_a ^ sig_b
+        for shift in (32, 16, 8, 4, 2, 1):
+            diff |= diff >> shift
+        return (self.bins - (diff & self.lane_mask).bit_count()) / self.bins
+    
+    def _band_keys(self, sig):
+        data = sig.to_bytes(8 * self.bins, 'little')
+        step = 8 * self.rows
+        return [data[i * step:(i + 1) * step] for i in range(self.bands)]
+    
+    def query(self, script=None, sig=None):
+        """Liefert [(item_id, ähnlichkeit)] aller indizierten Near-Duplicates eines Scripts"""
+        if sig is None:
+            sig = self.signature(script)
         
-        print(f"Gefunden: {descriptors_section.get_text().strip()}")
+        candidates = set()
+        for band, key in zip(self.buckets, self._band_keys(sig)):
+            candidates.update(band.get(key, ()))
         
-        # Sammle alle Elemente bis zur nächsten Hauptüberschrift
-        section_elements = []
-        current = descriptors_section.next_sibling
+        matches = []
+        for item_id in candidates:
+            self.comparisons += 1
+            score = self.estimate(sig, self.signatures[item_id])
+            if score >= self.threshold:
+                matches.append((item_id, score))
+        matches.sort(key=lambda match: -match[1])
+        return matches
+    
+    def add(self, item_id, script, confirm=None):
+        """Indiziert ein Script und gibt die bereits vorhandenen Near-Duplicates zurück
         
-        while current:
-            if hasattr(current, 'name') and current.name:
-                # Stoppe bei nächster Hauptüberschrift (h1, h2)
-                if current.name in ['h1', 'h2']:
-                    break
-                section_elements.append(current)
-            current = current.next_sibling
+        confirm(item_id) prüft jeden Kandidaten nach; nur bestätigte kommen in Ergebnis und Cluster.
+        """
+        sig = self.signature(script)
+        matches = self.query(sig=sig)
+        if confirm is not None:
+            matches = [match for match in matches if confirm(match[0])]
         
-        print(f"Analysiere {len(section_elements)} Elemente in der Sektion...")
+        self.signatures[item_id] = sig
+        self.parents[item_id] = item_id
+        for band, key in zip(self.buckets, self._band_keys(sig)):
+            band.setdefault(key, []).append(item_id)
+        for other, _ in matches:
+            self._union(item_id, other)
+        return matches
+    
+    def _find(self, item_id):
+        while self.parents[item_id] != item_id:
+            self.parents[item_id] = self.parents[self.parents[item_id]]
+            item_id = self.parents[item_id]
+        return item_id
+    
+    def _union(self, a, b):
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a != root_b:
+            self.parents[root_b] = root_a
+    
+    def clusters(self):
+        """Liefert alle Duplikat-Cluster (Gruppen mit mehr als einem Eintrag)"""
+        groups = {}
+        for item_id in self.signatures:
+            groups.setdefault(self._find(item_id), []).append(item_id)
+        return [members for members in groups.values() if len(members) > 1]
+
+def create_session(pool_size=POOL_SIZE):
+    """Erstellt eine Session mit Connection-Pool (Keep-Alive) für alle Quellen"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+def load_http_cache(path=HTTP_CACHE_FILE):
+    """Lädt den HTTP-Cache (ETag/Last-Modified + extrahierte Scripts) von der Festplatte"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    
+    if cache.get('version') != CACHE_VERSION:
+        return {}
+    return cache.get('sources', {})
+
+def save_http_cache(cache, path=HTTP_CACHE_FILE):
+    """Speichert den HTTP-Cache"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    content = json.dumps({'version': CACHE_VERSION, 'sources': cache}, ensure_ascii=False, indent=2, sort_keys=True)
+    write_if_changed(path, content + '\n')
+
+def fetch_page(url, session=None, cache=None, stream=False):
+    """Ruft eine Seite bedingt ab. Gibt None zurück, wenn sich die Seite nicht geändert hat (304)
+    
+    Mit stream=True ist der Body noch nicht gelesen (iter_response_text).
+    """
+    session = session or create_session()
+    entry = cache.get(url) if cache is not None else None
+    
+    headers = {}
+    # Bedingte Anfrage nur, wenn wir das Ergebnis des letzten Laufs noch haben
+    if entry and 'scripts' in entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    
+    response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT, stream=stream)
+    if response.status_code == 304 and headers:
+        return None
+    response.raise_for_status()
+    return response
+
+def iter_response_text(response, chunk_size=CHUNK_SIZE, stats=None):
+    """Liefert den Body einer Antwort als Textblöcke, während er empfangen wird (optional Bytes in stats)"""
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+    for chunk in response.iter_content(chunk_size):
+        if stats is not None:
+            stats['bytes'] = stats.get('bytes', 0) + len(chunk)
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+def open_source(url, session=None, cache=None, report=None):
+    """Ruft eine Quelle bedingt ab - gibt die Antwort (Body noch ungelesen) oder None bei 304 zurück"""
+    start = time.perf_counter()
+    response = fetch_page(url, session, cache, stream=True)
+    if report is not None:
+        report.add('fetch', seconds=time.perf_counter() - start, requests=1, not_modified=int(response is None))
+    if response is None:
+        print(f"Unverändert (304): {url}")
+    return response
+
+def parse_response(url, response, parse, cache=None, report=None):
+    """Parst den Body einer Antwort, während er empfangen wird, und liefert die Datensätze
+    
+    Erst wenn die Seite vollständig und fehlerfrei geparst ist, kommen die Scripts in den Cache.
+    """
+    stats = {}
+    received = {}
+    scripts = {}
+    records = parse(iter_response_text(response, stats=received), url, stats=stats)
+    busy = 0.0
+    try:
+        while True:
+            # Nur die Zeit im Parser (inkl. Empfang) zählen, nicht die Verarbeitung der Datensätze danach
+            start = time.perf_counter()
+            script_data = next(records, None)
+            busy += time.perf_counter() - start
+            if script_data is None:
+                break
+            if cache is not None:
+                scripts.setdefault(normalize_device_name(script_data['device_name']), []).append(script_data)
+            yield script_data
         
-        # Strategie 1: details-Elemente in der Sektion
-        for element in section_elements:
-            if hasattr(element, 'name') and hasattr(element, 'find_all'):
-                details_elements = element.find_all('details')
-                for details in details_elements:
-                    summary = details.find('summary')
-                    if summary:
-                        meter_name = extract_meter_name_from_heading(summary)
-                    if meter_name:
-                        element_scripts = extract_scripts_from_element(details)
-                            
-                        for script in element_scripts:
-                                protocol = extract_protocol_info(script)
-                                variant = extract_variant_info(script, summary.get_text())
-                                
-                                key = normalize_device_name(meter_name)
-                                if key not in scripts:
-                                    scripts[key] = []
-                                
-                                scripts[key].append({
-                                    'device_name': meter_name,
-                                    'script': script,
-                                    'protocol': protocol,
-                                    'variant': variant,
-                                    'source': 'Tasmota Wiki',
-                                    'url': url
-                                })
+        # Der Parser fängt seine Fehler selbst und zählt sie nur - die Quelle gilt dann als abgebrochen
+        if stats.get('errors'):
+            raise ValueError(f"Fehler beim Parsen von {url}")
+        # Leere Ergebnisse nicht cachen, sonst bliebe die Quelle bei 304 leer
+        if cache is not None and scripts:
+            cache[url] = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'scripts': scripts
+            }
+    finally:
+        records.close()
+        response.close()
+        if report is not None:
+            report.add('fetch', bytes=received.get('bytes', 0))
+            report.add('parse', seconds=busy, **stats)
+
+def stream_source(url, parse, session=None, cache=None, report=None):
+    """Ruft eine Quelle ab und liefert ihre Datensätze, sobald der Parser sie findet - bei 304 die gecachten"""
+    response = open_source(url, session, cache, report)
+    if response is None:
+        for device_scripts in cache[url]['scripts'].values():
+            yield from device_scripts
+        return
+    yield from parse_response(url, response, parse, cache, report)
+
+def crawl_source(url, parse, session=None, cache=None, report=None):
+    """Ruft eine Quelle ab und parst sie vollständig {Gerät: [Datensätze]} - bei 304 die gecachten Scripts"""
+    response = open_source(url, session, cache, report)
+    if response is None:
+        return cache[url]['scripts']
+    return group_records(parse_response(url, response, parse, cache, report))
+
+def group_records(records):
+    """Sammelt Datensätze nach Gerät {Gerät: [Datensätze]}"""
+    scripts = {}
+    for script_data in records:
+        scripts.setdefault(normalize_device_name(script_data['device_name']), []).append(script_data)
+    return scripts
+
+class CrawlContext:
+    """Gemeinsame Umgebung der Quellen-Adapter eines Laufs: Session, HTTP-Cache (None: ohne Cache) und Bericht"""
+
+    def __init__(self, session=None, cache=None, report=None):
+        self.session = session or create_session()
+        self.cache = cache
+        self.report = report
+
+    def crawl(self, url, parse):
+        return stream_source(url, parse, self.session, self.cache, self.report)
+
+    def record(self, device_name, script, source, url, variant_text=None):
+        return make_record(device_name, script, source, url, variant_text)
+
+def iter_tasmota_wiki(chunks, url=TASMOTA_URL, stats=None, parser=None):
+    """Liefert die Smart Meter Scripts der Tasmota Wiki Seite, während sie eingelesen wird
+    
+    chunks ist die Seite als Folge von Textblöcken (z.B. iter_response_text), parser das HTML-Backend
+    (Standard: HTML_PARSER). Scripts aus details-Elementen
+    kommen, sobald das äußerste details-Element geschlossen ist. Scripts unter Überschriften werden mit
+    allen bisherigen Scripts desselben Geräts verglichen (scripts_match) und kommen daher erst am Ende
+    der Sektion; bis dahin werden nur die Script-Texte gehalten. Nach der Sektion wird der Rest der Seite nicht mehr
+    gelesen. Optional sammelt stats Zähler für den Laufzeitbericht (Elemente, Scripts, Dedup-Vergleiche).
+    """
+    walker = DescriptorSectionWalker()
+    tokenizer = make_tokenizer(walker, parser)
+    collected = {}
+    comparisons = 0
+    event_counts = {'heading': 0, 'details': 0, 'code': 0}
+    details_entries = {}
+    heading_entries = []
+    current_heading = None
+    found = False
+    
+    def add(record):
+        key = normalize_device_name(record['device_name'])
+        collected.setdefault(key, []).append((record['script'], record['protocol']))
+        return record
+    
+    def flush_details():
+        # Strategie 1: details-Elemente in der Sektion (in der Reihenfolge ihrer Öffnung)
+        for summary, meter_name, element_scripts in details_entries.values():
+            if meter_name:
+                for script in element_scripts:
+                    yield add(make_record(meter_name, script, 'Tasmota Wiki', url, summary))
+        details_entries.clear()
+    
+    def flush_headings():
+        # Strategie 2: Überschriften + Code bis zur nächsten Überschrift
+        nonlocal comparisons
+        for heading, meter_name, element_scripts in heading_entries:
+            key = normalize_device_name(meter_name)
+            for script in element_scripts:
+                # Prüfe auf Duplikate desselben Geräts
+                record = make_record(meter_name, script, 'Tasmota Wiki', url, heading)
+                duplicate = False
+                for other_script, other_protocol in collected.get(key, ()):
+                    comparisons += 1
+                    if scripts_match(script, record['protocol'], other_script, other_protocol):
+                        duplicate = True
+                        break
+                if not duplicate:
+                    yield add(record)
+    
+    def handle(events):
+        nonlocal current_heading, found
+        for event in events:
+            kind = event[0]
+            if kind == 'section':
+                found = True
+                print(f"Gefunden: {event[1].strip()}")
+            elif kind == 'heading':
+                event_counts['heading'] += 1
+                meter_name = extract_meter_name(event[1])
+                current_heading = (event[1], meter_name, []) if meter_name else None
+                if current_heading:
+                    heading_entries.append(current_heading)
+            elif kind == 'details':
+                event_counts['details'] += 1
+                details_entries[event[1]] = [None, None, []]
+            elif kind == 'summary':
+                for number in event[1]:
+                    details_entries[number][:2] = [event[2], extract_meter_name(event[2])]
+            elif kind == 'code':
+                event_counts['code'] += 1
+                script = extract_script(event[1])
+                if not script:
+                    continue
+                for number in event[2]:
+                    details_entries[number][2].append(script)
+                if current_heading:
+                    current_heading[2].append(script)
+            elif kind == 'details_end' and event[2] == 0:
+                yield from flush_details()
+    
+    try:
+        for chunk in chunks:
+            tokenizer.feed(chunk)
+            yield from handle(walker.take_events())
+            if walker.done:
+                break
+        else:
+            tokenizer.close()
+            yield from handle(walker.take_events())
         
-        # Strategie 2: Überschriften + Code in der Sektion
-        for element in section_elements:
-            if hasattr(element, 'name') and element.name in ['h3', 'h4', 'h5', 'h6']:
-                meter_name = extract_meter_name_from_heading(element)
-                if meter_name:
-                    element_scripts = []
-                    
-                    # Sammle Scripts von diesem Element bis zur nächsten Überschrift
-                    current = element.next_sibling
-                    while current:
-                        if hasattr(current, 'name') and current.name:
-                            if current.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                                break
-                        if hasattr(current, 'find_all'):
-                            element_scripts.extend(extract_scripts_from_element(current))
-                        current = current.next_sibling
-                    
-                    for script in element_scripts:
-                        protocol = extract_protocol_info(script)
-                        variant = extract_variant_info(script, element.get_text())
-                        
-                        key = normalize_device_name(meter_name)
-                        if key not in scripts:
-                            scripts[key] = []
-                        
-                        # Prüfe auf Duplikate
-                        is_duplicate = False
-                        for existing in scripts[key]:
-                            if similarity(script, existing['script']) > 0.8:
-                                is_duplicate = True
-                                break
-                        
-                        if not is_duplicate:
-                            scripts[key].append({
-                                'device_name': meter_name,
-                                'script': script,
-                                'protocol': protocol,
-                                'variant': variant,
-                                'source': 'Tasmota Wiki',
-                                'url': url
-                            })
+        if not found:
+            print("Smart Meter Descriptors Sektion nicht gefunden!")
+            return
+        yield from flush_details()
+        yield from flush_headings()
         
-        print(f"Tasmota Wiki: {sum(len(v) for v in scripts.values())} Scripts von {len(scripts)} Geräten")
-        return scripts
+        print(f"Analysiert: {event_counts['heading']} Überschriften, {event_counts['details']} details, {event_counts['code']} Code-Blöcke")
+        total = sum(len(scripts) for scripts in collected.values())
+        print(f"Tasmota Wiki: {total} Scripts von {len(collected)} Geräten")
+        if stats is not None:
+            stats.update({
+                'headings': event_counts['heading'],
+                'details': event_counts['details'],
+                'code_blocks': event_counts['code'],
+                'scripts': total,
+                'devices': len(collected),
+                'dedup_comparisons': comparisons,
+            })
         
     except Exception as e:
-        print(f"Fehler beim Crawlen des Tasmota Wiki: {e}")
-        return {}
+        print(f"Fehler beim Parsen des Tasmota Wiki: {e}")
+        if stats is not None:
+            stats['errors'] = 1
 
-def crawl_bitshake():
-    """Crawlt Bitshake Documentation - mit Anmerkungen als Kommentare"""
-    url = "https://docs.bitshake.de/script/"
-    scripts = {}
+def parse_tasmota_wiki(html, url=TASMOTA_URL, stats=None, parser=None):
+    """Extrahiert Smart Meter Scripts aus der vollständig geladenen Tasmota Wiki Seite {Gerät: [Datensätze]}
+    
+    Geparst wird nur die ausgeschnittene Descriptors-Sektion (ganze Seite, falls die Überschrift fehlt).
+    """
+    section_html = extract_section_html(html)
+    scripts = group_records(iter_tasmota_wiki([section_html or html], url, stats, parser))
+    if stats is not None:
+        stats.update(html_bytes=len(html), section_bytes=len(section_html or html))
+    return scripts
+
+# Reduzierte Spezialbehandlung für Bitshake - nur echte Edge Cases
+BITSHAKE_NAME_FIXES = {
+    # Mehrteilige Herstellernamen
+    'Elster / Honeywell': 'Elster Honeywell',
+    # Bekannte Vollnamen, die Bitshake abkürzt
+    'COMBO Me': 'COMBO Meter',
+    # Unklare Abkürzungen
+    'HZ Ge': 'HZ Generation',
+    'Web Re': 'Web Reader',
+    'Meter De': 'Meter Device',
+}
+
+BITSHAKE_SEPARATOR_RE = re.compile(r'\n\s*-{5,}\s*\n')
+# Ein Trenner ist erst vollständig, wenn danach anderer Text folgt - sonst geht er im nächsten Block evtl. weiter
+SEPARATOR_TAIL_RE = re.compile(r'[^\s-]')
+
+def iter_text_sections(chunks, parser=None):
+    """Liefert den Text einer Seite, zerlegt an den Trennlinien (-----), Sektion für Sektion
+    
+    Ergibt dieselben Sektionen wie re.split über den ganzen Text, ohne ihn vollständig zu halten.
+    """
+    extractor = TextExtractor()
+    tokenizer = make_tokenizer(extractor, parser)
+    pending = ''
+    for chunk in chunks:
+        tokenizer.feed(chunk)
+        pending += extractor.take_text()
+        start = 0
+        for match in BITSHAKE_SEPARATOR_RE.finditer(pending):
+            if not SEPARATOR_TAIL_RE.search(pending, match.end()):
+                break
+            yield pending[start:match.start()]
+            start = match.end()
+        pending = pending[start:]
+    tokenizer.close()
+    yield from BITSHAKE_SEPARATOR_RE.split(pending + extractor.take_text())
+
+def bitshake_record(section, url=BITSHAKE_URL):
+    """Datensatz aus einer Sektion der Bitshake Documentation (Name, Script) - oder None"""
+    if not section.strip():
+        return None
+    
+    lines = section.strip().split('\n')
+    if not lines:
+        return None
+    
+    device_name = lines[0].strip()
+    
+    if (not device_name or 
+        len(device_name) > 100 or 
+        len(device_name) < 3 or
+        device_name.lower() in ['bitshake', 'impressum']):
+        return None
+    
+    # Bereinige und validiere Gerätenamen
+    device_name = device_name.strip()
+    
+    # Gleiche Normalisierung wie für die Überschriften im Tasmota Wiki
+    normalized_name = extract_meter_name(device_name)
+    if normalized_name:
+        device_name = normalized_name
+    
+    for old_name, new_name in BITSHAKE_NAME_FIXES.items():
+        if old_name in device_name:
+            device_name = device_name.replace(old_name, new_name)
+    
+    script_content = '\n'.join(lines[1:]).strip()
+    
+    # Prüfe ob es ein Tasmota Script ist
+    tasmota_markers = ['>D', '>B', '>M', '+1,']
+    if not any(marker in script_content for marker in tasmota_markers):
+        return None
+    
+    # Bereinige Script
+    script_lines = script_content.split('\n')
+    cleaned_lines = []
+    
+    for line in script_lines:
+        line = line.strip()
+        if line and not line.startswith('//'):
+            cleaned_lines.append(line)
+    
+    if len(cleaned_lines) < 3:
+        return None
+    
+    final_script = '\n'.join(cleaned_lines)
+    
+    # Extrahiere versteckte Modellnummern aus dem Volltext der Sektion
+    # Suche nach Honeywell/Elster Modellnummern in Anmerkungen
+    if 'honeywell' in device_name.lower() or 'elster' in device_name.lower():
+        model_match = re.search(r'(AS\d{4})', section)
+        if model_match:
+            model = model_match.group(1)
+            if 'elster' in device_name.lower():
+                device_name = f"Elster Honeywell {model}"
+            else:
+                device_name = f"Honeywell {model}"
+    
+    return make_record(device_name, final_script, 'Bitshake', url)
+
+def iter_bitshake(chunks, url=BITSHAKE_URL, stats=None, parser=None):
+    """Liefert die Smart Meter Scripts der Bitshake Documentation, während sie eingelesen wird
+    
+    Bitshake wird nur als Text ausgewertet - kein Dokumentbaum nötig. Jede Sektion wird ausgewertet,
+    sobald ihre Trennlinie gelesen ist.
+    """
+    counts = {}
+    sections = 0
     
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        content = soup.get_text()
-        sections = re.split(r'\n\s*-{5,}\s*\n', content)
-        
-        for section in sections:
-            if not section.strip():
-                continue
-                
-            lines = section.strip().split('\n')
-            if not lines:
-                continue
-                
-            device_name = lines[0].strip()
-            
-            if (not device_name or 
-                len(device_name) > 100 or 
-                len(device_name) < 3 or
-                device_name.lower() in ['bitshake', 'impressum']):
-                continue
-            
-            # Bereinige und validiere Gerätenamen
-            device_name = device_name.strip()
-            
-            # Verwende extract_meter_name_from_heading für konsistente Normalisierung
-            # Erstelle ein temporäres Element-ähnliches Objekt für die Funktion
-            class TempElement:
-                def __init__(self, text):
-                    self.text = text
-                def get_text(self):
-                    return self.text
-            
-            temp_element = TempElement(device_name)
-            normalized_name = extract_meter_name_from_heading(temp_element)
-            if normalized_name:
-                device_name = normalized_name
-            
-            # Reduzierte Spezialbehandlung für Bitshake - nur echte Edge Cases
-            device_name_fixes = {
-                # Mehrteilige Herstellernamen
-                'Elster / Honeywell': 'Elster Honeywell',
-                # Bekannte Vollnamen, die Bitshake abkürzt
-                'COMBO Me': 'COMBO Meter',
-                # Unklare Abkürzungen
-                'HZ Ge': 'HZ Generation',
-                'Web Re': 'Web Reader', 
-                'Meter De': 'Meter Device',
-            }
-            
-            for old_name, new_name in device_name_fixes.items():
-                if old_name in device_name:
-                    device_name = device_name.replace(old_name, new_name)
-            
-            script_content = '\n'.join(lines[1:]).strip()
-            
-            # Prüfe ob es ein Tasmota Script ist
-            tasmota_markers = ['>D', '>B', '>M', '+1,']
-            if not any(marker in script_content for marker in tasmota_markers):
-                continue
-            
-            # Bereinige Script
-            script_lines = script_content.split('\n')
-            cleaned_lines = []
-            
-            for line in script_lines:
-                line = line.strip()
-                if line and not line.startswith('//'):
-                    cleaned_lines.append(line)
-            
-            if len(cleaned_lines) < 3:
+        for section in iter_text_sections(chunks, parser):
+            sections += 1
+            record = bitshake_record(section, url)
+            if record is None:
                 continue
-            
-            final_script = '\n'.join(cleaned_lines)
-            
-            # Extrahiere versteckte Modellnummern aus dem Volltext der Sektion
-            # Suche nach Honeywell/Elster Modellnummern in Anmerkungen
-            if 'honeywell' in device_name.lower() or 'elster' in device_name.lower():
-                model_match = re.search(r'(AS\d{4})', section)
-                if model_match:
-                    model = model_match.group(1)
-                    if 'elster' in device_name.lower():
-                        device_name = f"Elster Honeywell {model}"
-                    else:
-                        device_name = f"Honeywell {model}"
-            
-            protocol = extract_protocol_info(final_script)
-            variant = extract_variant_info(final_script, device_name)
-            
-            key = normalize_device_name(device_name)
-            if key not in scripts:
-                scripts[key] = []
-            
-            scripts[key].append({
-                'device_name': device_name,
-                'script': final_script,
-                'protocol': protocol,
-                'variant': variant,
-                'source': 'Bitshake',
-                'url': url
-            })
+            key = normalize_device_name(record['device_name'])
+            counts[key] = counts.get(key, 0) + 1
+            yield record
         
-        print(f"Bitshake: {sum(len(v) for v in scripts.values())} Scripts von {len(scripts)} Geräten")
-        return scripts
+        print(f"Bitshake: {sum(counts.values())} Scripts von {len(counts)} Geräten")
+        if stats is not None:
+            stats.update({
+                'sections': sections,
+                'scripts': sum(counts.values()),
+                'devices': len(counts),
+            })
         
     except Exception as e:
-        print(f"Fehler beim Crawlen von Bitshake: {e}")
-        return {}
+        print(f"Fehler beim Parsen von Bitshake: {e}")
+        if stats is not None:
+            stats['errors'] = 1
 
-def merge_scripts(tasmota_scripts, bitshake_scripts):
-    """Mergt Scripts und entfernt Duplikate intelligenter"""
-    merged = {}
+def parse_bitshake(html, url=BITSHAKE_URL, stats=None, parser=None):
+    """Extrahiert Smart Meter Scripts aus der Bitshake Documentation {Gerät: [Datensätze]}"""
+    return group_records(iter_bitshake([html], url, stats, parser))
+
+# Eingebaute Quellen - bei gleichem Gerät gewinnt Bitshake (bessere Qualität)
+register_source(PageSource('tasmota', TASMOTA_URL, iter_tasmota_wiki, priority=10))
+register_source(PageSource('bitshake', BITSHAKE_URL, iter_bitshake, priority=20))
+
+def related_device_keys(a, b):
+    """Prüft, ob zwei normalisierte Gerätenamen dasselbe Gerät meinen (z.B. "honeywellas1440" / "elsterhoneywellas1440")"""
+    # Nur abweichende Herstellerpräfixe zählen - Modellvarianten wie "dtz541" / "dtz541zdba" bleiben getrennt
+    return a.endswith(b) or b.endswith(a)
+
+def merge_scripts(tasmota_scripts, bitshake_scripts, threshold=DUPLICATE_THRESHOLD, stats=None):
+    """Mergt Tasmota Wiki und Bitshake (Bitshake hat die bessere Qualität und gewinnt)"""
+    return merge_sources([bitshake_scripts, tasmota_scripts], threshold, stats)
+
+def merge_sources(source_scripts, threshold=DUPLICATE_THRESHOLD, stats=None):
+    """Mergt beliebig viele Quellen {Gerät: [Datensätze]} nach Priorität (absteigend) und entfernt Duplikate
+
+    Ein Gerät kommt vollständig aus der ersten Quelle, die es liefert (siehe stream_merge).
+    """
+    source_scripts = list(source_scripts)
+    
+    def tagged():
+        for rank, scripts_by_key in enumerate(source_scripts):
+            for scripts in scripts_by_key.values():
+                for script_data in scripts:
+                    yield rank, script_data
+            yield rank, None
     
-    # Füge zuerst alle Bitshake Scripts hinzu (bessere Qualität)
-    for key, scripts in bitshake_scripts.items():
-        merged[key] = scripts
+    return group_records(stream_merge(tagged(), list(range(len(source_scripts))), threshold, stats))
+
+def stream_merge(tagged_records, ranked, threshold=DUPLICATE_THRESHOLD, stats=None):
+    """Mergt einen Datenstrom (Quelle, Datensatz) und liefert jeden Datensatz, sobald er endgültig ist
+    
+    ranked sind die Quellen nach Priorität (absteigend), (Quelle, None) meldet das Ende einer Quelle.
+    Ein Gerät kommt vollständig aus der ersten Quelle, die es liefert. Datensätze der höchsten noch
+    laufenden Quelle werden sofort weitergereicht, die der übrigen gepuffert, bis alle höher
+    priorisierten Quellen fertig sind - erst dann steht fest, ob ihr Gerät schon vergeben ist.
+    """
+    pending = {source: [] for source in ranked}
+    finished = set()
+    position = 0
+    owners = {}
+    counts = {}
+    
+    # Inhaltliche Deduplizierung über alle Quellen: ein Script wird nur verworfen, wenn es
+    # einem Script einer anderen Quelle mit verwandtem Gerätenamen fast gleicht. Der Index
+    # schlägt Kandidaten vor, scripts_match bestätigt sie.
+    index = NearDuplicateIndex()
+    items = {}
+    removed = 0
+    
+    def accept(source, script_data):
+        nonlocal removed
+        key = normalize_device_name(script_data['device_name'])
+        if owners.setdefault(key, source) != source:
+            return False
+        
+        item_id = (key, len(items))
+        script, protocol = script_data['script'], script_data['protocol']
+        duplicates = index.add(item_id, script, lambda other: scripts_match(
+            script, protocol, items[other][2], items[other][3], threshold))
+        items[item_id] = (script_data['device_name'], script_data['source'], script, protocol)
+        if any(dup_key != key and related_device_keys(key, dup_key)
+               and items[(dup_key, m)][1] != script_data['source']
+               for (dup_key, m), _ in duplicates):
+            removed += 1
+            return False
+        counts[key] = counts.get(key, 0) + 1
+        return True
+    
+    for source, script_data in tagged_records:
+        if script_data is not None:
+            if source == ranked[position]:
+                if accept(source, script_data):
+                    yield script_data
+            else:
+                pending[source].append(script_data)
+            continue
+        
+        # Ende einer Quelle: ist sie an der Reihe, kommen die gepufferten Datensätze der nächsten
+        finished.add(source)
+        while position < len(ranked) and ranked[position] in finished:
+            position += 1
+            if position < len(ranked):
+                for buffered in pending[ranked[position]]:
+                    if accept(ranked[position], buffered):
+                        yield buffered
+                pending[ranked[position]] = []
+    
+    # Datenstrom ohne Ende-Meldung aller Quellen: Rest nach Priorität
+    for source in ranked[position:]:
+        for buffered in pending[source]:
+            if accept(source, buffered):
+                yield buffered
+    
+    clusters = index.clusters()
+    print(f"Near-Duplicates: {len(clusters)} Cluster, {removed} Scripts quellenübergreifend entfernt")
+    for cluster in sorted(clusters, key=len, reverse=True):
+        names = sorted(f"{items[item_id][0]} ({items[item_id][1]})" for item_id in cluster)
+        print(f"  - {', '.join(names)}")
     
-    # Füge Tasmota Scripts hinzu, die nicht in Bitshake vorhanden sind
-    for key, scripts in tasmota_scripts.items():
-        if key not in merged:
-            merged[key] = scripts
+    if stats is not None:
+        stats.update({
+            'scripts': sum(counts.values()),
+            'devices': len(counts),
+            'dedup_comparisons': index.comparisons,
+            'clusters': len(clusters),
+            'removed': removed,
+        })
+
+def load_manifest(output_dir=OUTPUT_DIR):
+    """Lädt das Manifest {Dateiname: Metadaten inkl. sha256} des Ausgabeordners"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
     
-    return merged
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('files', {})
+
+def save_manifest(files, output_dir=OUTPUT_DIR):
+    """Speichert das Manifest - nur wenn es sich geändert hat"""
+    content = json.dumps({'version': MANIFEST_VERSION, 'files': files}, ensure_ascii=False, indent=2, sort_keys=True)
+    return write_if_changed(os.path.join(output_dir, MANIFEST_FILE), content + '\n')
+
+def script_filename(script_data):
+    """Erstellt den Dateinamen eines Scripts im Repo-Layout (z.B. "EMH_eHZ_SML.txt")"""
+    return repo_filename(script_data['device_name'], script_data['protocol'])
 
-def save_scripts(scripts):
-    """Speichert Scripts in Dateien"""
-    output_dir = "smart_meter_scripts"
+def save_scripts(scripts, output_dir=OUTPUT_DIR):
+    """Speichert Scripts {Gerät: [Datensätze]} inkrementell (siehe save_records)"""
+    return save_records((script_data for device_scripts in scripts.values() for script_data in device_scripts), output_dir)
+
+def save_records(records, output_dir=OUTPUT_DIR, incomplete=None):
+    """Speichert Scripts aus einem Datenstrom inkrementell: nur geänderte Dateien schreiben, nur verschwundene löschen
+    
+    Jede Datei wird geschrieben, sobald ihr Datensatz eintrifft. Gelöscht wird erst am Ende, wenn
+    feststeht, welche Dateien es noch gibt. incomplete sind die Quellen (Adapter-Namen), die
+    abgebrochen sind oder nichts geliefert haben - erst am Ende gelesen. Ihre Dateien aus dem letzten
+    Lauf bleiben samt Manifest-Eintrag erhalten, ebenso Dateien ohne bekannte Quelle.
+    """
     os.makedirs(output_dir, exist_ok=True)
+    old_files = load_manifest(output_dir)
+    
+    files = {}
+    written = []
+    written_bytes = 0
+    first_write = None
+    start = time.perf_counter()
+    for script_data in records:
+        filename = script_filename(script_data)
+        filepath = os.path.join(output_dir, filename)
+        entry = {
+            'sha256': content_hash(script_data['script']),
+            'device_name': script_data['device_name'],
+            'protocol': script_data['protocol'],
+            'source': script_data['source'],
+            'url': script_data['url']
+        }
+        if 'adapter' in script_data:
+            # Quelle (Adapter-Name), damit ein Abbruch dieser Quelle ihre Dateien nicht löscht
+            entry['adapter'] = script_data['adapter']
+        if 'upstream_sha256' in script_data:
+            # Gepatchtes Script (siehe patches.py): Hash des Upstream-Scripts vor der Korrektur
+            entry['upstream_sha256'] = script_data['upstream_sha256']
+        old_entry = old_files.get(filename)
+        repeated = filename in files
+        files[filename] = entry
+        
+        # Upstream unverändert: Datei nicht anfassen (auch wenn sie manuell korrigiert wurde).
+        # Kommt derselbe Dateiname mehrfach, gewinnt wie bisher der letzte Datensatz.
+        if not repeated and old_entry and old_entry['sha256'] == entry['sha256'] and os.path.exists(filepath):
+            continue
+        
+        if write_if_changed(filepath, script_data['script']):
+            if filename not in written:
+                written.append(filename)
+            written_bytes += len(script_data['script'].encode('utf-8'))
+            if first_write is None:
+                first_write = time.perf_counter() - start
+            print(f"Saved: {filename}")
     
-    # Lösche alte Dateien
-    for filename in os.listdir(output_dir):
-        if filename.endswith('.txt'):
-            filepath = os.path.join(output_dir, filename)
+    # Nur Dateien löschen, die wir selbst geschrieben haben und die upstream verschwunden sind
+    removed = []
+    kept = []
+    for filename, old_entry in old_files.items():
+        if filename in files:
+            continue
+        adapter = old_entry.get('adapter')
+        if incomplete and (adapter is None or adapter in incomplete):
+            # Quelle unvollständig (oder unbekannt): verschwunden ist die Datei nur scheinbar
+            files[filename] = old_entry
+            kept.append(filename)
+            continue
+        filepath = os.path.join(output_dir, filename)
+        if os.path.exists(filepath):
             os.remove(filepath)
+        removed.append(filename)
+        print(f"Removed: {filename}")
+    if kept:
+        print(f"{len(kept)} Dateien behalten - Quelle unvollständig: {', '.join(sorted(incomplete))}")
     
-    for device_scripts in scripts.values():
-        for script_data in device_scripts:
-            device_name = script_data['device_name']
-            protocol = script_data['protocol']
-            script_content = script_data['script']
-            
-            # Erstelle Dateinamen mit Protokoll falls verfügbar
-            filename = device_name
-            if protocol and protocol != 'Unknown':
-                filename += f" ({protocol})"
-            filename = sanitize_filename(filename) + ".txt"
-            
-            filepath = os.path.join(output_dir, filename)
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(script_content)
-            
-            print(f"Saved: {filename}")
+    save_manifest(files, output_dir)
+    
+    unchanged = len(files) - len(written) - len(kept)
+    print(f"{len(written)} geschrieben, {unchanged} unverändert, {len(removed)} entfernt")
+    return {'written': written, 'removed': removed, 'kept': kept, 'unchanged': unchanged, 'bytes': written_bytes,
+            'first_write': first_write}
+
+def run_pipeline(session, cache_file, output_dir=OUTPUT_DIR, report=None, parallel=True, adapters=None, overlay=None):
+    """Crawlt, merged, patcht und speichert alle Scripts als Datenstrom und generiert die API-Dateien
+    
+    overlay sind die Patches {ID: Patch} für manuell korrigierte Scripts (Standard: patches/ im Repo).
+    Gibt ({Quelle: Anzahl Datensätze}, Merge-Statistik {scripts, devices, ...}) zurück.
+    """
+    report = report or PipelineReport()
+    adapters = registered_sources() if adapters is None else adapters
+    ranked = [adapter.name for adapter in sorted(adapters, key=lambda adapter: -adapter.priority)]
+    cache = load_http_cache(cache_file) if cache_file else None
+    context = CrawlContext(session, cache, report)
+    counts = {name: 0 for name in ranked}
+    overlay = load_overlay() if overlay is None else overlay
+    patch_cache_file = os.path.join(output_dir, PATCH_CACHE_FILE)
+    patch_cache = load_patch_cache(patch_cache_file)
+    
+    # Quellen, die abgebrochen sind oder nichts geliefert haben - ihre Dateien werden nicht gelöscht
+    failed = set()
+    
+    def tagged(stream):
+        for adapter, script_data in stream:
+            if script_data is not None:
+                counts[adapter.name] += 1
+                script_data = dict(script_data, adapter=adapter.name)
+            elif not counts[adapter.name] and adapter.name not in failed:
+                print(f"Quelle {adapter.name}: keine Scripts gefunden")
+                failed.add(adapter.name)
+            yield adapter.name, script_data
+    
+    print(f"1. Crawle {', '.join(adapter.name for adapter in adapters)} ({'parallel' if parallel else 'nacheinander'}), "
+          f"merge und speichere als Datenstrom...")
+    names_before = NAME_NORMALIZER.normalize.cache_info()
+    merged = {}
+    patched = {}
+    with report.stage('crawl') as stats:
+        # parallel=False: nacheinander im aufrufenden Thread, z.B. damit cProfile alle Quellen erfasst
+        stream = stream_records(adapters, context, POOL_SIZE if parallel else 1, finished=True, failed=failed)
+        records = apply_overlay(stream_merge(tagged(stream), ranked, stats=merged), overlay, patch_cache, patched)
+        saved = save_records(records, output_dir, incomplete=failed)
+        stats.update(records=sum(counts.values()))
+    if overlay or os.path.exists(patch_cache_file):
+        save_patch_cache(patch_cache, patch_cache_file)
+    names_after = NAME_NORMALIZER.normalize.cache_info()
+    report.add('names', calls=(names_after.hits + names_after.misses) - (names_before.hits + names_before.misses),
+               cache_misses=names_after.misses - names_before.misses)
+    report.add('merge', **merged)
+    if overlay:
+        report.add('patches', **patched)
+    report.add('save', written=len(saved['written']), removed=len(saved['removed']), kept=len(saved['kept']),
+               unchanged=saved['unchanged'], bytes=saved['bytes'])
+    if saved['first_write'] is not None:
+        report.add('save', first_write=saved['first_write'])
+        print(f"Erste Datei nach {saved['first_write'] * 1000:.0f} ms geschrieben")
+    
+    if cache_file:
+        save_http_cache(cache, cache_file)
+    
+    print("\n2. Generiere API-Dateien...")
+    with report.stage('api') as stats:
+        api = generate_api(output_dir, os.path.join(output_dir, os.path.basename(API_OUTPUT_DIR)))
+        stats.update(files=api['files'], written=len(api['written']), removed=len(api['removed']))
+    print(f"{api['files']} API-Dateien, {len(api['written'])} geschrieben, {len(api['removed'])} entfernt")
+    
+    return counts, merged
 
 def main():
     """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description="Crawlt Smart Meter Scripts aus Tasmota Wiki und Bitshake Documentation")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--record', metavar='DIR', help="Rohe HTML-Antworten zusätzlich in DIR aufzeichnen")
+    mode.add_argument('--replay', metavar='DIR', help="Aufgezeichnete Antworten aus DIR verwenden (ohne Netzwerk)")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help=f"Ausgabeordner (Standard: {OUTPUT_DIR})")
+    parser.add_argument('--source', action='append', metavar='NAME',
+                        help="Nur diese Quelle crawlen (mehrfach möglich, Standard: alle angemeldeten)")
+    parser.add_argument('--local-dir', metavar='DIR', help="Eigene Scripts aus DIR als zusätzliche Quelle (höchste Priorität)")
+    parser.add_argument('--patches-dir', default=PATCHES_DIR, help="Patches für manuell korrigierte Scripts")
+    parser.add_argument('--no-patches', action='store_true', help="Scripts unverändert speichern (z.B. um einen Patch aufzuzeichnen)")
+    parser.add_argument('--report', metavar='FILE', help="Messwerte je Stufe (inkl. Spitzen-Speicher) als JSON speichern")
+    parser.add_argument('--profile', metavar='FILE', nargs='?', const='',
+                        help="Lauf unter cProfile ausführen (Quellen nacheinander), Profil optional in FILE speichern")
+    args = parser.parse_args()
+    
     print("=== SMART METER SCRIPT CRAWLER ===")
-    print("Crawlt Tasmota Wiki und Bitshake Documentation\n")
+    print("Crawlt Tasmota Wiki, Bitshake Documentation und weitere angemeldete Quellen\n")
     
-    print("1. Crawle Tasmota Wiki...")
-    tasmota_scripts = crawl_tasmota_wiki()
+    cache_file = os.path.join(args.output_dir, os.path.basename(HTTP_CACHE_FILE))
+    if args.replay:
+        # Wiedergabe parst immer vollständig und lässt den HTTP-Cache unberührt
+        session, cache_file = ReplaySession(args.replay), None
+        print(f"Wiedergabe aus {args.replay}")
+    elif args.record:
+        session = RecordingSession(create_session(), args.record)
+        print(f"Zeichne Antworten in {args.record} auf")
+    else:
+        session = create_session()
     
-    print("\n2. Crawle Bitshake Documentation...")
-    bitshake_scripts = crawl_bitshake()
+    names = args.source
+    if args.local_dir:
+        register_source(LocalDirectorySource(args.local_dir))
+        if names:
+            names = names + ['local']
+    try:
+        adapters = registered_sources(names)
+    except KeyError as e:
+        parser.error(e.args[0])
+    
+    try:
+        overlay = {} if args.no_patches else load_overlay(args.patches_dir)
+    except ValueError as e:
+        parser.error(str(e))
+    if overlay:
+        print(f"{len(overlay)} Patches aus {args.patches_dir}")
     
-    print("\n3. Merge und dedupliziere Scripts...")
-    merged_scripts = merge_scripts(tasmota_scripts, bitshake_scripts)
+    # Spitzen-Speicher (tracemalloc) kostet Laufzeit und wird nur für den JSON-Bericht gemessen
+    report = PipelineReport(trace_memory=bool(args.report))
+    if args.profile is not None:
+        result, profile = profiled(lambda: run_pipeline(session, cache_file, args.output_dir, report,
+                                                        parallel=False, adapters=adapters, overlay=overlay),
+                                   args.profile or None)
+        counts, merged = result
+        print(f"\nProfil (cProfile):\n{profile}")
+    else:
+        counts, merged = run_pipeline(session, cache_file, args.output_dir, report, adapters=adapters, overlay=overlay)
     
-    print("\n4. Speichere finale Scripts...")
-    save_scripts(merged_scripts)
+    print(f"\nStufen:\n{report.summary()}")
+    if args.report:
+        report.save(args.report)
+        print(f"Bericht gespeichert: {args.report}")
     
     # Statistiken
     print(f"\nStatistiken:")
-    print(f"- Gesamt: {sum(len(v) for v in merged_scripts.values())} Scripts")
-    print(f"- Geräte: {len(merged_scripts)}")
-    print(f"- Tasmota: {sum(len(v) for v in tasmota_scripts.values())}")
-    print(f"- Bitshake: {sum(len(v) for v in bitshake_scripts.values())}")
+    print(f"- Gesamt: {merged['scripts']} Scripts")
+    print(f"- Geräte: {merged['devices']}")
+    for name, count in counts.items():
+        print(f"- {name}: {count}")
     
     print(f"\n=== FERTIG ===")
-    print(f"Finale Scripts: {len(merged_scripts)}")
+    print(f"Finale Scripts: {merged['devices']}")
 
 if __name__ == "__main__":
     main()
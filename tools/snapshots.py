@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Aufzeichnen und Wiedergeben der HTTP-Antworten des Crawlers
+
+RecordingSession speichert die rohen HTML-Antworten beider Quellen in einem Verzeichnis,
+ReplaySession liefert sie später ohne Netzwerk wieder aus. Beide verhalten sich für den
+Crawler wie eine requests.Session (nur get() wird verwendet), die Pipeline selbst bleibt unverändert.
+
+Aufbau eines Snapshot-Verzeichnisses:
+
+    snapshots.json         URL -> Datei, Status, Header, Zeitpunkt der Aufnahme
+    <host>_<pfad>.html     rohe Antwort
+"""
+
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from urllib.parse import urlparse
+
+from storage import atomic_write
+
+SNAPSHOT_INDEX = "snapshots.json"
+SNAPSHOT_VERSION = 1
+
+# Header, die für bedingte Anfragen und das Parsen relevant sind
+RECORDED_HEADERS = ('ETag', 'Last-Modified', 'Content-Type')
+
+def snapshot_filename(url):
+    """Dateiname einer URL im Snapshot-Verzeichnis (z.B. tasmota.github.io_docs_Smart-Meter-Interface.html)"""
+    parsed = urlparse(url)
+    name = re.sub(r'[^A-Za-z0-9\-\.]+', '_', f"{parsed.netloc}{parsed.path}").strip('_')
+    return f"{name}.html"
+
+def load_snapshot_index(directory):
+    """Lädt snapshots.json {URL: Metadaten} - leer, wenn noch nichts aufgezeichnet wurde"""
+    try:
+        with open(os.path.join(directory, SNAPSHOT_INDEX), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get('version') != SNAPSHOT_VERSION:
+        return {}
+    return index.get('responses', {})
+
+def save_snapshot_index(directory, responses):
+    """Speichert snapshots.json"""
+    content = json.dumps({'version': SNAPSHOT_VERSION, 'responses': responses}, ensure_ascii=False, indent=2, sort_keys=True)
+    atomic_write(os.path.join(directory, SNAPSHOT_INDEX), content + '\n')
+
+class SnapshotResponse:
+    """Aufgezeichnete Antwort mit den Attributen einer requests.Response, die der Crawler nutzt
+
+    Mit path wird der Body erst beim Zugriff gelesen, iter_content() liest ihn blockweise.
+    """
+    __slots__ = ('url', 'status_code', 'headers', 'encoding', 'path', '_content')
+
+    def __init__(self, url, status_code, headers, content=None, path=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.encoding = 'utf-8'
+        self.path = path
+        self._content = content
+
+    @property
+    def content(self):
+        if self._content is None:
+            with open(self.path, 'rb') as f:
+                self._content = f.read()
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def iter_content(self, chunk_size=1):
+        if self._content is not None:
+            for start in range(0, len(self._content), chunk_size):
+                yield self._content[start:start + chunk_size]
+            return
+        with open(self.path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def close(self):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise OSError(f"{self.status_code} für {self.url} (Snapshot)")
+
+class RecordingSession:
+    """Leitet Anfragen an eine echte Session weiter und speichert jede vollständige Antwort"""
+
+    def __init__(self, session, directory):
+        self.session = session
+        self.directory = directory
+        self.responses = load_snapshot_index(directory)
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, url, headers=None, timeout=None, stream=False):
+        # Ohne bedingte Header, sonst gäbe es bei 304 nichts aufzuzeichnen; die Antwort wird zum
+        # Aufzeichnen vollständig gelesen (auch mit stream=True)
+        response = self.session.get(url, timeout=timeout)
+        if response.status_code == 200:
+            self.record(url, response)
+        return response
+
+    def record(self, url, response):
+        """Speichert Body und Metadaten einer Antwort"""
+        filename = snapshot_filename(url)
+        atomic_write(os.path.join(self.directory, filename), response.content)
+        with self.lock:
+            self.responses[url] = {
+                'file': filename,
+                'status': response.status_code,
+                'headers': {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+                'recorded': datetime.now().isoformat(),
+            }
+            save_snapshot_index(self.directory, self.responses)
+
+class ReplaySession:
+    """Liefert aufgezeichnete Antworten aus einem Snapshot-Verzeichnis - ohne Netzwerk"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.responses = load_snapshot_index(directory)
+        if not self.responses:
+            raise FileNotFoundError(f"Keine Snapshots in {directory} (zuerst mit --record aufzeichnen)")
+
+    def get(self, url, headers=None, timeout=None, stream=False):
+        # Bedingte Header werden ignoriert: eine Wiedergabe liefert immer die vollständige Seite.
+        # Der Body wird erst beim Zugriff gelesen, mit stream=True blockweise.
+        entry = self.responses.get(url)
+        if entry is None:
+            raise KeyError(f"Kein Snapshot für {url} in {self.directory}")
+        return SnapshotResponse(url, entry['status'], dict(entry.get('headers', {})),
+                                path=os.path.join(self.directory, entry['file']))
+
+def write_snapshot(directory, url, content, headers=None):
+    """Legt einen Snapshot direkt an (z.B. für synthetische Seiten in Benchmarks)"""
+    os.makedirs(directory, exist_ok=True)
+    responses = load_snapshot_index(directory)
+    filename = snapshot_filename(url)
+    atomic_write(os.path.join(directory, filename), content)
+    responses[url] = {'file': filename, 'status': 200, 'headers': dict(headers or {}),
+                      'recorded': datetime.now().isoformat()}
+    save_snapshot_index(directory, responses)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Quellen-Adapter für den Crawler
+
+Jede Quelle (Tasmota Wiki, Bitshake Documentation, lokales Verzeichnis, ...) ist ein Adapter
+mit Namen und Priorität, dessen records() die Script-Datensätze als Stream liefert:
+
+    {'device_name', 'script', 'protocol', 'variant', 'source', 'url'}
+
+stream_records() lässt alle Adapter gleichzeitig in einem Thread-Pool laufen und liefert ihre
+Datensätze in Ankunftsreihenfolge. Beim Zusammenführen gewinnt bei gleichem Gerät die Quelle
+mit der höheren Priorität. Neue Quellen werden mit register_source() angemeldet.
+
+Der Crawler stellt den Adaptern einen Kontext bereit:
+
+    context.crawl(url, parse)                    bedingter Abruf, Datensätze während des Parsens
+    context.record(device_name, script, source, url)   Datensatz inkl. Protokoll und Variante
+    context.report                               PipelineReport oder None
+"""
+
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+from catalog import PROTOCOL_SUFFIX_RE
+from device_names import normalize_device_name
+
+SOURCE_WORKERS = 4
+
+# Gepufferte Datensätze je Lauf - schnelle Quellen warten, wenn der Merge nicht nachkommt
+STREAM_BUFFER = 256
+
+# Standard-Prioritäten: lokale Scripts > Bitshake > Tasmota Wiki
+LOCAL_PRIORITY = 30
+
+SOURCE_REGISTRY = {}
+
+class SourceAdapter(ABC):
+    """Basis aller Quellen: Name, Priorität (höher gewinnt) und records(context) als Generator"""
+    name = None
+    priority = 0
+
+    @abstractmethod
+    def records(self, context):
+        """Liefert die Script-Datensätze der Quelle"""
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r}, priority={self.priority})"
+
+class PageSource(SourceAdapter):
+    """Eine Webseite, deren Parser parse(Textblöcke, url, stats) die Datensätze liefert, während die Seite ankommt"""
+
+    def __init__(self, name, url, parse, priority=0):
+        self.name = name
+        self.url = url
+        self.parse = parse
+        self.priority = priority
+
+    def records(self, context):
+        yield from context.crawl(self.url, self.parse)
+
+class LocalDirectorySource(SourceAdapter):
+    """Ein Verzeichnis mit eigenen Scripts im Repo-Layout (z.B. "EMH_eHZ_SML.txt")
+
+    Der Gerätename ergibt sich aus dem Dateinamen ohne Protokoll-Suffix, das Protokoll wie bei
+    den anderen Quellen aus dem Script selbst.
+    """
+
+    def __init__(self, directory, name='local', priority=LOCAL_PRIORITY, label='Lokal'):
+        self.directory = directory
+        self.name = name
+        self.priority = priority
+        self.label = label
+
+    def records(self, context):
+        count = 0
+        size = 0
+        for filename in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, filename)
+            if not filename.endswith('.txt') or not os.path.isfile(path):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                    script = f.read().strip()
+            except OSError as e:
+                print(f"{self.label}: {filename} übersprungen ({e})")
+                continue
+            if not script:
+                continue
+            count += 1
+            size += len(script)
+            device_name = PROTOCOL_SUFFIX_RE.match(filename[:-4]).group(1).replace('_', ' ')
+            yield context.record(device_name, script, self.label, os.path.abspath(path))
+
+        print(f"{self.label}: {count} Scripts aus {self.directory}")
+        if context.report is not None:
+            context.report.add('parse', files=count, bytes=size, scripts=count)
+
+def register_source(adapter):
+    """Meldet einen Adapter an (ersetzt einen gleichnamigen)"""
+    SOURCE_REGISTRY[adapter.name] = adapter
+    return adapter
+
+def registered_sources(names=None):
+    """Angemeldete Adapter nach Priorität (absteigend), optional nur die genannten"""
+    if names is not None:
+        unknown = [name for name in names if name not in SOURCE_REGISTRY]
+        if unknown:
+            raise KeyError(f"Unbekannte Quelle: {', '.join(unknown)} (bekannt: {', '.join(sorted(SOURCE_REGISTRY))})")
+        adapters = [SOURCE_REGISTRY[name] for name in names]
+    else:
+        adapters = list(SOURCE_REGISTRY.values())
+    return sorted(adapters, key=lambda adapter: -adapter.priority)
+
+def stream_records(adapters, context, workers=SOURCE_WORKERS, finished=False, failed=None):
+    """Liefert (Adapter, Datensatz) aller Quellen in Ankunftsreihenfolge
+
+    Die Adapter laufen gleichzeitig in einem Thread-Pool; innerhalb einer Quelle bleibt die
+    Reihenfolge erhalten. Bricht eine Quelle mit einem Fehler ab, wird das gemeldet und die
+    übrigen Quellen laufen weiter. Mit workers=1 laufen die Quellen nacheinander im aufrufenden
+    Thread (z.B. für cProfile). Mit finished=True meldet (Adapter, None) das Ende jeder Quelle.
+    Die Namen abgebrochener Quellen kommen in die Menge failed - spätestens mit ihrem Ende.
+    """
+    if workers <= 1 or len(adapters) <= 1:
+        for adapter in adapters:
+            try:
+                for record in adapter.records(context):
+                    yield adapter, record
+            except Exception as e:
+                print(f"Fehler in Quelle {adapter.name}: {e}")
+                if failed is not None:
+                    failed.add(adapter.name)
+            if finished:
+                yield adapter, None
+        return
+
+    buffer = queue.Queue(STREAM_BUFFER)
+    stop = threading.Event()
+    done = object()
+
+    def run(adapter):
+        try:
+            for record in adapter.records(context):
+                if stop.is_set():
+                    break
+                buffer.put((adapter, record))
+        except Exception as e:
+            print(f"Fehler in Quelle {adapter.name}: {e}")
+            if failed is not None:
+                failed.add(adapter.name)
+        finally:
+            buffer.put((adapter, done))
+
+    remaining = len(adapters)
+    with ThreadPoolExecutor(max_workers=min(workers, len(adapters))) as executor:
+        for adapter in adapters:
+            executor.submit(run, adapter)
+        try:
+            while remaining:
+                adapter, record = buffer.get()
+                if record is done:
+                    remaining -= 1
+                    if finished:
+                        yield adapter, None
+                    continue
+                yield adapter, record
+        finally:
+            # Vorzeitig beendet: wartende Threads freigeben, damit der Pool schließen kann
+            stop.set()
+            while remaining:
+                if buffer.get()[1] is done:
+                    remaining -= 1
+
+def collect_sources(adapters, context, workers=SOURCE_WORKERS):
+    """Führt alle Adapter aus - gibt {Quelle: {Gerät: [Datensätze]}} nach Priorität (absteigend) zurück"""
+    by_source = {adapter.name: {} for adapter in sorted(adapters, key=lambda adapter: -adapter.priority)}
+    for adapter, record in stream_records(adapters, context, workers):
+        key = normalize_device_name(record['device_name'])
+        by_source[adapter.name].setdefault(key, []).append(record)
+    return by_source
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Dateizugriffe für Crawler und API-Generator
+
+Inhalts-Hashes, atomares Schreiben und Schreiben nur bei geändertem Inhalt.
+"""
+
+import hashlib
+import os
+import tempfile
+
+DEFAULT_FILE_MODE = 0o644
+
+def content_hash(content):
+    """SHA-256 eines Script-Inhalts"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+def atomic_write(path, content):
+    """Schreibt eine Datei atomar (temporäre Datei + rename), damit nie halbe Dateien entstehen"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    
+    directory = os.path.dirname(path) or '.'
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except OSError:
+        mode = DEFAULT_FILE_MODE
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        # mkstemp legt Dateien mit 0600 an - veröffentlichte Dateien müssen lesbar bleiben
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_if_changed(path, content):
+    """Schreibt eine Datei nur, wenn sich ihr Inhalt geändert hat. Gibt True zurück, wenn geschrieben wurde"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+    atomic_write(path, content)
+    return True
@@ -0,0 +1,116 @@
+"""Gemeinsame Einstellungen der Tests - die Module in tools/ importieren sich gegenseitig ohne Paket"""
+
+import hashlib
+import os
+import sys
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+TOOLS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, TOOLS_DIR)
+
+import pages
+
+class StandInServer:
+    """Liefert Seiten unter festen Pfaden mit ETag und Last-Modified und beantwortet bedingte Anfragen mit 304
+
+    set_page() legt eine Seite als Text ab (mit Validatoren) oder als Funktion, die die Seite in Textblöcken
+    erzeugt (ohne Validatoren, wird beim Senden erzeugt und nie ganz gehalten). fail() lässt die nächsten
+    Anfragen an einen Pfad mit 503 scheitern. requests zählt alle Anfragen als (Pfad, Status, Header).
+    """
+
+    def __init__(self):
+        self.pages = {}
+        self.failures = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.httpd.server_port}{path}"
+
+    def set_page(self, path, page, modified=1700000000):
+        """Seite ablegen - als Text mit ETag (Hash) und Last-Modified, oder als Funktion, die Textblöcke liefert"""
+        if callable(page):
+            self.pages[path] = (page, None, None)
+            return
+        body = page.encode('utf-8')
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        self.pages[path] = (body, etag, formatdate(modified, usegmt=True))
+
+    def fail(self, path, count=1):
+        self.failures[path] = count
+
+    def statuses(self, path):
+        """Statuscodes aller Anfragen an einen Pfad"""
+        return [status for request_path, status, _ in self.requests if request_path == path]
+
+    def handle(self, request):
+        with self.lock:
+            failing = self.failures.get(request.path, 0)
+            if failing:
+                self.failures[request.path] = failing - 1
+        page = self.pages.get(request.path)
+        if failing or page is None:
+            status = 503 if failing else 404
+            self.respond(request, status, [('Content-Length', '0')])
+            return
+
+        body, etag, last_modified = page
+        if etag is not None and (request.headers.get('If-None-Match') == etag
+                                 or request.headers.get('If-Modified-Since') == last_modified):
+            self.respond(request, 304, [('ETag', etag), ('Last-Modified', last_modified)])
+            return
+
+        if etag is None:
+            # Erzeugte Seite: Länge unbekannt, der Body endet mit der Verbindung (HTTP/1.0)
+            self.respond(request, 200, [('Content-Type', 'text/html; charset=utf-8')])
+            for chunk in body():
+                request.wfile.write(chunk.encode('utf-8'))
+            return
+        self.respond(request, 200, [('Content-Type', 'text/html; charset=utf-8'), ('Content-Length', str(len(body))),
+                                    ('ETag', etag), ('Last-Modified', last_modified)])
+        request.wfile.write(body)
+
+    def respond(self, request, status, headers):
+        with self.lock:
+            self.requests.append((request.path, status, dict(request.headers)))
+        request.send_response(status)
+        for name, value in headers:
+            request.send_header(name, value)
+        request.end_headers()
+
+@pytest.fixture
+def standin_pages():
+    """Seiten des Ersatz-Servers {Pfad: (Seite, Last-Modified)} - ein Testmodul kann eigene Seiten vorgeben"""
+    return {'/tasmota': (pages.tasmota_page(pages.meters(6)), 1700000000),
+            '/bitshake': (pages.bitshake_page(pages.meters(4, seed=1, offset=6)), 1700000000)}
+
+@pytest.fixture
+def standin(standin_pages):
+    """Lokaler HTTP-Server (Port 0) als Ersatz für die Quellseiten, siehe StandInServer"""
+    with StandInServer() as server:
+        for path, (page, modified) in standin_pages.items():
+            server.set_page(path, page, modified)
+        yield server
@@ -0,0 +1,56 @@
+"""Synthetische Quellseiten für die Tests (Aufbau wie Tasmota Wiki und Bitshake Documentation)"""
+
+import html
+import random
+
+UNITS = ('kWh', 'W', 'V', 'A', 'Hz', 'var', 'VA', 'deg')
+WORDS = ('Bezug', 'Einspeisung', 'Leistung', 'Spannung', 'Strom', 'Frequenz', 'Phase', 'Summe', 'Tarif',
+         'Zaehlerstand', 'Wirkleistung', 'Blindleistung', 'Scheinleistung', 'Winkel', 'Status', 'Gesamt')
+
+def meter_script(number, rng):
+    """Eindeutiges SML-Script mit zufälligen OBIS-Codes, Labels und Variablen"""
+    lines = ['>D', f"p{number}=0", '>B', '->sensor53 r', '>M 1', f"+1,{rng.randint(1, 40)},s,0,{rng.choice((2400, 9600))},Z{number}"]
+    for i in range(rng.randint(4, 10)):
+        obis = ''.join(f"{rng.randrange(256):02x}" for _ in range(6))
+        label = ' '.join(rng.sample(WORDS, 2))
+        var = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(6))
+        lines.append(f"1,7707{obis}@{rng.choice((1, 10, 100, 1000))},{label},{rng.choice(UNITS)},{var},{rng.randint(0, 3)}")
+    lines.append('#')
+    return '\n'.join(lines)
+
+def meters(count, seed=0, offset=0):
+    """count Geräte [(Name, Script)] mit eindeutigen Namen und Scripts"""
+    rng = random.Random(seed)
+    return [(f"Testwerk Z{number} (SML)", meter_script(number, rng)) for number in range(offset, offset + count)]
+
+def tasmota_chunks(entries, prose=0):
+    """Tasmota Wiki Seite als Folge von Textblöcken (je Gerät einer) - die Seite liegt nie ganz im Speicher
+
+    Die erste Hälfte der Geräte steht in details-Elementen, die zweite unter Überschriften mit Code
+    (Code nach einer Überschrift gehört bis zur nächsten Überschrift zu ihr). prose verlängert jeden
+    Eintrag um so viele Absätze.
+    """
+    yield '<html><body><article><h1>Smart Meter Interface</h1><h2>Smart Meter Descriptors</h2>\n'
+    paragraph = '<p>Beschreibung des Zählers und seiner Schnittstelle.</p>\n' * prose
+    half = len(entries) // 2
+    for i, (name, script) in enumerate(entries):
+        title, body = html.escape(name), html.escape(script)
+        if i < half:
+            yield (f'<div class="admonition"><details><summary>{title}</summary>{paragraph}'
+                   f'<pre><code>{body}</code></pre></details></div>\n')
+        else:
+            yield f'<h3>{title}</h3>\n{paragraph}<div class="highlight"><pre><code>{body}</code></pre></div>\n'
+    yield '<h2>Weitere Themen</h2></article></body></html>'
+
+def tasmota_page(entries, prose=0):
+    return ''.join(tasmota_chunks(entries, prose))
+
+def bitshake_chunks(entries):
+    """Bitshake Seite als Folge von Textblöcken (Name, Script, Trennlinie)"""
+    yield '<html><body><h1>Bitshake Scripts</h1>\n<p>----------</p>\n'
+    for name, script in entries:
+        yield f'<p>{html.escape(name)}</p>\n<pre><code>{html.escape(script)}\n</code></pre>\n<p>----------</p>\n'
+    yield '<p>Impressum</p></body></html>'
+
+def bitshake_page(entries):
+    return ''.join(bitshake_chunks(entries))
@@ -0,0 +1,67 @@
+"""Tests für die inhaltsadressierte Ablage: Blob-IDs aus dem Inhalt, gemeinsame Blobs, Zusammensetzen"""
+
+import random
+
+from blobs import BLOBS_DIR, apply_substitutions, blob_id, build_blob_store
+from catalog import SCRIPTS_DIR, build_entries
+from storage import content_hash
+
+TEMPLATE = """>D
+>B
+=>sensor53 r
+>M 1
++1,3,s,0,9600,{name},4
+1,77070100010800ff@1000,Verbrauch,kWh,E_in,3
+#
+"""
+
+def write_scripts(scripts_dir, scripts):
+    entries = []
+    for script_id, script in scripts.items():
+        (scripts_dir / f"{script_id}.txt").write_text(script, encoding='utf-8')
+        entries.append({'id': script_id, 'filename': f"{script_id}.txt"})
+    return entries
+
+def assemble(files, ref):
+    base = files[f"{BLOBS_DIR}/{ref['blob']}.txt"].decode('utf-8')
+    return apply_substitutions(base, ref.get('substitutions', []))
+
+def test_identical_scripts_and_meter_name_variants_share_a_blob(tmp_path):
+    scripts = {
+        'EasyMeter_M24_SML': TEMPLATE.format(name='M24'),
+        'EasyMeter_M24_Kopie_SML': TEMPLATE.format(name='M24'),
+        'EasyMeter_M60_SML': TEMPLATE.format(name='M60'),
+        'Anderer_Zaehler_SML': TEMPLATE.format(name='X').replace('Verbrauch', 'Bezug'),
+    }
+    files, refs, data = build_blob_store(write_scripts(tmp_path, scripts), str(tmp_path))
+
+    # Die Basis ist das erste Script der Gruppe (nach ID), ihr Pfad ergibt sich aus ihrem Inhalt
+    shared = blob_id(scripts['EasyMeter_M24_Kopie_SML'].encode('utf-8'))
+    assert shared == content_hash(scripts['EasyMeter_M24_SML'])[:16]
+    assert files[f"{BLOBS_DIR}/{shared}.txt"] == scripts['EasyMeter_M24_SML'].encode('utf-8')
+    assert len(files) == 2
+    assert data['blobs'][shared]['aliases'] == ['EasyMeter_M24_Kopie_SML', 'EasyMeter_M24_SML', 'EasyMeter_M60_SML']
+
+    assert refs['EasyMeter_M24_SML'] == {'blob': shared}
+    assert refs['EasyMeter_M24_Kopie_SML'] == {'blob': shared}
+    assert refs['EasyMeter_M60_SML'] == {'blob': shared, 'substitutions': [[4, '+1,3,s,0,9600,M60,4']]}
+    assert refs['Anderer_Zaehler_SML']['blob'] != shared
+    for script_id, script in scripts.items():
+        assert assemble(files, refs[script_id]) == script
+
+def test_store_does_not_depend_on_entry_order(tmp_path):
+    scripts = {f"Zaehler_{n}_SML": TEMPLATE.format(name=f"Z{n % 3}") for n in range(6)}
+    entries = write_scripts(tmp_path, scripts)
+    first = build_blob_store(entries, str(tmp_path))
+    random.Random(1).shuffle(entries)
+    assert build_blob_store(entries, str(tmp_path)) == first
+
+def test_every_repo_script_is_rebuilt_from_its_blob():
+    entries = build_entries()
+    files, refs, data = build_blob_store(entries, SCRIPTS_DIR)
+    assert len(files) == len(data['blobs']) < len(entries)
+    assert sum(len(blob['aliases']) for blob in data['blobs'].values()) == len(entries)
+    for path, content in files.items():
+        assert path == f"{BLOBS_DIR}/{blob_id(content)}.txt"
+    for entry in entries:
+        assert content_hash(assemble(files, refs[entry['id']]).encode('utf-8')) == entry['sha256']
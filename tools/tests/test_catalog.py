@@ -0,0 +1,41 @@
+"""Tests für die Metadaten der API-Dateien"""
+
+import json
+
+from catalog import build_entries, device_name_of, repo_filename, script_id
+
+OBIS_SCRIPT = """>D
+>B
+->sensor53 r
+>M 1
++1,3,o,0,300,Apator
+1,1.8.0(@1,Bezug,kWh,bezug,3
+#
+"""
+
+def test_protocol_suffix_follows_parsed_script(tmp_path, capsys):
+    """Ein veralteter Name aus scripts.json behält nur den Gerätenamen, das Protokoll kommt aus dem Script"""
+    scripts_dir, api_dir = tmp_path / 'scripts', tmp_path / 'api'
+    scripts_dir.mkdir()
+    api_dir.mkdir()
+    (scripts_dir / 'Apator_12EC3_SML.txt').write_text(OBIS_SCRIPT, encoding='utf-8')
+    (scripts_dir / 'ABB_B23.txt').write_text(OBIS_SCRIPT, encoding='utf-8')
+    (api_dir / 'scripts.json').write_text(json.dumps({'scripts': [
+        {'filename': 'Apator_12EC3_SML.txt', 'display_name': 'Apator 12EC3 (SML)'}]}), encoding='utf-8')
+
+    entries = {entry['filename']: entry for entry in build_entries(str(scripts_dir), str(api_dir))}
+    assert entries['Apator_12EC3_SML.txt']['display_name'] == 'Apator 12EC3 (OBIS)'
+    assert entries['Apator_12EC3_SML.txt']['protocol'] == 'OBIS'
+    assert entries['Apator_12EC3_SML.txt']['model'] == '12EC3'
+    assert entries['ABB_B23.txt']['display_name'] == 'ABB B23 (OBIS)'
+    out = capsys.readouterr().out
+    assert 'Apator_12EC3_SML.txt passt nicht zu "Apator 12EC3 (OBIS)", erwartet Apator_12EC3_OBIS.txt' in out
+    assert 'erwartet ABB_B23_OBIS.txt' in out
+
+def test_ids_and_filenames_follow_display_names(capsys):
+    """Katalog, Shards und Suchindex nutzen die ID - sie muss zum Anzeigenamen und zum Crawler passen"""
+    for entry in build_entries():
+        assert entry['id'] == script_id(entry['display_name'])
+        assert entry['filename'] == f"{entry['id']}.txt"
+        assert repo_filename(device_name_of(entry['display_name']), entry['protocol']) == entry['filename']
+    assert 'Warnung' not in capsys.readouterr().out
@@ -0,0 +1,72 @@
+"""Tests für den Änderungs-Feed (Index plus ein Änderungssatz je Revision)"""
+
+import json
+import os
+import shutil
+
+import changes
+from catalog import SCRIPTS_DIR, generate_api
+from changes import CHANGES_FILE, changes_since, load_changes_data
+
+def read_json(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def make_catalog(tmp_path, count=3):
+    scripts_dir, api_dir = tmp_path / 'scripts', tmp_path / 'api'
+    scripts_dir.mkdir()
+    for filename in sorted(os.listdir(SCRIPTS_DIR))[:count]:
+        shutil.copy(os.path.join(SCRIPTS_DIR, filename), scripts_dir / filename)
+    generate_api(str(scripts_dir), str(api_dir))
+    return scripts_dir, api_dir
+
+def touch_script(scripts_dir, number):
+    path = sorted(scripts_dir.iterdir())[0]
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(f"; Änderung {number}\n")
+    return path.name[:-4]
+
+def test_each_revision_is_a_separate_file(tmp_path):
+    scripts_dir, api_dir = make_catalog(tmp_path)
+    assert read_json(api_dir / CHANGES_FILE) == {'version': 2, 'revision': 1, 'since': 1, 'revisions': []}
+
+    script_id = touch_script(scripts_dir, 1)
+    generate_api(str(scripts_dir), str(api_dir))
+    (scripts_dir / 'Neu_SML.txt').write_text(">D\n>B\n->sensor53 r\n>M 1\n+1,3,s,0,9600,Neu\n1,77070100010800ff@1000,Bezug,kWh,bezug,3\n#\n",
+                                            encoding='utf-8')
+    generate_api(str(scripts_dir), str(api_dir))
+
+    index = read_json(api_dir / CHANGES_FILE)
+    assert index['revision'] == 3
+    assert [(summary['revision'], summary['file'], summary['added'], summary['modified'])
+            for summary in index['revisions']] == [(2, 'changes/2.json', 0, 1), (3, 'changes/3.json', 1, 0)]
+    assert [entry['id'] for entry in read_json(api_dir / 'changes' / '2.json')['modified']] == [script_id]
+    assert os.path.exists(api_dir / 'changes' / '3.json.gz')
+
+    data = load_changes_data(str(api_dir))
+    assert [entry['id'] for entry in changes_since(data, 2)['added']] == ['Neu_SML']
+    assert [entry['id'] for entry in changes_since(data, 1)['modified']] == [script_id]
+
+def test_old_changesets_are_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(changes, 'MAX_REVISIONS', 2)
+    scripts_dir, api_dir = make_catalog(tmp_path)
+    for number in range(4):
+        touch_script(scripts_dir, number)
+        generate_api(str(scripts_dir), str(api_dir))
+
+    index = read_json(api_dir / CHANGES_FILE)
+    assert (index['revision'], index['since']) == (5, 3)
+    assert sorted(os.listdir(api_dir / 'changes')) == ['4.json', '4.json.gz', '5.json', '5.json.gz']
+
+def test_missing_changeset_restarts_the_feed(tmp_path):
+    scripts_dir, api_dir = make_catalog(tmp_path)
+    touch_script(scripts_dir, 1)
+    generate_api(str(scripts_dir), str(api_dir))
+    os.remove(api_dir / 'changes' / '2.json')
+    assert load_changes_data(str(api_dir)) is None
+
+    touch_script(scripts_dir, 2)
+    generate_api(str(scripts_dir), str(api_dir))
+    index = read_json(api_dir / CHANGES_FILE)
+    assert (index['revision'], index['since']) == (3, 2)
+    assert [summary['revision'] for summary in index['revisions']] == [3]
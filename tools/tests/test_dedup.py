@@ -0,0 +1,88 @@
+"""Tests für die Deduplizierung: Ergebnis wie der frühere paarweise Vergleich, nie über Protokollgrenzen"""
+
+import os
+from difflib import SequenceMatcher
+
+import pytest
+from bs4 import BeautifulSoup
+
+import smart_meter_scripts_crawler as crawler
+from benchmark import load_corpus, synthetic_tasmota_page
+from catalog import SCRIPTS_DIR
+from device_names import extract_meter_name, normalize_device_name
+
+with open(os.path.join(SCRIPTS_DIR, 'Landis_Gyr_E220_SML.txt'), 'r', encoding='utf-8') as f:
+    SML_SCRIPT = f.read()
+# Derselbe Zähler als OBIS-Script: nur der Zählertyp in der Zählerdefinition ist anders
+OBIS_SCRIPT = SML_SCRIPT.replace(',s,', ',o,', 1)
+
+def pairwise_baseline(html):
+    """Der frühere Algorithmus auf dem Dokumentbaum: {Gerät: {Scripts}}
+
+    details-Scripts kommen alle, Scripts unter Überschriften nur, wenn kein bisheriges Script
+    desselben Geräts eine SequenceMatcher-Ratio über 0.8 hat.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    heading = next(h for h in soup.find_all(['h1', 'h2', 'h3', 'h4'])
+                   if 'smart meter descriptors' in h.get_text().lower())
+    section = []
+    for element in heading.find_next_siblings():
+        if element.name in ('h1', 'h2'):
+            break
+        section.append(element)
+
+    def scripts_of(element):
+        scripts = (crawler.extract_script(code.get_text()) for code in element.find_all('code'))
+        return [script for script in scripts if script]
+
+    scripts = {}
+    for element in section:
+        for details in element.find_all('details'):
+            summary = details.find('summary')
+            meter_name = summary and extract_meter_name(summary.get_text())
+            if meter_name:
+                scripts.setdefault(normalize_device_name(meter_name), []).extend(scripts_of(details))
+    for element in section:
+        if element.name not in ('h3', 'h4', 'h5', 'h6'):
+            continue
+        meter_name = extract_meter_name(element.get_text())
+        if not meter_name:
+            continue
+        found = []
+        for sibling in element.find_next_siblings():
+            if sibling.name in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
+                break
+            found.extend(scripts_of(sibling))
+        existing = scripts.setdefault(normalize_device_name(meter_name), [])
+        for script in found:
+            if not any(SequenceMatcher(None, script, other).ratio() > 0.8 for other in existing):
+                existing.append(script)
+    return {key: set(found) for key, found in scripts.items() if found}
+
+@pytest.mark.parametrize('parser', crawler.available_parsers())
+def test_page_result_equals_pairwise_baseline(parser, capsys):
+    page = synthetic_tasmota_page(load_corpus())
+    result = crawler.parse_tasmota_wiki(page, parser=parser)
+    found = {key: {script_data['script'] for script_data in scripts} for key, scripts in result.items()}
+
+    assert found == pairwise_baseline(page)
+    assert sum(len(scripts) for scripts in found.values()) == 193
+    # Ähnliche Scripts unterhalb der Schwelle bleiben erhalten (Ratio 0.63 bzw. 0.72)
+    assert len(found['apator12ec3g']) == 2
+    assert len(found['ebzdd3']) == 3
+
+def test_different_protocols_are_never_duplicates():
+    assert SequenceMatcher(None, SML_SCRIPT, OBIS_SCRIPT).ratio() > 0.99
+    assert crawler.scripts_match(SML_SCRIPT, 'SML', SML_SCRIPT.replace('Verbrauch', 'Bezug'), 'SML')
+    assert not crawler.scripts_match(SML_SCRIPT, 'SML', OBIS_SCRIPT, 'OBIS')
+
+@pytest.mark.parametrize('script, removed', [(SML_SCRIPT.replace('Verbrauch', 'Bezug'), True), (OBIS_SCRIPT, False)])
+def test_cross_source_candidates_are_confirmed(script, removed, capsys):
+    high = {'as1440': [crawler.make_record('Honeywell AS1440', SML_SCRIPT, 'Bitshake', 'https://example.org/b')]}
+    low = {'elsteras1440': [crawler.make_record('Elster Honeywell AS1440', script, 'Tasmota Wiki', 'https://example.org/t')]}
+    stats = {}
+    merged = crawler.merge_sources([high, low], stats=stats)
+
+    assert stats['removed'] == int(removed)
+    assert stats['clusters'] == int(removed)
+    assert sum(len(scripts) for scripts in merged.values()) == 2 - int(removed)
@@ -0,0 +1,22 @@
+"""Tests für den Descriptor-Parser"""
+
+from descriptor_parser import parse_descriptor
+
+def test_wrapped_label_is_merged():
+    """Ein umgebrochenes Label wird mit der Wertzeile davor zusammengeführt"""
+    descriptor = parse_descriptor('>M 1\n+1,3,s,0,9600,Iskra\n1,77070100510701ff@1,Phaseangle\nI-L1/U-L1,deg,phi1,1\n#')
+    assert len(descriptor.values) == 1
+    assert descriptor.values[0].label == 'Phaseangle I-L1/U-L1'
+    assert descriptor.values[0].unit == 'deg'
+    assert descriptor.sections[0].lines[1] == '1,77070100510701ff@1,Phaseangle I-L1/U-L1,deg,phi1,1'
+    assert descriptor.errors == []
+
+def test_unknown_line_after_section_header_is_not_merged():
+    """Die erste Zeile einer neuen Sektion gehört nicht zur letzten Wertzeile der vorherigen"""
+    descriptor = parse_descriptor('>M 1\n+1,3,s,0,9600,E\n1,77070100010800ff@1,E,kWh,e,3\n>M 1\nfoo bar')
+    assert [section.lines for section in descriptor.sections] == [
+        ['+1,3,s,0,9600,E', '1,77070100010800ff@1,E,kWh,e,3'],
+        ['foo bar'],
+    ]
+    assert descriptor.values[0].label == 'E'
+    assert descriptor.errors == [(5, 'foo bar')]
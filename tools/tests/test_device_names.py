@@ -0,0 +1,26 @@
+"""Tests für die Gerätenamen-Erkennung gegen die aufgezeichneten Namen aller Scripts in scripts/"""
+
+import json
+import os
+
+import pytest
+
+from benchmark import load_corpus
+from catalog import guess_display_name
+from device_names import DeviceNameNormalizer, extract_meter_name
+
+# Überschrift (Anzeigename jedes Scripts in scripts/) -> erwarteter Gerätename. Aufgezeichnet mit
+# extract_meter_name_from_heading vor der Umstellung auf DeviceNameNormalizer; bei neuen Scripts ergänzen.
+EXPECTED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'device_names.json')
+
+with open(EXPECTED_FILE, 'r', encoding='utf-8') as f:
+    EXPECTED = json.load(f)
+
+def test_every_script_has_a_recorded_name():
+    assert sorted(guess_display_name(name) for name, _ in load_corpus()) == sorted(EXPECTED)
+
+@pytest.mark.parametrize('heading', sorted(EXPECTED))
+def test_normalizer_matches_recorded_name(heading):
+    # Frische Instanz ohne Cache und die gecachte Modulfunktion
+    assert DeviceNameNormalizer(cache_size=0).normalize(heading) == EXPECTED[heading]
+    assert extract_meter_name(heading) == EXPECTED[heading]
@@ -0,0 +1,106 @@
+"""Tests für bedingte Abrufe (ETag/Last-Modified) und den HTTP-Cache über mehrere Läufe"""
+
+import json
+import os
+
+import pytest
+
+import smart_meter_scripts_crawler as crawler
+
+import pages
+
+class CountingParser:
+    """Parser-Hülle, die zählt, wie oft eine Seite tatsächlich geparst wird"""
+
+    def __init__(self, parse):
+        self.parse = parse
+        self.calls = 0
+
+    def __call__(self, chunks, url, stats=None):
+        self.calls += 1
+        return self.parse(chunks, url, stats)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+# Gespeicherte Seiten je Quelle: (Pfad, Parser, Anzahl Scripts)
+SOURCES = {
+    'tasmota': ('/tasmota', crawler.iter_tasmota_wiki, 41),
+    'bitshake': ('/bitshake', crawler.iter_bitshake, 30),
+}
+
+@pytest.fixture
+def standin_pages():
+    """Der Ersatz-Server (conftest) liefert hier die gespeicherten Seiten aus fixtures/"""
+    return {'/tasmota': (load_fixture('tasmota.html'), 1700000000),
+            '/bitshake': (load_fixture('bitshake.html'), 1700003600)}
+
+def crawl_run(url, parse, cache_file, session):
+    """Ein Crawler-Lauf: Cache laden, Quelle abrufen, Cache speichern"""
+    cache = crawler.load_http_cache(str(cache_file))
+    scripts = crawler.crawl_source(url, parse, session, cache)
+    crawler.save_http_cache(cache, str(cache_file))
+    return scripts
+
+@pytest.mark.parametrize('source', sorted(SOURCES))
+def test_validators_persist_and_304_skips_parsing(standin, tmp_path, capsys, source):
+    path, parse, count = SOURCES[source]
+    url, cache_file = standin.url(path), tmp_path / '.http_cache.json'
+    session = crawler.create_session()
+    parse = CountingParser(parse)
+
+    first = crawl_run(url, parse, cache_file, session)
+    assert parse.calls == 1
+    assert sum(len(records) for records in first.values()) == count
+
+    with open(cache_file, encoding='utf-8') as f:
+        entry = json.load(f)['sources'][url]
+    _, etag, last_modified = standin.pages[path]
+    assert (entry['etag'], entry['last_modified']) == (etag, last_modified)
+
+    second = crawl_run(url, parse, cache_file, session)
+    assert parse.calls == 1
+    assert second == json.loads(json.dumps(first))
+    assert standin.statuses(path) == [200, 304]
+    headers = standin.requests[-1][2]
+    assert headers['If-None-Match'] == etag
+    assert headers['If-Modified-Since'] == last_modified
+    assert 'Unverändert (304)' in capsys.readouterr().out
+
+def test_changed_page_is_parsed_and_validators_are_replaced(standin, tmp_path, capsys):
+    url, cache_file = standin.url('/tasmota'), tmp_path / '.http_cache.json'
+    session = crawler.create_session()
+    parse = CountingParser(crawler.iter_tasmota_wiki)
+    crawl_run(url, parse, cache_file, session)
+
+    standin.set_page('/tasmota', pages.tasmota_page(pages.meters(7)), modified=1700086400)
+    scripts = crawl_run(url, parse, cache_file, session)
+    assert parse.calls == 2
+    assert sum(len(records) for records in scripts.values()) == 7
+    assert standin.statuses('/tasmota') == [200, 200]
+    assert crawler.load_http_cache(str(cache_file))[url]['etag'] == standin.pages['/tasmota'][1]
+
+@pytest.mark.parametrize('source', sorted(SOURCES))
+def test_last_modified_alone_is_enough_for_304(standin, tmp_path, capsys, source):
+    path, parse, _ = SOURCES[source]
+    url, cache_file = standin.url(path), tmp_path / '.http_cache.json'
+    session = crawler.create_session()
+    crawl_run(url, parse, cache_file, session)
+
+    cache = crawler.load_http_cache(str(cache_file))
+    cache[url]['etag'] = None
+    assert crawler.fetch_page(url, session, cache) is None
+    assert standin.requests[-1][2]['If-Modified-Since'] == standin.pages[path][2]
+    assert 'If-None-Match' not in standin.requests[-1][2]
+
+def test_no_conditional_request_without_cached_scripts(standin, tmp_path, capsys):
+    url = standin.url('/tasmota')
+    _, etag, last_modified = standin.pages['/tasmota']
+    # Ohne Scripts aus dem letzten Lauf wäre ein 304 nutzlos - die Seite muss geladen werden
+    cache = {url: {'etag': etag, 'last_modified': last_modified}}
+    response = crawler.fetch_page(url, crawler.create_session(), cache)
+    assert response.status_code == 200
+    assert 'If-None-Match' not in standin.requests[-1][2]
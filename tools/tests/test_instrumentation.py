@@ -0,0 +1,50 @@
+"""Tests für den Laufzeitbericht je Pipeline-Stufe und den Profil-Auszug"""
+
+import json
+import threading
+
+from instrumentation import REPORT_VERSION, PipelineReport, profiled
+
+def test_stage_counters_add_up_across_threads():
+    report = PipelineReport()
+
+    def work():
+        for _ in range(1000):
+            report.add('parse', scripts=1, bytes=10)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert report.stages['parse'] == {'scripts': 4000, 'bytes': 40000}
+
+def test_stage_measures_time_and_memory(tmp_path):
+    report = PipelineReport(trace_memory=True)
+    with report.stage('api') as stats:
+        data = [bytes(1024) for _ in range(1024)]
+        stats.update(files=len(data))
+    with report.stage('crawl') as stats:
+        stats.update(records=3)
+
+    assert report.stages['api']['files'] == 1024
+    assert report.stages['api']['seconds'] > 0
+    assert report.stages['api']['peak_memory'] >= 1024 * 1024
+    # Stufen in fester Reihenfolge, unabhängig von der Reihenfolge der Messung
+    assert [line.split()[1] for line in report.summary().splitlines()] == ['crawl', 'api']
+
+    path = tmp_path / 'report.json'
+    report.save(str(path))
+    saved = json.loads(path.read_text(encoding='utf-8'))
+    assert saved['version'] == REPORT_VERSION
+    assert saved['memory_traced'] is True
+    assert saved['stages']['crawl']['records'] == 3
+
+def test_profiled_returns_result_and_listing(tmp_path):
+    def parse_descriptor():
+        return sum(range(1000))
+
+    result, listing = profiled(parse_descriptor, str(tmp_path / 'profil.prof'))
+    assert result == sum(range(1000))
+    assert 'parse_descriptor' in listing
+    assert (tmp_path / 'profil.prof').stat().st_size > 0
@@ -0,0 +1,55 @@
+"""Tests für den OBIS-Index: Abfragen per SML-Hex-Code und OBIS-Kennzahl, inkrementelle Aktualisierung"""
+
+import os
+import shutil
+
+import pytest
+
+from catalog import SCRIPTS_DIR
+from obis_index import ObisIndex, build_obis_data
+from storage import content_hash
+
+SML = 'Landis_Gyr_E220_SML.txt'
+OBIS = 'Apator_12EC3_OBIS.txt'
+
+def entries_of(scripts_dir):
+    entries = []
+    for filename in sorted(os.listdir(scripts_dir)):
+        with open(os.path.join(scripts_dir, filename), 'rb') as f:
+            entries.append({'filename': filename, 'sha256': content_hash(f.read())})
+    return entries
+
+@pytest.fixture
+def scripts_dir(tmp_path):
+    for filename in (SML, OBIS):
+        shutil.copy(os.path.join(SCRIPTS_DIR, filename), tmp_path / filename)
+    return tmp_path
+
+@pytest.mark.parametrize('code', ['77070100010800ff', '0100010800FF', '1-0:1.8.0', '1-0:1.8.0*255', '1.8.0'])
+def test_every_notation_finds_both_meters(scripts_dir, code):
+    index = ObisIndex(build_obis_data(entries_of(scripts_dir), str(scripts_dir))[0])
+    assert index.lookup(code) == [(OBIS, 'Gesamtverbrauch', 'kWh', '1'), (SML, 'Verbrauch', 'kWh', '1000')]
+
+def test_codes_only_one_meter_reads(scripts_dir):
+    index = ObisIndex(build_obis_data(entries_of(scripts_dir), str(scripts_dir))[0])
+    # Momentanleistung liest nur das SML-Script, den Nachttarif nur das OBIS-Script
+    assert index.scripts('77070100100700ff') == [SML]
+    assert index.scripts('1-0:16.7.0') == [SML]
+    assert index.scripts('1-0:1.8.2') == [OBIS]
+    assert index.scripts_with_all(['1.8.0', '2.8.0']) == [OBIS, SML]
+    assert index.scripts_with_all(['1.8.0', '16.7.0', '1.8.2']) == []
+    assert index.lookup('99.99.99') == []
+    assert index.lookup('kein Code') == []
+
+def test_only_changed_scripts_are_parsed_again(scripts_dir):
+    data, parsed = build_obis_data(entries_of(scripts_dir), str(scripts_dir))
+    assert parsed == 2
+    assert build_obis_data(entries_of(scripts_dir), str(scripts_dir), data) == (data, 0)
+
+    path = scripts_dir / SML
+    path.write_text(path.read_text(encoding='utf-8').replace('77070100100700ff', '77070100240700ff'), encoding='utf-8')
+    data, parsed = build_obis_data(entries_of(scripts_dir), str(scripts_dir), data)
+    assert parsed == 1
+    index = ObisIndex(data)
+    assert index.scripts('16.7.0') == []
+    assert index.scripts('36.7.0') == [SML]
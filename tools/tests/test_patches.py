@@ -0,0 +1,88 @@
+"""Tests für das Patch-Overlay (Status je Patch, Cache, Fehler beim Laden)"""
+
+import json
+import os
+
+import pytest
+
+from catalog import SCRIPTS_DIR
+from patches import apply_overlay, load_overlay, make_patch, save_patch
+from watch import Watcher
+
+PATCH_ID = 'Landis_Gyr_E220_SML'
+
+with open(os.path.join(SCRIPTS_DIR, f"{PATCH_ID}.txt"), 'r', encoding='utf-8') as f:
+    FIXED = f.read()
+# Upstream-Stand für die Tests: die Einspeisung mit falscher Skalierung
+UPSTREAM = FIXED.replace('77070100020800ff@1000,Einspeisung', '77070100020800ff@1,Einspeisung')
+
+def record(script):
+    return {'device_name': 'Landis + Gyr E220', 'protocol': 'SML', 'script': script, 'source': 'tasmota'}
+
+def run_overlay(script, overlay, cache):
+    stats = {}
+    records = list(apply_overlay([record(script), dict(record('>D\n#'), device_name='EMH eHZ')], overlay, cache, stats))
+    assert records[1]['script'] == '>D\n#'
+    return records[0], {state: count for state, count in stats.items() if count}
+
+def test_patch_is_applied_and_then_cached(capsys):
+    overlay = {PATCH_ID: make_patch(PATCH_ID, UPSTREAM, FIXED, 'Skalierung der Einspeisung')}
+    cache = {}
+    patched, stats = run_overlay(UPSTREAM, overlay, cache)
+    assert stats == {'applied': 1}
+    assert patched['script'] == FIXED
+    assert patched['upstream_sha256'] == overlay[PATCH_ID]['upstream_sha256']
+    assert cache[PATCH_ID]['status'] == 'applied'
+
+    patched, stats = run_overlay(UPSTREAM, overlay, cache)
+    assert stats == {'cached': 1}
+    assert patched['script'] == FIXED
+
+    # Geänderter Patch: der Cache-Eintrag gilt nicht mehr
+    overlay[PATCH_ID] = dict(overlay[PATCH_ID], note='neu aufgezeichnet')
+    assert run_overlay(UPSTREAM, overlay, cache)[1] == {'applied': 1}
+
+def test_patch_is_rebased_onto_changed_upstream(capsys):
+    overlay = {PATCH_ID: make_patch(PATCH_ID, UPSTREAM, FIXED)}
+    changed = UPSTREAM.replace('>M 1\n', '>M 1\n; neuer Kommentar upstream\n')
+    patched, stats = run_overlay(changed, overlay, {})
+    assert stats == {'rebased': 1}
+    assert patched['script'] == FIXED.replace('>M 1\n', '>M 1\n; neuer Kommentar upstream\n')
+    assert 'bitte prüfen' in capsys.readouterr().out
+
+def test_conflicting_upstream_is_saved_unchanged(capsys):
+    overlay = {PATCH_ID: make_patch(PATCH_ID, UPSTREAM, FIXED)}
+    changed = UPSTREAM.replace('Verbrauch,kWh', 'Bezug,kWh')
+    cache = {}
+    patched, stats = run_overlay(changed, overlay, cache)
+    assert stats == {'conflict': 1}
+    assert patched['script'] == changed
+    assert 'upstream_sha256' not in patched
+    assert cache[PATCH_ID]['script'] is None
+    assert 'KONFLIKT' in capsys.readouterr().out
+
+def test_obsolete_and_missing_patches(capsys):
+    overlay = {PATCH_ID: make_patch(PATCH_ID, UPSTREAM, FIXED), 'Gibt_es_nicht_SML': make_patch('Gibt_es_nicht_SML', 'a', 'b')}
+    patched, stats = run_overlay(FIXED, overlay, {})
+    assert stats == {'obsolete': 1, 'missing': 1}
+    assert patched['script'] == FIXED
+
+def test_watcher_keeps_last_valid_overlay(tmp_path, capsys):
+    patches_dir = tmp_path / 'patches'
+    path = save_patch(make_patch(PATCH_ID, UPSTREAM, FIXED), str(patches_dir))
+    watcher = Watcher([], output_dir=str(tmp_path / 'out'), patches_dir=str(patches_dir))
+    assert watcher.reload_overlay()
+    valid = watcher.overlay
+    assert list(valid) == [PATCH_ID]
+
+    for broken in ('{"version": 1, "id": "Landis_Gy', json.dumps({'version': 1, 'id': PATCH_ID})):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(broken)
+        watcher.reload_overlay()
+        assert watcher.overlay is valid
+        assert f"Patches nicht geladen: {PATCH_ID}.json" in capsys.readouterr().out
+
+def test_incomplete_patch_is_rejected(tmp_path):
+    (tmp_path / 'Kaputt_SML.json').write_text(json.dumps({'version': 1, 'id': 'Kaputt_SML', 'hunks': []}), encoding='utf-8')
+    with pytest.raises(ValueError, match='upstream_sha256'):
+        load_overlay(str(tmp_path))
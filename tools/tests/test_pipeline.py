@@ -0,0 +1,94 @@
+"""Tests für den ganzen Lauf: Quellen abrufen, mergen, speichern, API-Dateien erzeugen"""
+
+import json
+import os
+
+import pytest
+
+import smart_meter_scripts_crawler as crawler
+from instrumentation import PipelineReport
+from sources import PageSource
+
+def broken_tasmota(chunks, url, stats=None):
+    """Tasmota Parser, dessen Verbindung nach der Hälfte der Seite abreißt"""
+    def cut(chunks):
+        text = ''.join(chunks)
+        yield text[:len(text) // 2]
+        raise ConnectionError("Verbindung abgebrochen")
+    return crawler.iter_tasmota_wiki(cut(chunks), url, stats)
+
+def run(standin, output_dir, tasmota_parse=crawler.iter_tasmota_wiki, report=None):
+    adapters = [PageSource('bitshake', standin.url('/bitshake'), crawler.iter_bitshake, 20),
+                PageSource('tasmota', standin.url('/tasmota'), tasmota_parse, 10)]
+    return crawler.run_pipeline(crawler.create_session(), os.path.join(output_dir, '.http_cache.json'), output_dir,
+                                report=report, adapters=adapters, overlay={})
+
+def snapshot(directory):
+    """Inhalt aller Dateien {relativer Pfad: Bytes}"""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                files[os.path.relpath(path, directory)] = f.read()
+    return files
+
+def mtimes(directory):
+    """mtime aller Dateien und Ordner {relativer Pfad: mtime_ns}, der Ordner selbst als '.'"""
+    found = {'.': os.stat(directory).st_mtime_ns}
+    for root, dirs, names in os.walk(directory):
+        for name in dirs + names:
+            path = os.path.join(root, name)
+            found[os.path.relpath(path, directory)] = os.stat(path).st_mtime_ns
+    return found
+
+def backdate(directory, mtime=1000000000):
+    """Setzt die mtime aller Dateien und Ordner zurück und gibt sie zurück (siehe mtimes)"""
+    for path in mtimes(directory):
+        os.utime(os.path.join(directory, path), (mtime, mtime))
+    return mtimes(directory)
+
+@pytest.mark.parametrize('failure', ['http', 'parse', 'empty'])
+def test_failed_source_keeps_its_files(standin, standin_pages, tmp_path, capsys, failure):
+    output_dir = str(tmp_path)
+    run(standin, output_dir)
+    before = snapshot(output_dir)
+    manifest = json.loads(before['.manifest.json'])['files']
+    assert len([name for name in before if name.endswith('.txt') and os.sep not in name]) == 10
+    assert {entry['adapter'] for entry in manifest.values()} == {'tasmota', 'bitshake'}
+
+    parse = crawler.iter_tasmota_wiki
+    if failure == 'http':
+        standin.fail('/tasmota')
+    elif failure == 'parse':
+        # Geänderte Seite (neuer ETag), der Abruf bricht aber mitten in der Seite ab
+        standin.set_page('/tasmota', standin_pages['/tasmota'][0] + '<!-- neu -->', modified=1700086400)
+        parse = broken_tasmota
+    else:
+        # Seite ohne Descriptor-Sektion, z.B. nach einem Umbau des Wikis
+        standin.set_page('/tasmota', '<html><body><h1>Smart Meter Interface</h1></body></html>', modified=1700086400)
+    capsys.readouterr()
+    counts, _ = run(standin, output_dir, parse)
+
+    assert counts['bitshake'] == 4
+    assert snapshot(output_dir) == before
+    out = capsys.readouterr().out
+    assert 'Removed:' not in out
+    assert 'Dateien behalten - Quelle unvollständig: tasmota' in out
+
+def test_unchanged_run_writes_nothing(standin, tmp_path, capsys):
+    output_dir = str(tmp_path)
+    run(standin, output_dir)
+    # Alle Zeitstempel zurückdatieren: jeder Schreibzugriff im zweiten Lauf fällt auf
+    before = backdate(output_dir)
+    assert {'.manifest.json', '.http_cache.json', 'api', os.path.join('api', 'scripts.json')} <= set(before)
+
+    report = PipelineReport()
+    run(standin, output_dir, report=report)
+    save, api = report.stages['save'], report.stages['api']
+    assert (save['written'], save['removed'], save['kept'], save['unchanged']) == (0, 0, 0, 10)
+    assert (api['written'], api['removed']) == (0, 0)
+    assert standin.statuses('/tasmota') == [200, 304]
+    assert standin.statuses('/bitshake') == [200, 304]
+    assert mtimes(output_dir) == before
+    assert '0 geschrieben, 10 unverändert, 0 entfernt' in capsys.readouterr().out
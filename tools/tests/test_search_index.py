@@ -0,0 +1,38 @@
+"""Tests für die Rangfolge der Typeahead-Suche auf dem Katalog aus scripts/"""
+
+import pytest
+
+from catalog import build_entries
+from search_index import SearchIndex, build_search_data
+
+@pytest.fixture(scope='module')
+def index():
+    return SearchIndex(build_search_data(build_entries()))
+
+def names(index, query, limit=10):
+    return [name for name, _ in index.search(query, limit)]
+
+@pytest.mark.parametrize('query', ['landis e220', 'Landis+Gyr E220', 'L+G E220', 'e220 landis', 'LANDIS   E220'])
+def test_landis_e220(index, query):
+    assert index.search(query) == [('Landis + Gyr E220 (SML)', 'Landis_Gyr_E220_SML.txt')]
+
+def test_prefix_ranks_shorter_names_first(index):
+    assert names(index, 'landis e2') == ['Landis + Gyr E220 (SML)', 'Landis + Gyr E230 (OBIS)']
+
+def test_ehz_ranks_whole_words_before_prefixes(index):
+    found = names(index, 'ehz', limit=50)
+    whole_word = ['EMH eHZ (SML)', 'EMH eHZ G (SML)', 'Itron eHZ (SML)', 'Iskra eHZ-MS2020 (SML)',
+                  'Apator Picus eHZ.060.D-J (SML)', 'Iskra eHZ-MT681-D4A51-K0 (SML)', 'Iskra eHZ-MT681-D4A52-K0 (SML)']
+    assert found[:len(whole_word)] == whole_word
+    # Danach nur Namen, in denen "ehz" ein Wortanfang ist (eHZB, EHZ363, ...)
+    assert {'EMH eHZB (SML)', 'EMH eHZM (SML)', 'Hager EHZ363 (SML)', 'Holley EHZ541 (SML)'} <= set(found[len(whole_word):])
+    assert names(index, 'ehz', limit=3) == whole_word[:3]
+
+@pytest.mark.parametrize('query', ['dws 7410', 'dws7410', 'DZG DWS7410', '7410'])
+def test_dws_7410(index, query):
+    assert names(index, query) == ['DZG DWS7410 (SML)', 'DZG DWS7410.2V.G2 (SML)']
+
+def test_every_word_must_match(index):
+    assert names(index, 'dws 7410 g2') == ['DZG DWS7410.2V.G2 (SML)']
+    assert index.search('landis ehz') == []
+    assert index.search('') == []
@@ -0,0 +1,115 @@
+"""Tests für den Katalog-Server: ETag/304, vorkomprimierte Varianten, Range-Anfragen, Pfade außerhalb"""
+
+import asyncio
+import gzip
+import http.client
+import json
+import threading
+
+import pytest
+
+from server import CatalogServer, serve
+
+LIST = json.dumps({'scripts': [{'id': f"Zaehler_{n}_SML"} for n in range(50)]}, indent=2).encode('utf-8')
+SCRIPT = b">D\n>B\n=>sensor53 r\n>M 1\n+1,3,s,0,9600,E220,4\n1,77070100010800ff@1000,Verbrauch,kWh,E_in,3\n#\n"
+
+@pytest.fixture
+def server(tmp_path):
+    """Server im selben Prozess (eigener Event-Loop im Hintergrund) - gibt den Port zurück"""
+    (tmp_path / 'api').mkdir()
+    (tmp_path / 'scripts').mkdir()
+    (tmp_path / 'api' / 'list.json').write_bytes(LIST)
+    (tmp_path / 'api' / 'list.json.gz').write_bytes(gzip.compress(LIST, mtime=0))
+    (tmp_path / 'scripts' / 'Landis_Gyr_E220_SML.txt').write_bytes(SCRIPT)
+    # Liegt neben api/ und scripts/ und darf nie ausgeliefert werden
+    (tmp_path / 'secret.txt').write_text('geheim', encoding='utf-8')
+
+    catalog = CatalogServer(str(tmp_path / 'api'), str(tmp_path / 'scripts'), prefix='')
+    ready = threading.Event()
+    running = {}
+
+    async def main():
+        running['loop'], running['task'] = asyncio.get_running_loop(), asyncio.current_task()
+        await serve(catalog, '127.0.0.1', 0, lambda port: (running.update(port=port), ready.set()))
+
+    def run():
+        # asyncio.run beendet beim Abbruch auch die noch offenen Verbindungen
+        try:
+            asyncio.run(main())
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert ready.wait(5)
+    yield running['port']
+
+    running['loop'].call_soon_threadsafe(running['task'].cancel)
+    thread.join(5)
+
+def get(port, path, **headers):
+    """GET ohne Dekomprimierung - gibt (Status, {Header}, Body) zurück"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    try:
+        connection.request('GET', path, headers={name.replace('_', '-'): value for name, value in headers.items()})
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+def test_repeated_etag_gives_304(server):
+    status, headers, body = get(server, '/api/list.json')
+    assert (status, body) == (200, LIST)
+    etag = headers['ETag']
+
+    status, headers, body = get(server, '/api/list.json', If_None_Match=etag)
+    assert (status, body) == (304, b'')
+    assert headers['ETag'] == etag
+    assert get(server, '/api/list.json', If_None_Match='"anders"')[0] == 200
+
+def test_gzip_variant_is_selected_with_vary(server):
+    status, headers, body = get(server, '/api/list.json', Accept_Encoding='br;q=0, gzip')
+    assert status == 200
+    assert headers['Content-Encoding'] == 'gzip'
+    assert headers['Vary'] == 'Accept-Encoding'
+    assert headers['Content-Type'] == 'application/json; charset=utf-8'
+    assert gzip.decompress(body) == LIST
+
+    # Ohne Accept-Encoding unkomprimiert, aber mit Vary (es gibt eine Variante) und eigenem ETag
+    status, plain_headers, body = get(server, '/api/list.json')
+    assert (status, body) == (200, LIST)
+    assert 'Content-Encoding' not in plain_headers
+    assert plain_headers['Vary'] == 'Accept-Encoding'
+    assert plain_headers['ETag'] != headers['ETag']
+
+    # Ohne vorkomprimierte Variante kein Vary
+    status, headers, body = get(server, '/scripts/Landis_Gyr_E220_SML.txt', Accept_Encoding='gzip')
+    assert (status, body) == (200, SCRIPT)
+    assert 'Content-Encoding' not in headers
+    assert 'Vary' not in headers
+
+def test_range_requests(server):
+    size = len(SCRIPT)
+    status, headers, body = get(server, '/scripts/Landis_Gyr_E220_SML.txt', Range='bytes=3-9')
+    assert (status, body) == (206, SCRIPT[3:10])
+    assert headers['Content-Range'] == f"bytes 3-9/{size}"
+    assert get(server, '/scripts/Landis_Gyr_E220_SML.txt', Range='bytes=-5')[2] == SCRIPT[-5:]
+
+    status, headers, body = get(server, '/scripts/Landis_Gyr_E220_SML.txt', Range=f"bytes={size}-")
+    assert (status, body) == (416, b'')
+    assert headers['Content-Range'] == f"bytes */{size}"
+
+    etag = headers['ETag']
+    status, headers, body = get(server, '/scripts/Landis_Gyr_E220_SML.txt', Range='bytes=3-9', If_Range=etag)
+    assert (status, body) == (206, SCRIPT[3:10])
+    # Veralteter ETag in If-Range: die ganze, aktuelle Datei statt eines Bereichs
+    status, headers, body = get(server, '/scripts/Landis_Gyr_E220_SML.txt', Range='bytes=3-9', If_Range='"veraltet"')
+    assert (status, body) == (200, SCRIPT)
+    assert 'Content-Range' not in headers
+
+@pytest.mark.parametrize('path', ['/scripts/../secret.txt', '/api/../../secret.txt', '/api/%2e%2e/secret.txt',
+                                  '/scripts/..%2f..%2fsecret.txt', '/secret.txt', '/api/.hidden'])
+def test_paths_outside_the_catalog_give_404(server, path):
+    status, _, body = get(server, path)
+    assert status == 404
+    assert b'geheim' not in body
@@ -0,0 +1,59 @@
+"""Tests für die Quellen-Adapter und das Zusammenführen nach Priorität"""
+
+import time
+
+import pytest
+
+import smart_meter_scripts_crawler as crawler
+from sources import SourceAdapter, stream_records
+
+import pages
+
+class ListSource(SourceAdapter):
+    """Quelle aus festen (Gerätename, Script) - delay verzögert jeden Datensatz"""
+
+    def __init__(self, name, priority, entries, delay=0):
+        self.name = name
+        self.priority = priority
+        self.entries = entries
+        self.delay = delay
+
+    def records(self, context):
+        for device_name, script in self.entries:
+            time.sleep(self.delay)
+            yield context.record(device_name, script, self.name, f"https://example.org/{self.name}")
+
+def test_adapter_without_records_cannot_be_created():
+    class Incomplete(SourceAdapter):
+        name = 'unvollständig'
+
+    with pytest.raises(TypeError):
+        SourceAdapter()
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_higher_priority_source_wins_duplicate_devices(capsys):
+    high = pages.meters(3)
+    low = [(name, script) for (name, _), (_, script) in zip(high[:2], pages.meters(2, seed=7, offset=50))]
+    low.append(pages.meters(1, seed=8, offset=60)[0])
+    context = crawler.CrawlContext()
+    by_source = [crawler.group_records(ListSource(name, priority, entries).records(context))
+                 for name, priority, entries in (('hoch', 20, high), ('niedrig', 10, low))]
+
+    merged = crawler.merge_sources(by_source)
+    sources = {key: [script_data['source'] for script_data in scripts] for key, scripts in merged.items()}
+    assert sources == {crawler.normalize_device_name(name): ['hoch'] for name, _ in high} | {
+        crawler.normalize_device_name(low[2][0]): ['niedrig']}
+    assert {script_data['script'] for scripts in merged.values() for script_data in scripts} == (
+        {script for _, script in high} | {low[2][1]})
+
+def test_priority_holds_when_the_lower_source_finishes_first(capsys):
+    high = pages.meters(3)
+    low = [(high[0][0], pages.meters(1, seed=7, offset=50)[0][1])]
+    adapters = [ListSource('niedrig', 10, low), ListSource('hoch', 20, high, delay=0.05)]
+    ranked = [adapter.name for adapter in sorted(adapters, key=lambda adapter: -adapter.priority)]
+
+    stream = stream_records(adapters, crawler.CrawlContext(), finished=True)
+    merged = list(crawler.stream_merge(((adapter.name, record) for adapter, record in stream), ranked))
+    assert sorted((script_data['device_name'], script_data['source']) for script_data in merged) == sorted(
+        (name, 'hoch') for name, _ in high)
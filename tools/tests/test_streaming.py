@@ -0,0 +1,62 @@
+"""Tests für den Datenstrom von der Antwort bis zur gespeicherten Datei"""
+
+import os
+import tracemalloc
+
+import pytest
+
+import smart_meter_scripts_crawler as crawler
+from sources import PageSource, stream_records
+
+import pages
+
+# Spitzen-Speicher, den der Datenstrom mit tausenden Descriptoren nicht überschreiten darf
+MAX_STREAMING_MEMORY = 40 * 1024 * 1024
+
+DESCRIPTORS = 2000
+# Absätze Beschreibung je Descriptor - die Tasmota Seite wird damit größer als das Speicherlimit
+PROSE = 400
+
+def stream_to_disk(adapters, output_dir):
+    """Datenstrom wie im Crawler: Quellen abrufen, blockweise parsen, mergen und sofort speichern"""
+    stream = stream_records(adapters, crawler.CrawlContext(), 1, finished=True)
+    tagged = ((adapter.name, record) for adapter, record in stream)
+    return crawler.save_records(crawler.stream_merge(tagged, [adapter.name for adapter in adapters]), output_dir)
+
+def test_stream_memory_stays_below_limit(standin, tmp_path, capsys):
+    """Spitzen-Speicher bleibt unter dem Limit, obwohl die Seite selbst größer ist"""
+    tasmota = pages.meters(DESCRIPTORS)
+    bitshake = pages.meters(200, seed=1, offset=DESCRIPTORS)
+    page_size = sum(len(chunk.encode('utf-8')) for chunk in pages.tasmota_chunks(tasmota, PROSE))
+    assert page_size > MAX_STREAMING_MEMORY
+
+    standin.set_page('/tasmota', lambda: pages.tasmota_chunks(tasmota, PROSE))
+    standin.set_page('/bitshake', lambda: pages.bitshake_chunks(bitshake))
+    adapters = [PageSource('bitshake', standin.url('/bitshake'), crawler.iter_bitshake, 20),
+                PageSource('tasmota', standin.url('/tasmota'), crawler.iter_tasmota_wiki, 10)]
+    tracemalloc.start()
+    try:
+        result = stream_to_disk(adapters, str(tmp_path))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    scripts = [name for name in os.listdir(tmp_path) if name.endswith('.txt')]
+    assert len(scripts) == DESCRIPTORS + 200
+    assert result['first_write'] is not None
+    assert peak < MAX_STREAMING_MEMORY, f"Spitzen-Speicher {peak / 1024 / 1024:.1f} MiB"
+
+@pytest.mark.parametrize('parser', crawler.available_parsers())
+def test_backends_yield_same_records(parser, capsys):
+    """Jedes HTML-Backend liefert in beliebigen Blöcken dieselben Datensätze wie html.parser auf der ganzen Seite"""
+    entries = pages.meters(40)
+    tasmota_page, bitshake_page = pages.tasmota_page(entries, prose=2), pages.bitshake_page(entries)
+    expected = (crawler.parse_tasmota_wiki(tasmota_page, parser='html.parser'),
+                crawler.parse_bitshake(bitshake_page, parser='html.parser'))
+    assert sum(len(records) for records in expected[0].values()) == 40
+
+    chunks = lambda page: [page[i:i + 257] for i in range(0, len(page), 257)]
+    streamed = (crawler.group_records(crawler.iter_tasmota_wiki(chunks(tasmota_page), parser=parser)),
+                crawler.group_records(crawler.iter_bitshake(chunks(bitshake_page), parser=parser)))
+    assert streamed == expected
+    assert crawler.parse_tasmota_wiki(tasmota_page, parser=parser) == expected[0]
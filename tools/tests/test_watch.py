@@ -0,0 +1,103 @@
+"""Tests für die Planung im Watch-Modus (Intervalle, Backoff, 304, Neuerzeugung) mit einer falschen Uhr"""
+
+import json
+import os
+import random
+
+import pytest
+
+import smart_meter_scripts_crawler as crawler
+from watch import STATUS_FILE, WatchedSource, Watcher
+
+START = 1700000000.0
+
+class FakeClock:
+    """Uhr ohne Warten: sleep() stellt die Zeit nur vor"""
+
+    def __init__(self, now=START):
+        self.now = now
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def make_watcher(standin, output_dir, tasmota_interval=3600, bitshake_interval=7200, **kwargs):
+    sources = [WatchedSource('tasmota', standin.url('/tasmota'), crawler.iter_tasmota_wiki, tasmota_interval, 10),
+               WatchedSource('bitshake', standin.url('/bitshake'), crawler.iter_bitshake, bitshake_interval, 20)]
+    return Watcher(sources, output_dir=str(output_dir), clock=FakeClock(), rng=random.Random(1), patches_dir=None,
+                   **kwargs)
+
+def test_sources_are_polled_on_their_own_interval(standin, tmp_path, capsys):
+    watcher = make_watcher(standin, tmp_path)
+    watcher.run(cycles=4)
+
+    # Termine: 0 (beide), 1h (tasmota), 2h (beide), 3h (tasmota)
+    assert watcher.clock.sleeps == [3600, 3600, 3600]
+    assert len(standin.statuses('/tasmota')) == 4
+    assert len(standin.statuses('/bitshake')) == 2
+    tasmota, bitshake = watcher.sources
+    assert tasmota.next_run == START + 4 * 3600
+    assert bitshake.next_run == START + 4 * 3600
+
+def test_backoff_grows_after_failures_and_is_capped(standin, tmp_path, capsys):
+    watcher = make_watcher(standin, tmp_path, tasmota_interval=86400, backoff_base=60, backoff_max=300)
+    bitshake = watcher.sources[1]
+    standin.fail('/bitshake', 5)
+
+    for failures, delay in enumerate((60, 120, 240, 300, 300), 1):
+        now = watcher.clock.now = max(bitshake.next_run, watcher.clock.now)
+        watcher.run_once()
+        assert bitshake.status['state'] == 'error'
+        assert bitshake.status['failures'] == failures
+        # Equal Jitter: zwischen der Hälfte und der vollen Wartezeit
+        assert delay / 2 <= bitshake.next_run - now <= delay
+
+    now = watcher.clock.now = bitshake.next_run
+    watcher.run_once()
+    assert bitshake.status['state'] == 'changed'
+    assert bitshake.failures == 0
+    assert bitshake.next_run == now + bitshake.interval
+    assert standin.statuses('/bitshake') == [503] * 5 + [200]
+
+def test_regeneration_waits_until_every_source_succeeded(standin, tmp_path, capsys):
+    watcher = make_watcher(standin, tmp_path, backoff_base=60)
+    standin.fail('/bitshake', 2)
+
+    # Tasmota hat neue Scripts, Bitshake scheitert zweimal - ohne Bitshake wird nicht erzeugt
+    watcher.run(cycles=2)
+    assert [source.status['state'] for source in watcher.sources] == ['changed', 'error']
+    assert watcher.sources[1].failures == 2
+    assert watcher.regenerations == 0
+    assert not os.path.exists(tmp_path / 'api')
+
+    watcher.clock.now = watcher.sources[1].next_run
+    watcher.run(cycles=1)
+    assert standin.statuses('/tasmota') == [200]
+    assert watcher.sources[1].status['state'] == 'changed'
+    assert watcher.regenerations == 1
+    scripts = [name for name in os.listdir(tmp_path) if name.endswith('.txt')]
+    assert len(scripts) == 10
+    assert os.path.exists(tmp_path / 'api' / 'scripts.json')
+
+def test_unchanged_pages_are_not_modified_and_not_regenerated(standin, tmp_path, capsys):
+    watcher = make_watcher(standin, tmp_path, tasmota_interval=3600, bitshake_interval=3600)
+    watcher.run(cycles=1)
+    assert watcher.regenerations == 1
+
+    # Neuer Watcher mit demselben Ausgabeordner: die Validatoren kommen aus dem HTTP-Cache
+    watcher = make_watcher(standin, tmp_path, tasmota_interval=3600, bitshake_interval=3600)
+    watcher.run(cycles=2)
+    assert [source.status['state'] for source in watcher.sources] == ['not_modified', 'not_modified']
+    assert standin.statuses('/tasmota') == [200, 304, 304]
+    assert standin.statuses('/bitshake') == [200, 304, 304]
+    # Nach dem Neustart einmal erzeugt (Scripts unbekannt), danach nicht mehr
+    assert watcher.regenerations == 1
+
+    with open(tmp_path / STATUS_FILE, encoding='utf-8') as f:
+        status = json.load(f)
+    assert {name: source['state'] for name, source in status['sources'].items()} == {
+        'tasmota': 'not_modified', 'bitshake': 'not_modified'}
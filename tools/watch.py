@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Watch-Modus: Quellen regelmäßig neu crawlen und den Mirror aktuell halten
+
+Jede Quelle hat ein eigenes Intervall und wird mit bedingten Anfragen (ETag/Last-Modified)
+abgerufen. Fehler verschieben den nächsten Versuch mit exponentiellem Backoff plus Jitter.
+Scripts und API-Dateien werden nur neu erzeugt, wenn sich die Scripts einer Quelle
+oder die Patches für manuell korrigierte Scripts (siehe patches.py) tatsächlich geändert haben. Status und Laufzeiten jeder Quelle stehen in .watch_status.json.
+
+Uhr und Zufallsgenerator sind austauschbar, damit sich der Ablauf ohne Warten prüfen lässt.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import time
+from datetime import datetime, timezone
+
+import smart_meter_scripts_crawler as crawler
+from catalog import generate_api
+from patches import (PATCH_CACHE_FILE, PATCHES_DIR, apply_overlay, load_overlay, load_patch_cache, overlay_fingerprint,
+                     save_patch_cache)
+from sources import registered_sources
+from storage import content_hash, write_if_changed
+
+STATUS_FILE = ".watch_status.json"
+
+DEFAULT_INTERVAL = 6 * 3600
+BACKOFF_BASE = 60
+BACKOFF_MAX = 6 * 3600
+
+INTERVAL_RE = re.compile(r'^(\d+(?:\.\d+)?)([smhd]?)$')
+INTERVAL_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+class SystemClock:
+    """Echte Uhr: Sekunden seit Epoch und blockierendes Warten"""
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+def parse_interval(text):
+    """Wandelt "90", "15m", "6h" oder "1d" in Sekunden um"""
+    match = INTERVAL_RE.match(text.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"Ungültiges Intervall: {text} (z.B. 900, 15m, 6h, 1d)")
+    return float(match.group(1)) * INTERVAL_UNITS[match.group(2)]
+
+def format_time(timestamp):
+    """Zeitstempel für Status und Ausgabe (UTC, ISO 8601)"""
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='seconds')
+
+def backoff_delay(failures, rng, base=BACKOFF_BASE, maximum=BACKOFF_MAX):
+    """Wartezeit nach dem n-ten Fehler in Folge: exponentiell, gedeckelt, halb zufällig (Equal Jitter)"""
+    delay = min(maximum, base * 2 ** (failures - 1))
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+class WatchedSource:
+    """Eine Quelle mit eigenem Intervall, letztem Ergebnis und Status"""
+
+    def __init__(self, name, url, parse, interval, priority=0):
+        self.name = name
+        self.url = url
+        self.parse = parse
+        self.interval = interval
+        self.priority = priority
+        self.scripts = None
+        self.scripts_hash = None
+        self.next_run = 0
+        self.failures = 0
+        self.status = {'state': 'pending'}
+
+class Watcher:
+    """Plant die Abrufe aller Quellen und erzeugt Scripts + API-Dateien bei Änderungen neu"""
+
+    def __init__(self, sources, session=None, output_dir=crawler.OUTPUT_DIR, clock=None, rng=None,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX, patches_dir=PATCHES_DIR):
+        self.sources = sources
+        self.session = session or crawler.create_session()
+        self.output_dir = output_dir
+        self.api_dir = os.path.join(output_dir, os.path.basename(crawler.API_OUTPUT_DIR))
+        self.cache_file = os.path.join(output_dir, os.path.basename(crawler.HTTP_CACHE_FILE))
+        self.cache = crawler.load_http_cache(self.cache_file)
+        self.clock = clock or SystemClock()
+        self.rng = rng or random.Random()
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.regenerations = 0
+        self.last_regeneration = None
+        # patches_dir=None: Scripts unverändert speichern
+        self.patches_dir = patches_dir
+        self.overlay = {}
+        self.overlay_hash = None
+        self.patch_cache_file = os.path.join(output_dir, PATCH_CACHE_FILE)
+        self.patch_cache = load_patch_cache(self.patch_cache_file)
+
+    def poll(self, source, now):
+        """Ruft eine fällige Quelle ab - gibt True zurück, wenn sich ihre Scripts geändert haben"""
+        start = time.perf_counter()
+        try:
+            cached = self.cache.get(source.url, {}).get('scripts')
+            scripts = crawler.crawl_source(source.url, source.parse, self.session, self.cache)
+            if not scripts:
+                raise ValueError("keine Scripts gefunden")
+        except Exception as e:
+            source.failures += 1
+            delay = backoff_delay(source.failures, self.rng, self.backoff_base, self.backoff_max)
+            source.next_run = now + delay
+            source.status.update(state='error', error=str(e), failures=source.failures,
+                                 last_run=format_time(now), duration=time.perf_counter() - start,
+                                 next_run=format_time(source.next_run))
+            print(f"[{source.name}] Fehler ({source.failures}x): {e} - nächster Versuch in {delay:.0f}s")
+            return False
+
+        scripts_hash = content_hash(json.dumps(scripts, ensure_ascii=False, sort_keys=True))
+        changed = scripts_hash != source.scripts_hash
+        not_modified = cached is not None and scripts is cached
+        source.scripts = scripts
+        source.scripts_hash = scripts_hash
+        source.failures = 0
+        source.next_run = now + source.interval
+        source.status = {
+            'state': 'changed' if changed else ('not_modified' if not_modified else 'unchanged'),
+            'scripts': sum(len(v) for v in scripts.values()),
+            'failures': 0,
+            'last_run': format_time(now),
+            'last_success': format_time(now),
+            'duration': time.perf_counter() - start,
+            'next_run': format_time(source.next_run),
+        }
+        print(f"[{source.name}] {source.status['state']}, {source.status['scripts']} Scripts")
+        return changed
+
+    def reload_overlay(self):
+        """Liest die Patches neu ein - gibt True zurück, wenn sie sich seit der letzten Neuerzeugung geändert haben"""
+        if self.patches_dir:
+            try:
+                self.overlay = load_overlay(self.patches_dir)
+            except ValueError as e:
+                # Unbeaufsichtigt weiterlaufen: die zuletzt gültigen Patches bleiben aktiv
+                print(f"Patches nicht geladen: {e}")
+        return overlay_fingerprint(self.overlay) != self.overlay_hash
+
+    def regenerate(self, now):
+        """Merged die letzten Ergebnisse aller Quellen, wendet die Patches an und schreibt Scripts + API-Dateien (inkrementell)"""
+        start = time.perf_counter()
+        ranked = sorted(self.sources, key=lambda source: -source.priority)
+        # Jeder Datensatz trägt seine Quelle ins Manifest (siehe save_records)
+        merged = crawler.merge_sources([{key: [dict(script_data, adapter=source.name) for script_data in scripts]
+                                         for key, scripts in (source.scripts or {}).items()} for source in ranked])
+        patched = {}
+        records = (script_data for scripts in merged.values() for script_data in scripts)
+        saved = crawler.save_records(apply_overlay(records, self.overlay, self.patch_cache, patched), self.output_dir)
+        if self.overlay or os.path.exists(self.patch_cache_file):
+            save_patch_cache(self.patch_cache, self.patch_cache_file)
+        self.overlay_hash = overlay_fingerprint(self.overlay)
+        api = generate_api(self.output_dir, self.api_dir)
+        self.regenerations += 1
+        self.last_regeneration = {
+            'time': format_time(now),
+            'duration': time.perf_counter() - start,
+            'scripts_written': len(saved['written']),
+            'scripts_removed': len(saved['removed']),
+            'api_written': len(api['written']),
+            'patches': patched,
+        }
+
+    def run_once(self):
+        """Ein Durchlauf: fällige Quellen abrufen, bei Änderungen neu erzeugen - gibt den nächsten Termin zurück"""
+        now = self.clock.time()
+        changed = False
+        for source in self.sources:
+            if source.next_run <= now:
+                changed = self.poll(source, now) or changed
+        changed = self.reload_overlay() or changed
+
+        # Erst erzeugen, wenn jede Quelle einmal erfolgreich war - sonst fehlten ihre Scripts im Merge
+        if changed and all(source.scripts is not None for source in self.sources):
+            self.regenerate(now)
+        crawler.save_http_cache(self.cache, self.cache_file)
+        self.save_status(now)
+        return min(source.next_run for source in self.sources)
+
+    def status(self, now):
+        """Status aller Quellen und der letzten Neuerzeugung"""
+        return {
+            'updated': format_time(now),
+            'regenerations': self.regenerations,
+            'last_regeneration': self.last_regeneration,
+            'sources': {source.name: dict(source.status, url=source.url, interval=source.interval)
+                        for source in self.sources},
+        }
+
+    def save_status(self, now):
+        """Schreibt den Status nach .watch_status.json im Ausgabeordner"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        content = json.dumps(self.status(now), ensure_ascii=False, indent=2, sort_keys=True)
+        write_if_changed(os.path.join(self.output_dir, STATUS_FILE), content + '\n')
+
+    def run(self, cycles=None):
+        """Läuft bis zum Abbruch (oder für eine Anzahl Durchläufe) und wartet jeweils bis zum nächsten Termin"""
+        cycle = 0
+        while cycles is None or cycle < cycles:
+            next_run = self.run_once()
+            cycle += 1
+            if cycles is not None and cycle >= cycles:
+                break
+            self.clock.sleep(max(0, next_run - self.clock.time()))
+
+def default_sources(tasmota_interval=DEFAULT_INTERVAL, bitshake_interval=DEFAULT_INTERVAL, default_interval=DEFAULT_INTERVAL):
+    """Alle angemeldeten Webseiten-Quellen als überwachte Quellen (Tasmota Wiki, Bitshake, ...)"""
+    intervals = {'tasmota': tasmota_interval, 'bitshake': bitshake_interval}
+    return [WatchedSource(adapter.name, adapter.url, adapter.parse, intervals.get(adapter.name, default_interval),
+                          adapter.priority)
+            for adapter in registered_sources() if hasattr(adapter, 'url')]
+
+def main():
+    """Startet den Watch-Modus"""
+    parser = argparse.ArgumentParser(description="Hält den Smart Meter Scripts Mirror durch regelmäßiges Crawlen aktuell")
+    parser.add_argument('--output-dir', default=crawler.OUTPUT_DIR)
+    parser.add_argument('--tasmota-interval', type=parse_interval, default=DEFAULT_INTERVAL,
+                        help="Intervall für das Tasmota Wiki (z.B. 6h, Standard: 6h)")
+    parser.add_argument('--bitshake-interval', type=parse_interval, default=DEFAULT_INTERVAL,
+                        help="Intervall für die Bitshake Documentation (Standard: 6h)")
+    parser.add_argument('--backoff-max', type=parse_interval, default=BACKOFF_MAX,
+                        help="Maximale Wartezeit nach Fehlern (Standard: 6h)")
+    parser.add_argument('--patches-dir', default=PATCHES_DIR, help="Patches für manuell korrigierte Scripts")
+    parser.add_argument('--no-patches', action='store_true', help="Scripts unverändert speichern")
+    parser.add_argument('--once', action='store_true', help="Nur einen Durchlauf ausführen")
+    args = parser.parse_args()
+
+    watcher = Watcher(default_sources(args.tasmota_interval, args.bitshake_interval),
+                      output_dir=args.output_dir, backoff_max=args.backoff_max,
+                      patches_dir=None if args.no_patches else args.patches_dir)
+    print(f"Watch-Modus: Tasmota alle {args.tasmota_interval:.0f}s, Bitshake alle {args.bitshake_interval:.0f}s, "
+          f"Status in {os.path.join(args.output_dir, STATUS_FILE)}")
+    try:
+        watcher.run(cycles=1 if args.once else None)
+    except KeyboardInterrupt:
+        print("\nBeendet")
+
+if __name__ == "__main__":
+    main()